@@ -0,0 +1,232 @@
+"""
+Batch strategy advice for hand logs.
+
+Streams hands from CSV or JSONL files (gzipped or not) or stdin and writes each
+record back with the table's action and its text. Records give either
+hand_type, total and upcard, or cards and upcard:
+
+    hand_type,total,upcard          {"hand_type": "soft", "total": 18, "upcard": 9}
+    hard,16,10                      {"cards": ["A", 7], "upcard": "A"}
+    cards,upcard
+    10-4-2,10
+
+Hands are read and advised batch_size records at a time, so memory stays flat
+however large the input is; table lookups in a batch are one vectorized
+gather. Invalid records are written with an error instead of an action.
+Only the strategy table is imported, never Streamlit or the RAG stack, so one
+invocation can audit a whole night's logs at table speed:
+
+    python advise_hands.py hands.csv > advised.csv
+    zcat logs/*.jsonl.gz | python advise_hands.py --format jsonl > advised.jsonl
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional
+
+from strategy_table import (ACTIONS, card_value, get_action, get_action_for_cards, get_action_text, get_actions,
+                            parse_cards)
+
+DEFAULT_BATCH_SIZE = 10_000
+FORMATS = ('csv', 'jsonl')
+# Totals beyond this can't come from a hand of cards and are reported as errors
+MAX_TOTAL = 40
+# Columns added to every record
+OUTPUT_FIELDS = ('action', 'text', 'error')
+
+_ACTION_TEXT = {action: get_action_text(action) for action in ACTIONS}
+
+
+def detect_format(path: str) -> str:
+    """Input format from a file name; stdin and unknown extensions are CSV"""
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'jsonl' if name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def open_input(path: str):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='')
+    return open(path, newline='')
+
+
+def read_records(stream, fmt: str) -> Iterator[tuple]:
+    """
+    Records from an open input.
+
+    Yields:
+        (record, error) tuples: a dict per hand, and a message instead of None
+        when the line couldn't be parsed
+    """
+    if fmt == 'csv':
+        for record in csv.DictReader(stream):
+            yield record, None
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield {}, f"Line {number}: invalid JSON"
+            continue
+        if isinstance(record, dict):
+            yield record, None
+        else:
+            yield {}, f"Line {number}: expected a JSON object"
+
+
+def _integer(value, name: str, low: int, high: int) -> int:
+    if isinstance(value, float) and value.is_integer():
+        number = int(value)
+    elif isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    else:
+        try:
+            number = int(value)
+        except ValueError:
+            raise ValueError(f"Invalid {name}: {value!r}")
+    if not low <= number <= high:
+        raise ValueError(f"Invalid {name}: {value!r}. Must be between {low} and {high}")
+    return number
+
+
+def _cards(value) -> list:
+    if isinstance(value, str):
+        return parse_cards(value)
+    if isinstance(value, list):
+        return value
+    raise ValueError(f"Invalid cards: {value!r}")
+
+
+def advise_batch(records: List[tuple]) -> List[tuple]:
+    """
+    Actions for a batch of records from read_records.
+
+    Returns:
+        An (action, error) tuple per record: action is None when error says why
+    """
+    results = [None] * len(records)
+    cells, hand_types, totals, upcards = [], [], [], []
+    for i, (record, error) in enumerate(records):
+        if error is not None:
+            results[i] = (None, error)
+            continue
+        try:
+            if 'upcard' not in record:
+                raise ValueError("Missing upcard")
+            upcard = card_value(record['upcard'])
+            if record.get('cards') not in (None, ''):
+                results[i] = (get_action_for_cards(_cards(record['cards']), upcard), None)
+                continue
+            if 'hand_type' not in record or 'total' not in record:
+                raise ValueError("Need hand_type and total, or cards")
+            total = _integer(record['total'], 'total', 0, MAX_TOTAL)
+        except ValueError as e:
+            results[i] = (None, str(e))
+            continue
+        cells.append(i)
+        hand_types.append(str(record['hand_type']))
+        totals.append(total)
+        upcards.append(upcard)
+
+    if cells:
+        codes, valid = get_actions(hand_types, totals, upcards)
+        for j, (i, code, ok) in enumerate(zip(cells, codes.tolist(), valid.tolist())):
+            if ok:
+                results[i] = (ACTIONS[code], None)
+                continue
+            # Rare: let get_action explain what is wrong with the hand
+            try:
+                results[i] = (get_action(hand_types[j], totals[j], upcards[j]), None)
+            except ValueError as e:
+                results[i] = (None, str(e))
+    return results
+
+
+def _batches(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def advise(inputs: List[str], out, fmt: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> tuple:
+    """
+    Advise every hand in the inputs and write the results.
+
+    Args:
+        inputs: File paths, or '-' for stdin
+        out: Text stream for the results, in the input format
+        fmt: 'csv' or 'jsonl'; detected from the first input's name when None
+        batch_size: Records held in memory at a time
+
+    Returns:
+        Tuple of (hands, invalid) counts
+
+    Raises:
+        ValueError: If the format or batch size is invalid
+    """
+    fmt = fmt or detect_format(inputs[0])
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}. Must be one of {', '.join(FORMATS)}")
+    if batch_size < 1:
+        raise ValueError("Batch size must be at least 1")
+
+    hands = invalid = 0
+    writer = None
+    for path in inputs:
+        stream = open_input(path)
+        try:
+            records = read_records(stream, fmt)
+            if fmt == 'csv' and writer is None:
+                # CSV output keeps the first input's columns
+                first = next(records, None)
+                if first is None:
+                    continue
+                fields = list(first[0]) + [field for field in OUTPUT_FIELDS if field not in first[0]]
+                writer = csv.DictWriter(out, fields, restval='', extrasaction='ignore', lineterminator='\n')
+                writer.writeheader()
+                records = chain([first], records)
+            for batch in _batches(records, batch_size):
+                for (record, _), (action, error) in zip(batch, advise_batch(batch)):
+                    row = dict(record, action=action, text=_ACTION_TEXT.get(action), error=error)
+                    if fmt == 'csv':
+                        writer.writerow({key: '' if value is None else value for key, value in row.items()})
+                    else:
+                        if error is None:
+                            del row['error']
+                        out.write(json.dumps(row) + '\n')
+                    invalid += error is not None
+                hands += len(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+    return hands, invalid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add basic strategy actions to CSV or JSONL hand logs")
+    parser.add_argument("inputs", nargs="*", default=["-"], help="input files (.gz ok); - or none for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="input and output format (default: from the file name)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="hands advised per batch")
+    parser.add_argument("--output", "-o", default="-", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        hands, invalid = advise(args.inputs, out, args.format, args.batch_size)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Advised {hands} hands ({invalid} invalid) in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Headless HTTP API for strategy lookups and Grok questions.
+
+A plain ASGI application with no framework dependency, for bots and overlay
+clients that can't go through the Streamlit script:
+
+    GET  /health                                    {"status": "ok", "grok": "warming"}
+    GET  /action?hand_type=hard&total=16&upcard=10  {"action": "H", "text": "Hit"}
+         (optional &true_count=2.5 applies index plays)
+    POST /actions  {"hands": [{"hand_type": "hard", "total": 16, "upcard": 10}, ...]}
+                   {"actions": ["H", ...]}  (null for hands the table doesn't cover)
+    POST /ask      {"question": "..."}  {"answer": "...", "source": "table" | "grok"}
+
+Table lookups never touch the RAG chain: single answers are served from
+pre-encoded response bodies and batches are one vectorized gather. The chain
+warms up in the background when the server starts and stays loaded for the
+life of the worker; /ask answers 503 with Retry-After until it is ready.
+
+Run it with uvicorn (pip install uvicorn):
+
+    python build_index.py            # once, so workers memory-map one shared index
+    python api.py --workers 4
+    uvicorn api:app --port 8000
+
+Each worker builds its own chain, but with an index snapshot in place they all
+map the same embeddings file, so the index is held in memory once.
+"""
+
+import argparse
+import json
+import logging
+import math
+from functools import lru_cache
+from http import HTTPStatus
+from urllib.parse import parse_qs
+
+from intent_router import route_question
+from rag_warmup import FAILED, chain_status, ready_chain, start_warmup
+from strategy_table import ACTIONS, INVALID_CELL, get_action, get_action_text, get_actions
+
+MAX_BODY_BYTES = 1_000_000
+MAX_BATCH = 10_000
+MAX_QUESTION_CHARS = 2_000
+# Totals beyond this can't come from a hand of cards; they are rejected, not looked up
+MAX_TOTAL = 40
+# Seconds a client should wait before asking again while the chain warms up
+WARMUP_RETRY_AFTER = 5
+
+_JSON_HEADERS = [(b'content-type', b'application/json')]
+
+
+class ApiError(Exception):
+    """An error response: HTTP status and a message for the client"""
+
+    def __init__(self, status: HTTPStatus, message: str, headers: list = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or []
+
+
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+@lru_cache(maxsize=1024)
+def _action_body(hand_type: str, total: int, upcard: int) -> bytes:
+    """Encoded /action response for a cell without a count; there are only a few hundred"""
+    action = get_action(hand_type, total, upcard)
+    return _encode({'action': action, 'text': get_action_text(action)})
+
+
+def _int_param(params: dict, name: str) -> int:
+    values = params.get(name)
+    if not values:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Missing query parameter: {name}")
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer, got {values[0]!r}")
+
+
+def action_endpoint(params: dict) -> bytes:
+    """GET /action: one table lookup"""
+    hand_type = params.get('hand_type', [''])[0]
+    total = _int_param(params, 'total')
+    upcard = _int_param(params, 'upcard')
+    try:
+        if 'true_count' not in params:
+            return _action_body(hand_type, total, upcard)
+        try:
+            true_count = float(params['true_count'][0])
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"true_count must be a number, got {params['true_count'][0]!r}")
+        if not math.isfinite(true_count):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"true_count must be finite, got {params['true_count'][0]!r}")
+        action = get_action(hand_type, total, upcard, true_count=true_count)
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+    return _encode({'action': action, 'text': get_action_text(action)})
+
+
+def actions_endpoint(body: dict) -> bytes:
+    """POST /actions: many table lookups in one gather"""
+    hands = body.get('hands')
+    if not isinstance(hands, list):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a JSON object with a 'hands' list")
+    if len(hands) > MAX_BATCH:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"At most {MAX_BATCH} hands per request")
+    try:
+        hand_types = [hand['hand_type'] for hand in hands]
+        totals = [hand['total'] for hand in hands]
+        upcards = [hand['upcard'] for hand in hands]
+    except (KeyError, TypeError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Each hand needs hand_type, total and upcard")
+    if not hands:
+        return _encode({'actions': []})
+    if not all(type(value) is int for value in totals + upcards):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Totals and upcards must be integers")
+    for total in totals:
+        if not 0 <= total <= MAX_TOTAL:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid hand total: {total}. Must be between 0 and {MAX_TOTAL}")
+    for upcard in upcards:
+        if not 2 <= upcard <= 11:
+            # Same message as GET /action
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f"Invalid dealer upcard: {upcard}. Must be between 2 and 11 (where 11 represents Ace)")
+    if not all(isinstance(hand_type, str) for hand_type in hand_types):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Hand types must be strings")
+
+    codes, valid = get_actions(hand_types, totals, upcards)
+    actions = [ACTIONS[code] if code != INVALID_CELL else None for code in codes.tolist()]
+    return _encode({'actions': actions})
+
+
+async def ask_endpoint(body: dict) -> bytes:
+    """POST /ask: hand questions from the table, everything else from the warm chain"""
+    question = body.get('question')
+    if not isinstance(question, str) or not question.strip():
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a JSON object with a non-empty 'question'")
+    if len(question) > MAX_QUESTION_CHARS:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Questions are limited to {MAX_QUESTION_CHARS} characters")
+
+    answer = route_question(question)
+    if answer is not None:
+        return _encode({'answer': answer, 'source': 'table'})
+
+    chain = ready_chain()
+    if chain is None:
+        status, error = chain_status()
+        if status == FAILED:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, f"Grok is unavailable: {error}")
+        raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "Grok is warming up; try again shortly",
+                       [(b'retry-after', str(WARMUP_RETRY_AFTER).encode())])
+    answer = await chain.aget_response(query=question)
+    return _encode({'answer': answer, 'source': 'grok'})
+
+
+def health_endpoint() -> bytes:
+    status, _ = chain_status()
+    return _encode({'status': 'ok', 'grok': status})
+
+
+async def _read_json(receive) -> dict:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Client disconnected")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request bodies are limited to {MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            break
+    try:
+        body = json.loads(b''.join(chunks))
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+    return body
+
+
+async def _dispatch(scope, receive) -> bytes:
+    method, path = scope['method'], scope['path']
+    if path == '/health' and method == 'GET':
+        return health_endpoint()
+    if path == '/action' and method == 'GET':
+        return action_endpoint(parse_qs(scope.get('query_string', b'').decode('latin-1')))
+    if path == '/actions' and method == 'POST':
+        return actions_endpoint(await _read_json(receive))
+    if path == '/ask' and method == 'POST':
+        return await ask_endpoint(await _read_json(receive))
+    if path in ('/health', '/action', '/actions', '/ask'):
+        raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported on {path}")
+    raise ApiError(HTTPStatus.NOT_FOUND, f"No such endpoint: {path}")
+
+
+async def _send(send, status: HTTPStatus, body: bytes, headers: list = ()) -> None:
+    await send({'type': 'http.response.start', 'status': int(status), 'headers': _JSON_HEADERS + list(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            start_warmup()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    try:
+        body = await _dispatch(scope, receive)
+    except ApiError as e:
+        await _send(send, e.status, _encode({'error': str(e)}), e.headers)
+        return
+    except Exception as e:
+        logging.error(f"Error handling {scope['method']} {scope['path']}: {type(e).__name__}: {e}")
+        await _send(send, HTTPStatus.INTERNAL_SERVER_ERROR, _encode({'error': "Internal server error"}))
+        return
+    await _send(send, HTTPStatus.OK, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the strategy table and Grok over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Serving the API needs uvicorn: pip install uvicorn")
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ except ImportError:
     # pysqlite3 not available, use standard sqlite3
     pass
 import streamlit as st
-from rag_chain import GrokRagChain
+from rag_warmup import FAILED, READY, chain_status, retry_warmup, start_warmup
 
 # Page configuration
 st.set_page_config(
@@ -19,7 +19,7 @@ st.set_page_config(
 
 # Import from strategy_table.py
 try:
-    from strategy_table import get_action, get_action_text
+    from strategy_table import card_value, classify_hand, get_action, get_action_for_cards, get_action_text, parse_cards
 except ImportError:
     # Fallback if strategy_table.py isn't available
     def get_action(hand_type, player_total, dealer_upcard):
@@ -67,7 +67,10 @@ def get_action_display(action_code):
         'S': {'text': 'STAND', 'icon': '✋', 'color': '#51cf66', 'bg': '#1b2d1b'},
         'D': {'text': 'DOUBLE DOWN', 'icon': '⬆️', 'color': '#339af0', 'bg': '#1b1f2d'},
         'Ds': {'text': 'DOUBLE OR STAND', 'icon': '⬆️', 'color': '#339af0', 'bg': '#1b1f2d'},
-        'P': {'text': 'SPLIT', 'icon': '✂️', 'color': '#ffa726', 'bg': '#2d241b'}
+        'P': {'text': 'SPLIT', 'icon': '✂️', 'color': '#ffa726', 'bg': '#2d241b'},
+        'Rh': {'text': 'SURRENDER OR HIT', 'icon': '🏳️', 'color': '#adb5bd', 'bg': '#242424'},
+        'Rs': {'text': 'SURRENDER OR STAND', 'icon': '🏳️', 'color': '#adb5bd', 'bg': '#242424'},
+        'Rp': {'text': 'SURRENDER OR SPLIT', 'icon': '🏳️', 'color': '#adb5bd', 'bg': '#242424'}
     }
     return actions.get(action_code, actions['H'])
 
@@ -444,23 +447,15 @@ h1, h2, h3 {
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize RAG
-@st.cache_resource
-def init_rag():
-    return GrokRagChain()
-
-try:
-    rag_chain = init_rag()
-except Exception as e:
-    st.error(f"Error: {e}")
-    st.stop()
+# Initialize RAG in the background so the strategy table renders right away
+start_warmup()
 
 # Header
 st.title("🃏 Grok21")
 st.markdown("**Simple • Fast • Optimal**")
 
-# Import the ask_grok_question function
-from blackjack_game import ask_grok_question
+# Import the streaming Grok question function
+from blackjack_game import stream_grok_question
 
 # In your tabs or wherever you want the Grok interface:
 tab1, tab2 = st.tabs(["Strategy Helper", "Ask Grok"])
@@ -479,11 +474,23 @@ with tab1:
         Examples: 8+8, A+A, K+K
         """)
     
-    # Inputs
+    # Inputs: the hand's total and type, or the actual cards
+    input_mode = st.radio("Enter your hand as", ["Total", "Cards"], horizontal=True)
     col1, col2, col3 = st.columns(3)
     
+    player_cards = None
+    card_error = None
     with col1:
-        player_total = st.number_input("Hand", 5, 21, 12)
+        if input_mode == "Cards":
+            cards_text = st.text_input("Cards", "10 6", help="Your cards, e.g. A 7 or 10-4-2 (J, Q, K count as 10)")
+            try:
+                player_cards = [card_value(card) for card in parse_cards(cards_text)]
+                hand_type, player_total = classify_hand(player_cards)
+            except ValueError as e:
+                card_error = str(e)
+                hand_type, player_total = "hard", 0
+        else:
+            player_total = st.number_input("Hand", 5, 21, 12)
     
     with col2:
         dealer_upcard = st.selectbox(
@@ -494,7 +501,15 @@ with tab1:
         )
     
     with col3:
-        hand_type = st.selectbox("Type", ["hard", "soft", "pair"])
+        if input_mode == "Cards":
+            st.markdown(f"**Type**  \n{hand_type}" if card_error is None else "**Type**  \n-")
+        else:
+            hand_type = st.selectbox("Type", ["hard", "soft", "pair"])
+    
+    if card_error:
+        st.warning(card_error)
+    
+    show_ev = st.toggle("Show EV margin", help="Exact expected-value margin of the play over the next best one")
     
     # Card display using Streamlit containers
     with st.container():
@@ -505,8 +520,12 @@ with tab1:
         
         with card_col1:
             st.markdown(f"**Your Hand ({player_total})**")
-            player_cards = get_hand_cards(player_total, hand_type)
-            st.markdown(f'<div class="big-cards">{"  ".join(player_cards)}</div>', unsafe_allow_html=True)
+            if input_mode == "Cards":
+                suits = "♠♣♥♦"
+                shown_cards = [display_card(card, suits[i % 4]) for i, card in enumerate(player_cards or [])]
+            else:
+                shown_cards = get_hand_cards(player_total, hand_type)
+            st.markdown(f'<div class="big-cards">{"  ".join(shown_cards)}</div>', unsafe_allow_html=True)
         
         with vs_col:
             st.markdown("**VS**")
@@ -521,7 +540,13 @@ with tab1:
     # Strategy button
     if st.button("Get Strategy", type="primary"):
         try:
-            action_code = get_action(hand_type, player_total, dealer_upcard)
+            if input_mode == "Cards":
+                if card_error:
+                    raise ValueError(card_error)
+                # Three or more cards can't double, and stiff totals depend on the exact cards
+                action_code = get_action_for_cards(player_cards, dealer_upcard)
+            else:
+                action_code = get_action(hand_type, player_total, dealer_upcard)
             action_info = get_action_display(action_code)
             
             # Get action-specific CSS class
@@ -543,6 +568,16 @@ with tab1:
             </div>
             """, unsafe_allow_html=True)
             
+            if show_ev:
+                from ev_calculator import describe_cards_margin, describe_margin
+                with st.spinner("Computing exact EVs..."):
+                    if input_mode == "Cards":
+                        margin = describe_cards_margin(player_cards, dealer_upcard, action_code)
+                    else:
+                        margin = describe_margin(hand_type, player_total, dealer_upcard, action_code)
+                if margin:
+                    st.caption(f"📊 {margin}")
+            
         except ValueError as e:
             # Display error message inline without triggering a full refresh
             st.markdown(f"""
@@ -580,6 +615,16 @@ with tab2:
     st.header("🤖 Ask Grok About Blackjack Strategy")
     st.markdown("Get detailed explanations about blackjack strategy decisions and rules.")
     
+    rag_status, rag_error = chain_status()
+    if rag_status == FAILED:
+        st.error(f"Grok is unavailable: {rag_error}. Questions about a specific hand still work.")
+        if st.button("🔄 Retry"):
+            retry_warmup()
+            st.rerun()
+    elif rag_status != READY:
+        st.info("⏳ Grok is warming up... Questions about a specific hand (e.g. \"16 vs 10\") work already.")
+        st.button("🔄 Check again")
+    
     question = st.text_area(
         "Your question:",
         height=100,
@@ -589,12 +634,13 @@ with tab2:
     
     if st.button("🤖 Ask Grok", type="primary"):
         if question and question.strip():
-            with st.spinner('🤖 Asking Grok... This may take a few seconds.'):
-                response = ask_grok_question(question)
-            
             st.markdown("---")
             st.markdown("### 🤖 Grok's Response:")
-            st.markdown(response)
+            queue_notice = st.empty()
+            def show_queue_position(position):
+                queue_notice.info(f"⏳ Grok is busy with other players - you're #{position} in line...")
+            st.write_stream(stream_grok_question(question, on_queue=show_queue_position))
+            queue_notice.empty()
             
             with st.expander("📝 Your Question"):
                 st.markdown(f"*{question}*")
@@ -15,11 +15,22 @@ except ImportError:
     pass
 
 
+import logging
+
 import streamlit as st
-from rag_chain import GrokRagChain
 from strategy_table import get_action
+from ev_calculator import describe_margin
+from intent_router import HandQuestion, explain_cell, route_question
+from rag_warmup import FAILED, chain_status, ready_chain, start_warmup
+
+# rag_chain is imported lazily: it loads langchain and the embedding model, which
+# would hold up the strategy table for seconds
 
-def get_strategy_advice(player_total, dealer_upcard, hand_type="hard"):
+WARMING_UP_MESSAGE = ("Grok is still warming up - it loads its document index in the background. "
+                      "Questions about a specific hand (e.g. \"16 vs 10\") work already; "
+                      "try open questions again in a few seconds.")
+
+def get_strategy_advice(player_total, dealer_upcard, hand_type="hard", show_ev=False):
     """
     Get blackjack strategy advice - the core function of this app
     
@@ -27,6 +38,8 @@ def get_strategy_advice(player_total, dealer_upcard, hand_type="hard"):
         player_total: Player's hand total 
         dealer_upcard: Dealer's visible card
         hand_type: "hard", "soft", or "pair"
+        show_ev: Append the exact EV margin over the next best play
+            (computed once per cell, then cached)
     
     Returns:
         Strategy advice using heuristic tables + explanations
@@ -39,16 +52,19 @@ def get_strategy_advice(player_total, dealer_upcard, hand_type="hard"):
         # Directly use the strategy table for lookups without initializing RAG chain
         action = get_action(hand_type, player_total, dealer_key)
         
-        # Explanations for each action
-        explanations = {
-            'H': 'Hit: Improves EV against the dealer\'s likely strong hand.',
-            'S': 'Stand: Avoids bust risk with a strong enough total.',
-            'D': 'Double: Maximizes profit when the dealer is weak (2-6).',
-            'Ds': 'Double if allowed, else Stand: Optimizes EV with caution.',
-            'P': 'Split: Creates two hands for better win potential.'
-        }
-        
-        return f"Optimal Basic Strategy action: {action}. {explanations.get(action, 'Action based on optimal play.')}"
+        # Precomputed per-cell explanation, or the templated one if there is none
+        explanation = explain_cell(HandQuestion(hand_type, player_total, dealer_key), action)
+        advice = f"Optimal Basic Strategy action: {action}. {explanation}"
+
+        if show_ev:
+            try:
+                margin = describe_margin(hand_type, player_total, dealer_key, action)
+                if margin:
+                    advice = f"{advice} {margin}"
+            except ValueError as e:
+                logging.warning(f"EV margin unavailable for {hand_type} {player_total} vs {dealer_key}: {e}")
+
+        return advice
         
     except Exception as e:
         return f"Error getting strategy advice: {str(e)}"
@@ -66,11 +82,17 @@ def ask_grok_question(question):
         import logging
         logging.info(f"Starting Grok question: {question[:50]}...")
         
-        rag_chain = GrokRagChain()
-        logging.info("RAG chain initialized successfully")
+        # Hand questions are answered from the table without loading the RAG chain
+        answer = route_question(question)
+        if answer is not None:
+            return answer
+        
+        from rag_chain import get_shared_chain, run_sync
+        rag_chain = get_shared_chain()
+        logging.info("RAG chain ready")
         
         # Use RAG path - provide question, no hand parameters  
-        response = rag_chain.get_response(query=question)
+        response = run_sync(rag_chain.aget_response(query=question))
         logging.info("Got response from RAG chain")
         
         return response
@@ -81,6 +103,39 @@ def ask_grok_question(question):
         logging.error(f"Error in ask_grok_question: {type(e).__name__}: {str(e)}")
         return f"Error asking Grok: {str(e)}"
 
+def stream_grok_question(question, on_queue=None):
+    """
+    Ask Grok a learning question and yield the answer as it is generated
+    Render it with st.write_stream so the first words show up right away
+    on_queue is called with the place in line while Grok is busy with other users
+    """
+    if not question or not question.strip():
+        yield "Please enter a question about blackjack strategy."
+        return
+        
+    try:
+        logging.info(f"Starting streamed Grok question: {question[:50]}...")
+        answer = route_question(question)
+        if answer is not None:
+            yield answer
+            return
+        
+        # Never block the UI on the chain build; it happens on the warm-up thread
+        start_warmup()
+        rag_chain = ready_chain()
+        if rag_chain is None:
+            status, error = chain_status()
+            if status == FAILED:
+                yield f"Error asking Grok: {error}"
+            else:
+                yield WARMING_UP_MESSAGE
+            return
+        yield from rag_chain.stream_response(query=question, on_queue=on_queue)
+        
+    except Exception as e:
+        logging.error(f"Error in stream_grok_question: {type(e).__name__}: {str(e)}")
+        yield f"Error asking Grok: {str(e)}"
+
 def handle_grok_interface():
     """
     Complete Grok question interface with proper state management
@@ -138,22 +193,26 @@ def handle_grok_interface():
         st.session_state.grok_loading = False
 
     
-    # Handle the actual API call if loading
+    # Handle the actual API call if loading, streaming the answer as it arrives
+    streamed = False
     if st.session_state.grok_loading:
-        with st.spinner('🤖 Asking Grok... This may take a few seconds.'):
-            response = ask_grok_question(st.session_state.grok_question)
-            st.session_state.grok_response = response
-            st.session_state.grok_loading = False
+        st.markdown("---")
+        st.markdown("### 🤖 Grok's Response:")
+        with st.container():
+            st.session_state.grok_response = st.write_stream(stream_grok_question(st.session_state.grok_question))
+        st.session_state.grok_loading = False
+        streamed = True
 
     
     # Display response
     if st.session_state.grok_response:
-        st.markdown("---")
-        st.markdown("### 🤖 Grok's Response:")
-        
-        # Display the response in a nice container
-        with st.container():
-            st.markdown(st.session_state.grok_response)
+        if not streamed:
+            st.markdown("---")
+            st.markdown("### 🤖 Grok's Response:")
+            
+            # Display the response in a nice container
+            with st.container():
+                st.markdown(st.session_state.grok_response)
         
         # Show the question that was asked
         with st.expander("📝 Your Question"):
@@ -173,10 +232,7 @@ def simple_grok_interface():
     
     if st.button("🤖 Ask Grok"):
         if question:
-            with st.spinner('🤖 Thinking...'):
-                response = ask_grok_question(question)
-            
             st.markdown("### Response:")
-            st.markdown(response)
+            st.write_stream(stream_grok_question(question))
         else:
             st.warning("Please enter a question.")
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Generate the per-cell explanations artifact offline.
+
+For every cell of the default strategy tables this asks the RAG chain why the
+table's action is right, grounding the answer in both the retrieved documents
+and the table itself, and stores the results with cell_explanations. Cells that
+already have an explanation for their current action are kept, so an
+interrupted run picks up where it stopped.
+
+    python build_explanations.py
+    python build_explanations.py --concurrency 8 --force
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from cell_explanations import cell_key, explanations_path, load_explanations, table_cells, write_explanations
+from intent_router import HandQuestion
+from strategy_table import get_action_text
+
+# The tables' rule set, stated in every prompt so the explanation doesn't argue for another one
+TABLE_RULES = "4-8 decks, dealer stands on soft 17, double after split allowed, no surrender"
+
+
+def cell_question(cell: HandQuestion, action: str) -> str:
+    dealer = 'an Ace' if cell.dealer_upcard == 11 else f"a {cell.dealer_upcard}"
+    return f"Why is {get_action_text(action).lower()} the right play with {cell.describe()} against {dealer}?"
+
+
+def explanation_prompt(question: str, cell: HandQuestion, action: str, contexts: list) -> str:
+    context = '\n\n'.join(contexts)[:6000]
+    return (f"Context: {context}\n\n"
+            f"Basic strategy table ({TABLE_RULES}): {get_action_text(action)} with {cell.describe()} "
+            f"against a dealer {'Ace' if cell.dealer_upcard == 11 else cell.dealer_upcard}.\n\n"
+            f"Query: {question}\n"
+            "In two or three sentences, explain why the table's play is right. Use the context where it helps "
+            "and do not recommend a different play.")
+
+
+async def explain_with_chain(chain, cell: HandQuestion, action: str, temperature: float) -> str:
+    """Grounded explanation of one cell from the chain's retrieval and model"""
+    from rag_chain import GENERATION_TIMEOUT
+
+    question = cell_question(cell, action)
+    contexts, message = await chain._agather_contexts(question)
+    if message is not None:
+        contexts = []
+    response = await asyncio.wait_for(chain._async_grok_client().chat.completions.create(
+        model=chain.model,
+        messages=[{"role": "user", "content": explanation_prompt(question, cell, action, contexts)}],
+        temperature=temperature,
+        max_tokens=chain.max_tokens
+    ), GENERATION_TIMEOUT)
+    return response.choices[0].message.content.strip()
+
+
+async def generate_explanations(chain, cells: list, concurrency: int = 4, temperature: float = 0.3) -> dict:
+    """
+    Explain cells concurrently.
+
+    Args:
+        chain: GrokRagChain
+        cells: (hand_type, total, dealer_upcard, action) tuples
+        concurrency: Cells in flight at once
+        temperature: Sampling temperature for the explanations
+
+    Returns:
+        Dict of cell key to {"action", "text"}; cells that failed are left out
+    """
+    slots = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def explain(hand_type, total, upcard, action):
+        async with slots:
+            try:
+                text = await explain_with_chain(chain, HandQuestion(hand_type, total, upcard), action, temperature)
+            except Exception as e:
+                logging.warning(f"Could not explain {hand_type} {total} vs {upcard}: {type(e).__name__}: {e}")
+                return
+        if text:
+            results[cell_key(hand_type, total, upcard)] = {'action': action, 'text': text}
+
+    await asyncio.gather(*(explain(*cell) for cell in cells))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the per-cell strategy explanations artifact")
+    parser.add_argument("--output", default=explanations_path(), help="artifact path (JSON)")
+    parser.add_argument("--docs", default="data/documents", help="documents folder")
+    parser.add_argument("--model", default=None, help="Grok model (defaults to the app's)")
+    parser.add_argument("--concurrency", type=int, default=4, help="cells generated at once")
+    parser.add_argument("--temperature", type=float, default=0.3)
+    parser.add_argument("--force", action="store_true", help="regenerate cells that already have an explanation")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from rag_chain import get_shared_chain
+    chain = get_shared_chain(args.docs, model=args.model)
+
+    existing = {} if args.force else dict(load_explanations(args.output))
+    cells = list(table_cells())
+    todo = [cell for cell in cells if existing.get(cell_key(*cell[:3]), {}).get('action') != cell[3]]
+    logging.info(f"{len(cells) - len(todo)} of {len(cells)} cells already explained; generating {len(todo)}")
+
+    generated = asyncio.run(generate_explanations(chain, todo, args.concurrency, args.temperature))
+    current = {cell_key(*cell[:3]) for cell in cells}
+    merged = {key: entry for key, entry in {**existing, **generated}.items() if key in current}
+    write_explanations(args.output, merged, chain.model, datetime.now(timezone.utc).isoformat(timespec='seconds'))
+    print(f"Wrote {len(merged)} of {len(cells)} cell explanations to {args.output}")
+    if len(merged) < len(cells):
+        print("Some cells failed; run again to retry them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Build the retrieval index snapshot offline.
+
+Chunks data/documents the same way the app does, embeds every chunk with the
+configured embedding backend and writes a snapshot (see index_snapshot.py) that
+the app memory-maps at startup instead of embedding the corpus itself. Ship
+the output directory with a deploy.
+
+    python build_index.py
+    python build_index.py --backend bge-small --output /srv/grok21/index_snapshot
+"""
+
+import argparse
+import logging
+import time
+
+from corpus import build_manifest, load_chunks
+from embedding_backends import DEFAULT_BACKEND, EMBEDDING_BACKENDS, get_backend
+from index_snapshot import DEFAULT_SNAPSHOT_ROOT, snapshot_directory, write_snapshot
+
+
+def build_snapshot(docs_folder: str, backend_name: str = None, root: str = DEFAULT_SNAPSHOT_ROOT,
+                   embeddings=None, batch_size: int = 64) -> str:
+    """
+    Embed the corpus and write its snapshot.
+
+    Args:
+        docs_folder: Folder with the PDF and TXT sources
+        backend_name: Embedding backend (defaults to DEFAULT_BACKEND)
+        root: Snapshot root; the snapshot goes in a subdirectory named after the backend
+        embeddings: Embeddings to use instead of loading the backend's model
+        batch_size: Chunks embedded per call
+
+    Returns:
+        The snapshot directory
+    """
+    backend = get_backend(backend_name)
+    manifest = build_manifest(docs_folder, backend)
+    chunks = load_chunks(docs_folder)
+    embeddings = embeddings or backend.create()
+
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(chunks), batch_size):
+        vectors.extend(embeddings.embed_documents([chunk.page_content for chunk in chunks[i:i + batch_size]]))
+    logging.info(f"Embedded {len(chunks)} chunks with {backend.name} in {time.perf_counter() - start:.1f}s")
+
+    directory = snapshot_directory(backend.name, root)
+    write_snapshot(directory, chunks, vectors, manifest)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mappable retrieval index snapshot")
+    parser.add_argument("--docs", default="data/documents", help="documents folder")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_ROOT, help="snapshot root directory")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks embedded per call")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    directory = build_snapshot(args.docs, args.backend, args.output, batch_size=args.batch_size)
+    print(f"Wrote index snapshot to {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Hi-Lo card counting.
+
+A CountState follows one shoe: feed it every card that is exposed, one at a time
+or in batches, and it keeps the running count, the remaining-deck estimate and
+the true count in constant time per card. Pass its true count to get_action to
+play the index plays in strategy_table.
+
+States are small __slots__ objects, so one process can track hundreds of tables:
+    state = CountState(RuleSet(decks=6))
+    state.see_many(['K', 5, 'A', 9])
+    state.get_action('hard', 16, 10)
+"""
+
+from rules import DEFAULT_RULES
+from strategy_table import card_value, get_action, should_take_insurance
+
+CARDS_PER_DECK = 52
+
+# Hi-Lo tags by card value (index 1 and 11 are the Ace): 2-6 count +1,
+# 7-9 count 0, tens and Aces count -1
+HI_LO_TAGS = (0, -1, 1, 1, 1, 1, 1, 0, 0, 0, -1, -1)
+
+# Floor for the remaining-deck estimate so the true count stays bounded at the
+# very end of a shoe
+_MIN_DECKS_REMAINING = 0.25
+
+
+class CountState:
+    """
+    Running Hi-Lo count for one shoe.
+
+    Attributes:
+        rules: Table rules; the shoe size comes from rules.decks
+        running_count: Sum of the Hi-Lo tags of every card seen since the shuffle
+        cards_seen: Number of cards seen since the shuffle
+    """
+
+    __slots__ = ('rules', 'running_count', 'cards_seen')
+
+    def __init__(self, rules=None):
+        self.rules = rules or DEFAULT_RULES
+        self.running_count = 0
+        self.cards_seen = 0
+
+    def __repr__(self):
+        return (f"CountState(running_count={self.running_count}, cards_seen={self.cards_seen}, "
+                f"true_count={self.true_count:.2f})")
+
+    @property
+    def total_cards(self) -> int:
+        return self.rules.decks * CARDS_PER_DECK
+
+    @property
+    def decks_remaining(self) -> float:
+        """Decks left in the shoe, never less than a quarter deck"""
+        return max((self.total_cards - self.cards_seen) / CARDS_PER_DECK, _MIN_DECKS_REMAINING)
+
+    @property
+    def true_count(self) -> float:
+        """Running count per remaining deck"""
+        return self.running_count / self.decks_remaining
+
+    def see(self, card) -> None:
+        """
+        Count one exposed card.
+
+        Args:
+            card: Card as accepted by strategy_table.card_value, e.g. 10, 11, 'A', 'K'
+
+        Raises:
+            ValueError: If the card is invalid or the shoe has no cards left
+        """
+        if type(card) is int and 1 <= card <= 11:
+            tag = HI_LO_TAGS[card]
+        else:
+            tag = HI_LO_TAGS[card_value(card)]
+        if self.cards_seen >= self.total_cards:
+            raise ValueError(f"All {self.total_cards} cards in the shoe have been seen. Call shuffle() to start a new shoe")
+        self.running_count += tag
+        self.cards_seen += 1
+
+    def see_many(self, cards) -> None:
+        """Count a batch of exposed cards, e.g. everything dealt in one round"""
+        for card in cards:
+            self.see(card)
+
+    def shuffle(self) -> None:
+        """Reset the count for a fresh shoe"""
+        self.running_count = 0
+        self.cards_seen = 0
+
+    def get_action(self, hand_type: str, player_value: int, dealer_upcard: int) -> str:
+        """Action for a hand at the current true count, including index plays"""
+        return get_action(hand_type, player_value, dealer_upcard, self.rules, true_count=self.true_count)
+
+    def take_insurance(self) -> bool:
+        """Whether insurance is worth taking at the current true count"""
+        return should_take_insurance(self.true_count)
@@ -0,0 +1,88 @@
+"""
+Precomputed explanations for every strategy table cell.
+
+"Why?" questions about a single (hand type, total, upcard) cell are the most
+common Grok traffic, so build_explanations.py generates a grounded explanation
+for each cell once, offline, and stores them in a versioned JSON artifact:
+
+    {"version": 1, "model": "...", "generated": "...",
+     "cells": {"hard:16:10": {"action": "H", "text": "..."}, ...}}
+
+Lookups are a dict access. An entry is only served for the action it was
+written for, so a cell whose action changes (another rule set, an edited
+table) falls back to the templated explanation instead of contradicting it.
+"""
+
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Iterator, Optional
+
+EXPLANATIONS_VERSION = 1
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "explanations.json")
+
+
+def explanations_path() -> str:
+    """Artifact location, overridable with the GROK21_EXPLANATIONS environment variable"""
+    return os.getenv("GROK21_EXPLANATIONS", DEFAULT_PATH)
+
+
+def cell_key(hand_type: str, total: int, dealer_upcard: int) -> str:
+    return f"{hand_type}:{total}:{dealer_upcard}"
+
+
+def table_cells() -> Iterator[tuple]:
+    """Every (hand_type, total, dealer_upcard, action) cell of the default strategy tables"""
+    from strategy_table import hard_table, pairs_table, soft_table
+
+    for hand_type, table in (('hard', hard_table), ('soft', soft_table), ('pair', pairs_table)):
+        for total, row in table.items():
+            for upcard, action in row.items():
+                yield hand_type, total, upcard, action
+
+
+@lru_cache(maxsize=4)
+def load_explanations(path: Optional[str] = None) -> dict:
+    """
+    Cells of an explanations artifact, keyed by cell_key.
+
+    Returns:
+        Dict of cell key to {"action", "text"}; empty if the artifact is missing,
+        unreadable or from another format version
+    """
+    path = path or explanations_path()
+    try:
+        with open(path) as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        logging.info(f"No precomputed explanations at {path}; using templated explanations")
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable explanations artifact {path}: {e}")
+        return {}
+    if artifact.get('version') != EXPLANATIONS_VERSION:
+        logging.warning(f"Ignoring explanations artifact {path}: version {artifact.get('version')}, "
+                        f"expected {EXPLANATIONS_VERSION}. Rebuild it with build_explanations.py")
+        return {}
+    return artifact.get('cells', {})
+
+
+def get_explanation(hand_type: str, total: int, dealer_upcard: int, action: str,
+                    path: Optional[str] = None) -> Optional[str]:
+    """Precomputed explanation of a cell, or None if there is none for this action"""
+    entry = load_explanations(path).get(cell_key(hand_type, total, dealer_upcard))
+    if entry is None or entry.get('action') != action:
+        return None
+    return entry.get('text')
+
+
+def write_explanations(path: str, cells: dict, model: str, generated: str) -> None:
+    """Write an explanations artifact atomically"""
+    artifact = {'version': EXPLANATIONS_VERSION, 'model': model, 'generated': generated, 'cells': cells}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(artifact, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+    load_explanations.cache_clear()
@@ -0,0 +1,113 @@
+"""
+Token-aware context packing.
+
+Retrieved chunks overlap by CHUNK_OVERLAP characters and the same advice often
+appears in several documents, so packing every hit pays for near-duplicate
+text more than once. pack_contexts walks the chunks in maximal-marginal-
+relevance order: each pick balances the chunk's fused retrieval score against
+its word overlap (Jaccard similarity) with what is already packed. Near
+duplicates are dropped, and chunks are added whole until the token budget is
+spent; unlike cutting the joined text at a fixed length, this never drops the
+end of the most relevant chunk to make room for a less relevant one.
+"""
+
+import math
+import re
+from typing import List
+
+# Context windows of the Grok models we use, in tokens
+MODEL_CONTEXT_TOKENS = {
+    'grok-3': 131_072,
+    'grok-3-mini': 131_072,
+    'grok-3-fast': 131_072,
+    'grok-3-mini-fast': 131_072,
+    'grok-4': 256_000,
+}
+DEFAULT_CONTEXT_TOKENS = 32_768
+
+# Context is capped well below the window: past a few chunks, more context adds
+# latency and cost but not better answers
+MAX_CONTEXT_TOKENS = 1200
+# Room kept for the instructions and the question around the context
+PROMPT_OVERHEAD_TOKENS = 200
+
+MMR_LAMBDA = 0.7
+# Chunks at least this similar to one already packed are dropped outright
+DUPLICATE_SIMILARITY = 0.8
+
+# Rough tokens per character for English text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def context_budget(model: str, max_tokens: int, cap: int = MAX_CONTEXT_TOKENS) -> int:
+    """
+    Tokens available for context in one prompt.
+
+    The smaller of cap and what is left of the model's context window after
+    the answer (max_tokens) and the prompt around the context.
+    """
+    window = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    return max(0, min(cap, window - max_tokens - PROMPT_OVERHEAD_TOKENS))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def pack_contexts(results: List[tuple], budget: int, mmr_lambda: float = MMR_LAMBDA,
+                  duplicate_similarity: float = DUPLICATE_SIMILARITY) -> List[str]:
+    """
+    Choose and order chunk texts for a prompt.
+
+    Args:
+        results: (Document, relevance score) tuples, e.g. from fuse_results
+        budget: Token budget for the packed context
+        mmr_lambda: Weight of relevance against novelty (1.0 ignores redundancy)
+        duplicate_similarity: Jaccard similarity at which a chunk counts as a duplicate
+
+    Returns:
+        Chunk texts in the order they were picked, most relevant first
+    """
+    candidates = []
+    seen = set()
+    for document, score in results:
+        text = document.page_content.strip()
+        if text and text not in seen:
+            seen.add(text)
+            candidates.append((text, float(score), frozenset(word.lower() for word in _WORD.findall(text))))
+    if not candidates or budget <= 0:
+        return []
+
+    top = max(score for _, score, _ in candidates) or 1.0
+    relevance = [score / top for _, score, _ in candidates]
+    # Highest similarity of each candidate to anything packed so far
+    redundancy = [0.0] * len(candidates)
+    remaining = set(range(len(candidates)))
+    packed, used = [], 0
+
+    while remaining:
+        best = max(remaining, key=lambda i: (mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy[i], -i))
+        remaining.discard(best)
+        text, _, words = candidates[best]
+        if redundancy[best] >= duplicate_similarity:
+            continue
+        cost = estimate_tokens(text)
+        if used + cost > budget:
+            if not packed:
+                # The best chunk alone is over budget: keep as much of it as fits
+                packed.append(text[:budget * CHARS_PER_TOKEN])
+                break
+            continue
+        packed.append(text)
+        used += cost
+        for i in remaining:
+            redundancy[i] = max(redundancy[i], jaccard(words, candidates[i][2]))
+    return packed
@@ -0,0 +1,79 @@
+"""
+Document corpus for retrieval.
+
+Loading and chunking live here so the RAG chain, index builds and the
+embedding evaluation all split the documents the same way.
+"""
+
+import hashlib
+import logging
+import os
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+from embedding_backends import EmbeddingBackend, get_backend
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+SOURCE_EXTENSIONS = (".pdf", ".txt")
+# Bump when ingestion changes in a way the other manifest fields don't capture
+MANIFEST_VERSION = 1
+
+
+def source_files(docs_folder: str) -> list:
+    """Names of the PDF and TXT files in a folder, sorted"""
+    return sorted(filename for filename in os.listdir(docs_folder) if filename.endswith(SOURCE_EXTENSIONS))
+
+
+def load_documents(docs_folder: str) -> list:
+    """Load every source file; unreadable files are logged and skipped"""
+    docs = []
+    for filename in source_files(docs_folder):
+        filepath = os.path.join(docs_folder, filename)
+        try:
+            if filename.endswith(".pdf"):
+                loader = PyPDFLoader(filepath)
+                docs.extend(loader.load())
+            elif filename.endswith(".txt"):
+                loader = TextLoader(filepath)
+                docs.extend(loader.load())
+        except Exception as e:
+            logging.warning(f"Failed to load {filepath}: {e}")
+    return docs
+
+
+def load_chunks(docs_folder: str) -> list:
+    """
+    Load and split the corpus into retrieval chunks.
+
+    Raises:
+        ValueError: If the folder has no readable documents
+    """
+    docs = load_documents(docs_folder)
+    if not docs:
+        raise ValueError(f"No readable documents found in {docs_folder}/. Add Blackjack PDF or TXT files.")
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_documents(docs)
+
+
+def build_manifest(docs_folder: str, backend: EmbeddingBackend = None) -> dict:
+    """
+    Describe everything an index is built from.
+
+    Hashes the content of every source file, so an edited, added or removed
+    document changes the manifest even if its name and size stay the same.
+    """
+    backend = backend or get_backend()
+    sources = {}
+    for filename in source_files(docs_folder):
+        with open(os.path.join(docs_folder, filename), 'rb') as f:
+            sources[filename] = hashlib.sha256(f.read()).hexdigest()
+    return {
+        'version': MANIFEST_VERSION,
+        'embedding_model': backend.cache_key,
+        'collection': backend.collection,
+        'chunk_size': CHUNK_SIZE,
+        'chunk_overlap': CHUNK_OVERLAP,
+        'sources': sources,
+    }
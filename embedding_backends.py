@@ -0,0 +1,83 @@
+"""
+Embedding model backends.
+
+The RAG chain's embedding model is picked by name with the EMBEDDING_BACKEND
+setting. Larger models retrieve a little better; smaller and quantized ones
+load faster, embed queries faster and use far less memory. Each backend has its
+own Chroma collection and cache key, so indexes and cached vectors from
+different models never mix. eval_embeddings.py compares them on our corpus.
+"""
+
+from dataclasses import dataclass
+
+DEFAULT_BACKEND = "bge-large"
+
+
+@dataclass(frozen=True)
+class EmbeddingBackend:
+    """
+    An embedding model and how to run it.
+
+    Attributes:
+        name: Backend name used in settings
+        model_name: Model identifier for the runtime
+        runtime: 'sentence-transformers' (PyTorch) or 'fastembed' (ONNX Runtime)
+        collection: Chroma collection holding this model's index
+        description: One-line summary for reports
+    """
+    name: str
+    model_name: str
+    runtime: str
+    collection: str
+    description: str
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies the vectors this backend produces, for caches and manifests"""
+        if self.runtime == 'sentence-transformers':
+            return self.model_name
+        return f"{self.model_name}@{self.runtime}"
+
+    def create(self):
+        """
+        Load the model.
+
+        Raises:
+            ImportError: If the runtime's package is not installed
+        """
+        if self.runtime == 'fastembed':
+            try:
+                from langchain_community.embeddings import FastEmbedEmbeddings
+                return FastEmbedEmbeddings(model_name=self.model_name)
+            except ImportError as e:
+                raise ImportError(f"The {self.name} embedding backend needs fastembed: pip install fastembed") from e
+
+        from langchain_huggingface import HuggingFaceEmbeddings
+        device = 'cpu'  # Force CPU for Streamlit Cloud compatibility
+        return HuggingFaceEmbeddings(model_name=self.model_name, model_kwargs={'device': device})
+
+
+EMBEDDING_BACKENDS = {backend.name: backend for backend in (
+    # 'langchain' is Chroma's default collection, which the committed index uses
+    EmbeddingBackend("bge-large", "BAAI/bge-large-en-v1.5", "sentence-transformers", "langchain",
+                     "335M parameters, 1024 dimensions, fp32 PyTorch"),
+    EmbeddingBackend("bge-base", "BAAI/bge-base-en-v1.5", "sentence-transformers", "grok21-bge-base",
+                     "109M parameters, 768 dimensions, fp32 PyTorch"),
+    EmbeddingBackend("bge-small", "BAAI/bge-small-en-v1.5", "sentence-transformers", "grok21-bge-small",
+                     "33M parameters, 384 dimensions, fp32 PyTorch"),
+    EmbeddingBackend("bge-small-int8", "BAAI/bge-small-en-v1.5", "fastembed", "grok21-bge-small-int8",
+                     "33M parameters, 384 dimensions, int8-quantized ONNX Runtime"),
+)}
+
+
+def get_backend(name: str = None) -> EmbeddingBackend:
+    """
+    Look up a backend by name (defaults to DEFAULT_BACKEND).
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    backend = EMBEDDING_BACKENDS.get(name or DEFAULT_BACKEND)
+    if backend is None:
+        raise ValueError(f"Unknown embedding backend: {name}. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+    return backend
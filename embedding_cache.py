@@ -0,0 +1,196 @@
+"""
+Query embedding cache.
+
+CachedEmbeddings wraps an embeddings object and remembers query vectors in two
+levels: a bounded in-memory LRU, backed by a SQLite store on disk that survives
+restarts and is shared by every process on the machine. Entries are keyed by
+(model name, normalized text), so switching embedding models never serves stale
+vectors. Document embedding (index builds) passes straight through.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "embeddings.sqlite3")
+
+# Check the disk store size every this many inserts rather than on every one
+_EVICTION_INTERVAL = 256
+
+
+def cache_path() -> str:
+    """Disk store location, overridable with the GROK21_EMBEDDING_CACHE environment variable"""
+    return os.getenv("GROK21_EMBEDDING_CACHE", DEFAULT_CACHE_PATH)
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: case-folded, with runs of whitespace collapsed"""
+    return ' '.join(text.split()).casefold()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches query vectors in memory and on disk.
+
+    Args:
+        embeddings: The embeddings object doing the actual work
+        model_name: Name of the embedding model; part of every cache key
+        max_entries: Vectors kept in the in-memory LRU
+        max_disk_entries: Vectors kept on disk; the least recently used are evicted
+        path: SQLite file for the disk store (defaults to cache_path())
+        persist: Set to False for a memory-only cache
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, max_entries: int = 1024,
+                 max_disk_entries: int = 100_000, path: Optional[str] = None, persist: bool = True):
+        if max_entries < 1 or max_disk_entries < 1:
+            raise ValueError("Cache sizes must be at least 1")
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._db = self._open_store(path or cache_path()) if persist else None
+
+    def _open_store(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL,
+                PRIMARY KEY (model, text))""")
+            db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            logging.warning(f"Embedding cache store {path} unavailable, caching in memory only: {e}")
+            return None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+            vector = self._read(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+                return vector
+            self.misses += 1
+
+        # Embed outside the lock so other queries are not held up by the model
+        vector = list(self.embeddings.embed_query(text))
+        with self._lock:
+            self._remember(key, vector)
+            self._write(key, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, computing every cache miss in one batch.
+
+        Misses go through the wrapped model's embed_documents, which for
+        HuggingFaceEmbeddings is the same computation as embed_query.
+        """
+        keys = [normalize_query(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                elif key in missing:
+                    # Repeated in this batch; counted and embedded once
+                    self.memory_hits += 1
+                else:
+                    vector = self._read(key)
+                    if vector is not None:
+                        self.disk_hits += 1
+                        self._remember(key, vector)
+                    else:
+                        self.misses += 1
+                        missing[key] = texts[i]
+                vectors[i] = vector
+
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            computed = {key: list(vector) for key, vector in zip(missing, embedded)}
+            with self._lock:
+                for key, vector in computed.items():
+                    self._remember(key, vector)
+                    self._write(key, vector)
+            vectors = [vector if vector is not None else computed[key] for key, vector in zip(keys, vectors)]
+        return vectors
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE model = ? AND text = ?",
+                                   (self.model_name, key)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?",
+                             (time.time(), self.model_name, key))
+            self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Embedding cache read failed: {e}")
+            return None
+        return array('f', row[0]).tolist()
+
+    def _write(self, key: str, vector: List[float]) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                             (self.model_name, key, array('f', vector).tobytes(), time.time()))
+            self._inserts += 1
+            if self._inserts % _EVICTION_INTERVAL == 0:
+                self._evict()
+            self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Embedding cache write failed: {e}")
+
+    def _evict(self) -> None:
+        """Drop the least recently used vectors beyond max_disk_entries"""
+        self._db.execute("""DELETE FROM embeddings WHERE rowid IN (
+            SELECT rowid FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.max_disk_entries,))
+
+    def stats(self) -> dict:
+        """Hit and miss counters for monitoring"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
@@ -0,0 +1,410 @@
+"""
+Exact expected-value calculator for blackjack decisions.
+
+Computes the EV of standing, hitting, doubling and splitting for a player hand
+against a dealer upcard by full combinatorial recursion over the remaining shoe.
+Every card the player and dealer draw is removed from the shoe, so results are
+composition-dependent rather than infinite-deck approximations.
+
+The ways the dealer can finish from each upcard are enumerated once, grouped by
+the multiset of cards drawn, so a dealer distribution for any shoe is a single
+vectorized sum over those groups; distributions are memoized by upcard and
+shoe. Player recursion is memoized by hand state and shoe, which is the card
+composition the player has removed, so hands reached from different starting
+cells share their work and a repeated query is a cache hit.
+
+Conventions:
+    - Cards are 2-11 as in strategy_table (11 is the Ace); 1 is accepted for an Ace.
+    - The dealer peeks for blackjack, so EVs are conditioned on the dealer not
+      having a natural (US rules).
+    - Splits are valued without resplitting, and both split hands are valued
+      against the same shoe (the usual single-split approximation). Split Aces
+      receive one card each.
+    - Late surrender, when the rules allow it, is worth exactly -0.5.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from rules import DEFAULT_RULES, RuleSet
+from strategy_table import get_action, get_action_text
+
+# Dealer outcome order in distributions returned by dealer_outcomes
+DEALER_OUTCOMES = (17, 18, 19, 20, 21, 'bust')
+_BUST = 5
+
+
+def _rank(card) -> int:
+    """Convert a card value (2-11, or 1 for an Ace) to a rank 1-10 with Ace = 1"""
+    if not isinstance(card, int) or card < 1 or card > 11:
+        raise ValueError(f"Invalid card: {card}. Must be between 2 and 11 (where 11 represents Ace)")
+    return 1 if card == 11 else card
+
+
+def shoe_composition(decks: int, removed=()) -> tuple:
+    """
+    Card counts by rank (Ace first, ten-valued cards last) for a shoe.
+
+    Args:
+        decks: Number of decks in the shoe
+        removed: Cards already dealt out of the shoe
+
+    Raises:
+        ValueError: If more copies of a card are removed than the shoe holds
+    """
+    counts = [4 * decks] * 9 + [16 * decks]
+    for card in removed:
+        rank = _rank(card)
+        counts[rank - 1] -= 1
+        if counts[rank - 1] < 0:
+            raise ValueError(f"Cannot remove card {card}: no copies left in a {decks}-deck shoe")
+    return tuple(counts)
+
+
+def _draw(shoe: tuple, index: int) -> tuple:
+    """Shoe with one card of the given rank index removed"""
+    return shoe[:index] + (shoe[index] - 1,) + shoe[index + 1:]
+
+
+def _dealer_final(hard: int, ace: bool, hits_soft_17: bool):
+    """Index into DEALER_OUTCOMES if the dealer's hand is finished, None if the dealer draws"""
+    total = hard + 10 if ace and hard <= 11 else hard
+    if total > 21:
+        return _BUST
+    if total >= 17 and not (hits_soft_17 and total == 17 and hard == 7):
+        return total - 17
+    return None
+
+
+# _dealer_final as a lookup table, indexed [hits_soft_17][ace][hard count]; the
+# dealer draws from at most hard 16, so the count never passes 26
+_DEALER_FINAL = tuple(tuple(tuple(_dealer_final(hard, ace, h17) for hard in range(27))
+                            for ace in (False, True)) for h17 in (False, True))
+
+
+def _peek_excluded(up: int) -> Optional[int]:
+    """Rank index the hole card can't be once the dealer has peeked: a ten under an Ace, an Ace under a ten"""
+    return 9 if up == 1 else 0 if up == 10 else None
+
+
+@lru_cache(maxsize=None)
+def _dealer_draws(up: int, hits_soft_17: bool) -> tuple:
+    """
+    Every way the dealer can finish from an upcard, independent of the shoe.
+
+    Hands are grouped by the multiset of cards drawn. The probability of drawing
+    a given multiset in one particular order depends only on the multiset, so
+    each group needs just the number of orders that finish exactly on its last
+    card. dealer_outcomes then values every group against a shoe at once.
+
+    Returns:
+        Tuple of (draws, orders, outcomes): an (n, 10) array of cards drawn per
+        rank, the number of draw orders per multiset, and each multiset's index
+        into DEALER_OUTCOMES
+    """
+    excluded = _peek_excluded(up)
+    finals = _DEALER_FINAL[hits_soft_17]
+    frontier = {(0,) * 10: (up, up == 1, 1)}
+    finished = {}
+    while frontier:
+        following = {}
+        for drawn, (hard, ace, orders) in frontier.items():
+            hole = not any(drawn)
+            for index in range(10):
+                if hole and index == excluded:
+                    continue
+                new = drawn[:index] + (drawn[index] + 1,) + drawn[index + 1:]
+                new_hard, new_ace = hard + index + 1, ace or index == 0
+                outcome = finals[new_ace][new_hard]
+                if outcome is None:
+                    previous = following.get(new)
+                    following[new] = (new_hard, new_ace, orders + (previous[2] if previous else 0))
+                else:
+                    previous = finished.get(new)
+                    finished[new] = (outcome, orders + (previous[1] if previous else 0))
+        frontier = following
+    draws = np.array(list(finished), dtype=np.intp)
+    orders = np.array([float(orders) for _, orders in finished.values()])
+    outcomes = np.array([outcome for outcome, _ in finished.values()], dtype=np.intp)
+    return draws, orders, outcomes
+
+
+@lru_cache(maxsize=1 << 16)
+def dealer_outcomes(upcard: int, shoe: tuple, hits_soft_17: bool = False) -> tuple:
+    """
+    Probabilities of the dealer finishing on 17, 18, 19, 20, 21 or busting.
+
+    Args:
+        upcard: Dealer's visible card (2-11, where 11 represents Ace)
+        shoe: Remaining shoe composition, with the upcard already removed
+        hits_soft_17: True if the dealer hits soft 17
+
+    Returns:
+        Tuple of six probabilities in DEALER_OUTCOMES order, conditioned on the
+        dealer not having blackjack
+    """
+    up = _rank(upcard)
+    draws, orders, outcomes = _dealer_draws(up, hits_soft_17)
+    counts = np.array(shoe, dtype=float)
+    cards = counts.sum()
+
+    # Drawing d cards of a rank from c multiplies the numerator by the falling
+    # factorial c (c - 1) ... (c - d + 1); a multiset of k cards divides by
+    # cards (cards - 1) ... (cards - k + 1). Having peeked, the dealer's hole card
+    # is drawn from the shoe minus the excluded rank.
+    depth = int(draws.max())
+    falling = np.ones((10, depth + 1))
+    falling[:, 1:] = np.cumprod(np.maximum(counts[:, None] - np.arange(depth), 0), axis=1)
+    lengths = draws.sum(axis=1)
+    denominators = np.ones(int(lengths.max()) + 1)
+    denominators[1:] = np.cumprod(cards - np.arange(int(lengths.max())))
+    excluded = _peek_excluded(up)
+    if excluded is not None:
+        denominators[1:] *= (cards - counts[excluded]) / cards
+
+    probabilities = orders * falling[np.arange(10), draws].prod(axis=1) / denominators[lengths]
+    return tuple(np.bincount(outcomes, weights=probabilities, minlength=6).tolist())
+
+
+@lru_cache(maxsize=1 << 18)
+def _stand_ev(total: int, upcard: int, shoe: tuple, hits_soft_17: bool) -> float:
+    """EV of standing on a total"""
+    if total > 21:
+        return -1.0
+    distribution = dealer_outcomes(upcard, shoe, hits_soft_17)
+    ev = distribution[_BUST]
+    for outcome, dealer_total in enumerate(DEALER_OUTCOMES[:_BUST]):
+        if total > dealer_total:
+            ev += distribution[outcome]
+        elif total < dealer_total:
+            ev -= distribution[outcome]
+    return ev
+
+
+def _total(hard: int, ace: bool) -> int:
+    return hard + 10 if ace and hard <= 11 else hard
+
+
+def _hit_dominates(total: int, hard: int) -> bool:
+    """
+    Whether hitting is at least as good as standing, so standing needn't be valued.
+
+    Standing below 17 wins only when the dealer busts, and an unseen card leaves
+    the dealer's bust chance unchanged on average, so a hit that can't bust (hard
+    count 11 or less) is never worse than standing on 16 or less.
+    """
+    return total < 17 and hard <= 11
+
+
+@lru_cache(maxsize=1 << 18)
+def _hit_ev(hard: int, ace: bool, upcard: int, shoe: tuple, hits_soft_17: bool) -> float:
+    """EV of taking one card and then playing optimally (hit or stand)"""
+    remaining = sum(shoe)
+    ev = 0.0
+    for index, count in enumerate(shoe):
+        if not count:
+            continue
+        weight = count / remaining
+        new_hard, new_ace = hard + index + 1, ace or index == 0
+        total = _total(new_hard, new_ace)
+        if total > 21:
+            ev -= weight
+            continue
+        after = _draw(shoe, index)
+        if _hit_dominates(total, new_hard):
+            best = _hit_ev(new_hard, new_ace, upcard, after, hits_soft_17)
+        else:
+            best = _stand_ev(total, upcard, after, hits_soft_17)
+            if total < 21:
+                best = max(best, _hit_ev(new_hard, new_ace, upcard, after, hits_soft_17))
+        ev += weight * best
+    return ev
+
+
+def _double_ev(hard: int, ace: bool, upcard: int, shoe: tuple, hits_soft_17: bool) -> float:
+    """EV of doubling: one card, then stand, at twice the bet"""
+    remaining = sum(shoe)
+    ev = 0.0
+    for index, count in enumerate(shoe):
+        if count:
+            total = _total(hard + index + 1, ace or index == 0)
+            ev += count / remaining * _stand_ev(total, upcard, _draw(shoe, index), hits_soft_17)
+    return 2.0 * ev
+
+
+def _split_ev(rank: int, upcard: int, shoe: tuple, rules: RuleSet) -> float:
+    """EV of splitting a pair of the given rank into two hands (no resplits)"""
+    h17 = rules.dealer_hits_soft_17
+    remaining = sum(shoe)
+    hand_ev = 0.0
+    for index, count in enumerate(shoe):
+        if not count:
+            continue
+        hard, ace = rank + index + 1, rank == 1 or index == 0
+        after = _draw(shoe, index)
+        total = _total(hard, ace)
+        if rank != 1 and _hit_dominates(total, hard):
+            best = _hit_ev(hard, ace, upcard, after, h17)
+        else:
+            best = _stand_ev(total, upcard, after, h17)
+            if rank != 1 and total < 21:
+                best = max(best, _hit_ev(hard, ace, upcard, after, h17))
+        if rank != 1 and rules.double_after_split:
+            best = max(best, _double_ev(hard, ace, upcard, after, h17))
+        hand_ev += count / remaining * best
+    return 2.0 * hand_ev
+
+
+def expected_values(cards, dealer_upcard: int, rules: RuleSet = DEFAULT_RULES, allow_split: bool = True) -> dict:
+    """
+    Exact EV of each available action for a player hand.
+
+    Args:
+        cards: Player's cards, e.g. [10, 6] or [11, 3, 4]
+        dealer_upcard: Dealer's visible card (2-11, where 11 represents Ace)
+        rules: Table rules (deck count, S17/H17, DAS)
+        allow_split: Set to False to value a pair as an ordinary hand
+
+    Returns:
+        Dict of EV per initial bet keyed by action code: 'S' and 'H' always,
+        'D' for two-card hands, 'P' for splittable pairs and 'R' for two-card
+        hands in late surrender games
+
+    Raises:
+        ValueError: If a card is invalid or the hand is already bust
+    """
+    ranks = [_rank(card) for card in cards]
+    if len(ranks) < 2:
+        raise ValueError("A hand needs at least two cards")
+    up = _rank(dealer_upcard)
+    hard, ace = sum(ranks), 1 in ranks
+    total = _total(hard, ace)
+    if total > 21:
+        raise ValueError(f"Hand total {total} is bust - no strategy needed")
+
+    shoe = shoe_composition(rules.decks, ranks + [up])
+    h17 = rules.dealer_hits_soft_17
+    values = {
+        'S': _stand_ev(total, up, shoe, h17),
+        'H': _hit_ev(hard, ace, up, shoe, h17) if total < 21 else -1.0,
+    }
+    if len(ranks) == 2:
+        values['D'] = _double_ev(hard, ace, up, shoe, h17)
+        if allow_split and ranks[0] == ranks[1] and rules.max_split_hands > 1:
+            values['P'] = _split_ev(ranks[0], up, shoe, rules)
+        if rules.late_surrender:
+            values['R'] = -0.5
+    return values
+
+
+def cell_cards(hand_type: str, player_value: int) -> list:
+    """
+    Representative two-card hand for a strategy table cell (three cards for hard 21).
+
+    Raises:
+        ValueError: If the cell is not in the strategy tables
+    """
+    hand_type = hand_type.lower()
+    if hand_type == 'hard' and 5 <= player_value <= 21:
+        if player_value <= 11:
+            return [player_value - 2, 2]
+        if player_value <= 20:
+            return [10, player_value - 10]
+        return [10, 5, 6]
+    if hand_type == 'soft' and 13 <= player_value <= 20:
+        return [11, player_value - 11]
+    if hand_type == 'pair' and player_value in (4, 6, 8, 10, 12, 14, 16, 18, 20, 22):
+        card = 11 if player_value == 22 else player_value // 2
+        return [card, card]
+    raise ValueError(f"No strategy table cell for {hand_type} {player_value}")
+
+
+def cell_expected_values(hand_type: str, player_value: int, dealer_upcard: int,
+                         rules: RuleSet = DEFAULT_RULES) -> dict:
+    """Exact EVs for a strategy table cell, valued on its representative hand"""
+    return expected_values(cell_cards(hand_type, player_value), dealer_upcard, rules,
+                           allow_split=hand_type.lower() == 'pair')
+
+
+def best_action(values: dict) -> str:
+    """
+    Table action code for a set of EVs.
+
+    Doubling is reported as 'D' when hitting is the better fallback and 'Ds'
+    when standing is, matching the strategy table codes. Surrender is reported
+    as 'Rh', 'Rs' or 'Rp' after the best play once surrender is no longer allowed.
+    """
+    best = max(values, key=values.get)
+    if best == 'R':
+        fallback = best_action({code: ev for code, ev in values.items() if code not in ('R', 'D')})
+        return {'H': 'Rh', 'S': 'Rs', 'P': 'Rp'}[fallback]
+    if best == 'D' and values['S'] > values['H']:
+        return 'Ds'
+    return best
+
+
+def describe_margin(hand_type: str, player_value: int, dealer_upcard: int, action: str,
+                    rules: RuleSet = DEFAULT_RULES) -> str:
+    """
+    One-sentence EV margin of a table action over its best alternative,
+    e.g. "Hit beats Pass by 0.043 units."
+    """
+    return _margin_sentence(cell_expected_values(hand_type, player_value, dealer_upcard, rules), action)
+
+
+def describe_cards_margin(cards, dealer_upcard: int, action: str, rules: RuleSet = DEFAULT_RULES) -> str:
+    """describe_margin for an actual hand, valued on its exact cards"""
+    return _margin_sentence(expected_values(cards, dealer_upcard, rules), action)
+
+
+def _margin_sentence(values: dict, action: str) -> str:
+    chosen = 'D' if action == 'Ds' else 'R' if action.startswith('R') else action
+    if chosen not in values:
+        return ''
+    alternative = max((code for code in values if code != chosen), key=values.get)
+    margin = values[chosen] - values[alternative]
+    amount = f"{abs(margin):.3f}" if abs(margin) >= 0.0005 else "less than 0.001"
+    if margin >= 0:
+        return f"{get_action_text(chosen)} beats {get_action_text(alternative)} by {amount} units."
+    return f"{get_action_text(alternative)} edges out {get_action_text(chosen)} by {amount} units for this exact hand."
+
+
+# Cells where the shipped table knowingly differs from the oracle. The table is a
+# total-dependent strategy, while the oracle values one representative hand per
+# cell (cell_cards); these are composition effects of that hand, not table errors.
+TOTAL_DEPENDENT_EXCEPTIONS = {
+    # 10-2 hits by 0.001, but 9-3, 8-4 and 7-5 all stand by about 0.007
+    ('hard', 12, 4),
+}
+
+
+def audit_table(rules: RuleSet = DEFAULT_RULES, include_exceptions: bool = False) -> list:
+    """
+    Check every strategy table cell against the exact EV oracle.
+
+    Args:
+        rules: Rules to value the cells under
+        include_exceptions: Also report the cells in TOTAL_DEPENDENT_EXCEPTIONS
+
+    Returns:
+        List of (hand_type, player_value, dealer_upcard, table_action, best_action, ev_loss)
+        for cells where the table action is not the EV-maximizing play
+    """
+    from strategy_table import hard_table, pairs_table, soft_table
+
+    mismatches = []
+    for hand_type, table in (('hard', hard_table), ('soft', soft_table), ('pair', pairs_table)):
+        for player_value, actions in table.items():
+            for dealer_upcard in actions:
+                if not include_exceptions and (hand_type, player_value, dealer_upcard) in TOTAL_DEPENDENT_EXCEPTIONS:
+                    continue
+                table_action = get_action(hand_type, player_value, dealer_upcard)
+                values = cell_expected_values(hand_type, player_value, dealer_upcard, rules)
+                oracle = best_action(values)
+                if oracle != table_action:
+                    chosen = 'D' if table_action == 'Ds' else table_action
+                    loss = max(values.values()) - values.get(chosen, values['H'])
+                    mismatches.append((hand_type, player_value, dealer_upcard, table_action, oracle, loss))
+    return mismatches
@@ -0,0 +1,143 @@
+"""
+Compare embedding backends on our corpus.
+
+For each backend this reports retrieval recall@k on the labelled questions in
+data/eval/queries.jsonl, p50/p95 latency to embed one query, model load time and
+resident memory. Each backend runs in a fresh process so memory numbers are not
+polluted by the models measured before it.
+
+    python eval_embeddings.py
+    python eval_embeddings.py --backends bge-small bge-small-int8 --k 1 3 --json
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from corpus import load_chunks
+from embedding_backends import EMBEDDING_BACKENDS, get_backend
+
+DEFAULT_QUERIES = os.path.join("data", "eval", "queries.jsonl")
+
+
+def load_queries(path: str) -> list:
+    """
+    Read labelled questions.
+
+    Each line is {"query": ..., "relevant": [...]}; a retrieved chunk is relevant
+    when it contains any of the "relevant" phrases (case-insensitive).
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def resident_memory_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def evaluate(embeddings, chunks: list, queries: list, ks=(1, 3, 5)) -> dict:
+    """
+    Recall@k and per-query embed latency for one embeddings object.
+
+    Args:
+        embeddings: Object with embed_documents and embed_query
+        chunks: Chunk texts
+        queries: Labelled questions from load_queries
+        ks: Cutoffs to report recall at
+
+    Returns:
+        Dict with recall@k for every k, and p50/p95 query latency in milliseconds
+    """
+    matrix = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    lowered = [chunk.casefold() for chunk in chunks]
+
+    latencies = []
+    hits = {k: 0 for k in ks}
+    for item in queries:
+        start = time.perf_counter()
+        vector = np.asarray(embeddings.embed_query(item['query']), dtype=np.float32)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        ranking = np.argsort(-(matrix @ (vector / np.linalg.norm(vector))))
+        phrases = [phrase.casefold() for phrase in item['relevant']]
+        first_relevant = next((rank for rank, index in enumerate(ranking)
+                               if any(phrase in lowered[index] for phrase in phrases)), None)
+        for k in ks:
+            if first_relevant is not None and first_relevant < k:
+                hits[k] += 1
+
+    report = {f"recall@{k}": hits[k] / len(queries) for k in ks}
+    report['p50_ms'] = float(np.percentile(latencies, 50))
+    report['p95_ms'] = float(np.percentile(latencies, 95))
+    return report
+
+
+def evaluate_backend(name: str, docs_folder: str, queries_path: str, ks: tuple) -> dict:
+    """Load one backend and evaluate it; runs in its own process"""
+    backend = get_backend(name)
+    chunks = [chunk.page_content for chunk in load_chunks(docs_folder)]
+    queries = load_queries(queries_path)
+
+    baseline = resident_memory_mb()
+    start = time.perf_counter()
+    embeddings = backend.create()
+    embeddings.embed_query("warm up")
+    load_seconds = time.perf_counter() - start
+
+    report = {'backend': name, 'description': backend.description, 'load_s': load_seconds}
+    report.update(evaluate(embeddings, chunks, queries, ks))
+    report['rss_mb'] = resident_memory_mb() - baseline
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends: recall@k vs latency and memory")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--docs", default="data/documents", help="documents folder")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="labelled questions (JSONL)")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5], help="recall cutoffs")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    ks = tuple(sorted(args.k))
+    reports = []
+    for name in args.backends:
+        # A fresh process per backend keeps the memory numbers independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            try:
+                reports.append(pool.submit(evaluate_backend, name, args.docs, args.queries, ks).result())
+            except Exception as e:
+                reports.append({'backend': name, 'error': f"{type(e).__name__}: {e}"})
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    recall_columns = [f"recall@{k}" for k in ks]
+    print(f"{'backend':<16}" + ''.join(f"{column:>11}" for column in recall_columns)
+          + f"{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>9}{'load s':>8}")
+    for report in reports:
+        if 'error' in report:
+            print(f"{report['backend']:<16}  {report['error']}")
+            continue
+        print(f"{report['backend']:<16}" + ''.join(f"{report[column]:>11.2f}" for column in recall_columns)
+              + f"{report['p50_ms']:>9.1f}{report['p95_ms']:>9.1f}{report['rss_mb']:>9.0f}{report['load_s']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Pooled, resilient access to the xAI (Grok) API.
+
+- One OpenAI client per API key is shared by every chain in the process, with a
+  keep-alive connection pool and explicit connect/read timeouts. Async clients
+  are pooled the same way, one per event loop.
+- Calls are retried with exponential backoff and full jitter on rate limits,
+  timeouts, connection errors and 5xx responses, waiting at least as long as
+  the server's Retry-After header asks.
+- A circuit breaker counts those failures. After enough in a row it opens and
+  calls fail fast with CircuitOpenError, so request threads don't pile up
+  behind a degraded endpoint; after a cool-down one trial call is let through
+  and a success closes it again.
+
+The SDK's own retries are switched off so the two don't multiply.
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Callable, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+GROK_BASE_URL = "https://api.x.ai/v1"
+
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Longest Retry-After we are willing to sleep for inside a user request
+MAX_RETRY_AFTER = 20.0
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Args:
+        failure_threshold: Failures in a row that open the circuit
+        reset_timeout: Seconds the circuit stays open before a trial call is allowed
+        clock: Time source, for tests
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        if failure_threshold < 1:
+            raise ValueError("Failure threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be refused; does not use up the half-open trial"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            if self._state == self.OPEN and self._clock() - self._opened_at < self.reset_timeout:
+                return True
+            return self._trial_in_flight
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; after the cool-down, only one trial call at a time"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logging.info("Grok API recovered; closing circuit breaker")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logging.warning(f"Grok API failing ({self._failures} errors in a row); "
+                                    f"opening circuit breaker for {self.reset_timeout}s")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed in a way that says anything about the endpoint"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+# Shared by every chain: they all talk to the same endpoint
+breaker = CircuitBreaker()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient: rate limits, timeouts, connection problems and 5xx"""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, ConnectionError, TimeoutError,
+                          asyncio.TimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in _RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms), or None"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return max(0.0, float(headers['retry-after-ms']) / 1000)
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            date = email.utils.parsedate_to_datetime(value)
+            return max(0.0, date.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, error: BaseException = None, base: float = BACKOFF_BASE,
+                  cap: float = BACKOFF_CAP) -> float:
+    """
+    Seconds to wait before retry number attempt (1-based).
+
+    Exponential backoff with full jitter, raised to the server's Retry-After
+    when it asks for longer (up to MAX_RETRY_AFTER).
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+    requested = retry_after(error) if error is not None else None
+    if requested is not None:
+        delay = max(delay, min(requested, MAX_RETRY_AFTER))
+    return delay
+
+
+def call_with_retries(call: Callable, circuit: CircuitBreaker = None, max_attempts: int = MAX_ATTEMPTS,
+                      sleep: Callable[[float], None] = time.sleep):
+    """
+    Run a blocking API call with retries and the circuit breaker.
+
+    Args:
+        call: Makes the request and returns its result
+        circuit: Circuit breaker (defaults to the shared one)
+        max_attempts: Attempts including the first
+        sleep: Sleep function, for tests
+
+    Raises:
+        CircuitOpenError: If the breaker refuses the call
+        The call's last error if it is not retryable or every attempt failed
+    """
+    circuit = circuit or breaker
+    for attempt in range(1, max_attempts + 1):
+        if not circuit.allow():
+            raise CircuitOpenError("Grok API is temporarily unavailable")
+        try:
+            result = call()
+        except Exception as e:
+            if not is_retryable(e):
+                circuit.release()
+                raise
+            circuit.record_failure()
+            if attempt == max_attempts:
+                raise
+            delay = backoff_delay(attempt, e)
+            logging.warning(f"Grok API call failed ({type(e).__name__}: {e}); "
+                            f"retry {attempt}/{max_attempts - 1} in {delay:.1f}s")
+            sleep(delay)
+            continue
+        circuit.record_success()
+        return result
+
+
+async def acall_with_retries(call: Callable, circuit: CircuitBreaker = None, max_attempts: int = MAX_ATTEMPTS):
+    """Async version of call_with_retries; call returns a fresh awaitable per attempt"""
+    circuit = circuit or breaker
+    for attempt in range(1, max_attempts + 1):
+        if not circuit.allow():
+            raise CircuitOpenError("Grok API is temporarily unavailable")
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            circuit.release()
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                circuit.release()
+                raise
+            circuit.record_failure()
+            if attempt == max_attempts:
+                raise
+            delay = backoff_delay(attempt, e)
+            logging.warning(f"Grok API call failed ({type(e).__name__}: {e}); "
+                            f"retry {attempt}/{max_attempts - 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        circuit.record_success()
+        return result
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY)
+
+
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> {api key: AsyncOpenAI}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> OpenAI:
+    """Process-wide Grok client for an API key, with a keep-alive connection pool"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=GROK_BASE_URL, max_retries=0, timeout=_timeout(),
+                            http_client=httpx.Client(limits=_limits(), timeout=_timeout()))
+            _clients[api_key] = client
+        return client
+
+
+def get_async_client(api_key: str) -> AsyncOpenAI:
+    """Async Grok client for the running event loop; its connection pool is tied to that loop"""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=GROK_BASE_URL, max_retries=0, timeout=_timeout(),
+                                 http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()))
+            clients[api_key] = client
+        return client
@@ -0,0 +1,172 @@
+"""
+Prebuilt, memory-mapped retrieval index.
+
+build_index.py embeds the corpus offline and writes a snapshot directory:
+
+    manifest.json     what the index was built from (corpus.build_manifest),
+                      plus the snapshot format version, chunk count and dimension
+    chunks.jsonl      one {"id", "text", "metadata"} object per chunk
+    embeddings.npy    normalized chunk embeddings, one contiguous float16 row per chunk
+
+IndexSnapshot opens the embedding matrix read-only with np.load(mmap_mode='r'),
+so serving processes never run the embedder over the corpus and every worker
+on a machine shares one copy of the matrix through the page cache.
+"""
+
+import json
+import logging
+import os
+import shutil
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_snapshot")
+
+MANIFEST_NAME = "manifest.json"
+CHUNKS_NAME = "chunks.jsonl"
+EMBEDDINGS_NAME = "embeddings.npy"
+
+# Rows scored per step; bounds the float32 temporary made from the float16 matrix
+_SCORE_BLOCK = 8192
+
+
+def snapshot_directory(backend_name: str, root: str = DEFAULT_SNAPSHOT_ROOT) -> str:
+    """Snapshot location for an embedding backend; each backend gets its own subdirectory"""
+    return os.path.join(root, backend_name)
+
+
+def write_snapshot(directory: str, chunks: List[Document], vectors, manifest: dict) -> dict:
+    """
+    Write a snapshot, replacing any previous one at the same path.
+
+    The files are written to a sibling temporary directory that is renamed into
+    place, so a reader never sees a half-written snapshot.
+
+    Args:
+        directory: Snapshot directory
+        chunks: Chunk Documents, in the same order as vectors
+        vectors: One embedding per chunk
+        manifest: corpus.build_manifest() for the corpus and backend
+
+    Returns:
+        The snapshot manifest that was written
+
+    Raises:
+        ValueError: If there are no chunks or the vector count does not match
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if not chunks or matrix.ndim != 2 or len(matrix) != len(chunks):
+        raise ValueError(f"Need one embedding per chunk, got {len(matrix)} embeddings for {len(chunks)} chunks")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    snapshot_manifest = {
+        'snapshot_version': SNAPSHOT_VERSION,
+        'count': len(chunks),
+        'dim': int(matrix.shape[1]),
+        'dtype': 'float16',
+        'index': manifest,
+    }
+
+    directory = os.path.abspath(directory)
+    temp_directory = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_directory, ignore_errors=True)
+    os.makedirs(temp_directory)
+    np.save(os.path.join(temp_directory, EMBEDDINGS_NAME), np.ascontiguousarray(matrix, dtype=np.float16))
+    with open(os.path.join(temp_directory, CHUNKS_NAME), 'w') as f:
+        for i, chunk in enumerate(chunks):
+            f.write(json.dumps({'id': str(i), 'text': chunk.page_content, 'metadata': chunk.metadata}) + '\n')
+    with open(os.path.join(temp_directory, MANIFEST_NAME), 'w') as f:
+        json.dump(snapshot_manifest, f, indent=2, sort_keys=True)
+
+    # Swap the new snapshot in; the old one is removed only once the new one is in place
+    old_directory = f"{directory}.{os.getpid()}.old"
+    if os.path.exists(directory):
+        os.replace(directory, old_directory)
+    os.replace(temp_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+    return snapshot_manifest
+
+
+def read_snapshot_manifest(directory: str) -> Optional[dict]:
+    """Manifest of the snapshot in a directory, or None if there is none"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class IndexSnapshot:
+    """
+    Read-only vector index backed by a snapshot directory.
+
+    Args:
+        directory: Snapshot written by write_snapshot
+        embeddings: Embeds queries for search(); must be the model the snapshot
+            was built with
+
+    Raises:
+        ValueError: If the snapshot is missing, from another format version or inconsistent
+    """
+
+    def __init__(self, directory: str, embeddings=None):
+        manifest = read_snapshot_manifest(directory)
+        if manifest is None:
+            raise ValueError(f"No index snapshot in {directory}")
+        if manifest.get('snapshot_version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Index snapshot in {directory} has format version {manifest.get('snapshot_version')}, "
+                             f"expected {SNAPSHOT_VERSION}. Rebuild it with build_index.py")
+        self.directory = directory
+        self.manifest = manifest
+        self.embeddings = embeddings
+        self.vectors = np.load(os.path.join(directory, EMBEDDINGS_NAME), mmap_mode='r')
+
+        self.ids = []
+        self.documents = {}
+        with open(os.path.join(directory, CHUNKS_NAME)) as f:
+            for line in f:
+                if line.strip():
+                    chunk = json.loads(line)
+                    self.ids.append(chunk['id'])
+                    self.documents[chunk['id']] = Document(page_content=chunk['text'], metadata=chunk['metadata'] or {})
+
+        if self.vectors.shape != (manifest['count'], manifest['dim']) or len(self.ids) != manifest['count']:
+            raise ValueError(f"Index snapshot in {directory} is inconsistent: {self.vectors.shape[0]} embeddings, "
+                             f"{len(self.ids)} chunks, manifest says {manifest['count']}")
+        logging.info(f"Opened index snapshot {directory}: {len(self.ids)} chunks, dimension {manifest['dim']}")
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def index_manifest(self) -> dict:
+        """corpus.build_manifest() of the corpus the snapshot was built from"""
+        return self.manifest['index']
+
+    def query_vectors(self, vectors, k: int = 2) -> List[List[str]]:
+        """
+        Chunk ids of the k most similar chunks for each query vector, best first.
+
+        Scores are cosine similarities; the float16 matrix is scored in blocks
+        so no full float32 copy of it is ever made.
+        """
+        queries = np.asarray(vectors, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+
+        scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), _SCORE_BLOCK):
+            block = self.vectors[start:start + _SCORE_BLOCK].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rankings = []
+        for row, candidates in zip(scores, top):
+            best_first = candidates[np.argsort(-row[candidates], kind='stable')]
+            rankings.append([self.ids[i] for i in best_first])
+        return rankings
@@ -0,0 +1,179 @@
+"""
+Local intent router for hand-specific questions.
+
+Questions like "Why hit 16 vs dealer 10?" or "split 8s against an ace?" name a
+hand and a dealer upcard, so the answer is a strategy table lookup. The router
+parses them with a few regular expressions and answers from a template in
+microseconds; only questions it cannot parse go to the LLM. Explanations come
+from the precomputed per-cell artifact (cell_explanations.py) when it has one.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from cell_explanations import get_explanation
+from strategy_table import card_value, get_action, get_action_text
+
+# Card words and their plurals ("eights", "aces") mapped to card values
+_CARD_WORDS = {
+    'two': 2, 'deuce': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+    'nine': 9, 'ten': 10, 'jack': 10, 'queen': 10, 'king': 10, 'face': 10, 'ace': 11,
+}
+_CARD_WORDS.update({'sixes': 6, 'deuces': 2, **{f"{word}s": value for word, value in _CARD_WORDS.items() if word != 'six'}})
+
+_CARD = r"(?:10|11|[2-9]|a|k|q|j|t|" + '|'.join(sorted(_CARD_WORDS, key=len, reverse=True)) + r")"
+_CARD_PLURAL = r"(?:10s|[2-9]s|" + '|'.join(word for word in _CARD_WORDS if word.endswith('s')) + r")"
+
+# Words that introduce the dealer's card; everything after the first one is the dealer part
+_DEALER_MARKER = re.compile(r"\b(?:vs|v|versus|against|facing|dealer|dealers|upcard)\b")
+_UPCARD = re.compile(
+    r"^(?:\s*\b(?:a|an|the|dealer|dealers|s|up|upcard|card|of|is|shows|showing|has|with)\b)*\s*(" + _CARD + r")\b")
+
+_PAIR_SPLIT = re.compile(r"\b(?:split(?:ting)?|pair of|pair)\s+(" + _CARD_PLURAL + r"|" + _CARD + r")\b")
+_PAIR_PLURAL = re.compile(r"\b(" + _CARD_PLURAL + r")\b")
+# "10-6", "A,7", "a 7 and a 9", "ace 7" and "A7"; a bare "a 9" is an article, not an Ace
+_TWO_CARDS = re.compile(r"\b(?:an?\s+)?(" + _CARD + r")\s*(?:[-,+&/]|\band\b)\s*(?:an?\s+)?(" + _CARD + r")\b"
+                        r"|\b(ace)\s+(" + _CARD + r")\b|\b(a)(10|[2-9])\b")
+_NAMED_TOTAL = re.compile(r"\b(hard|soft)\s+(\d{1,2})\b")
+_TOTAL = re.compile(r"\b(\d{1,2})\b")
+# Questions the table can't answer even when they name a cell: the count,
+# EVs and odds, hands of three or more cards, whose play depends on the cards,
+# and rules other than the default table's (surrender, H17, deck counts, DAS)
+_NOT_A_TABLE_QUESTION = re.compile(
+    r"\b(?:count|counting|tc|rc|index|deviation|ev|evs|expected|odds|probability|chance|percent|percentage|edge)\b"
+    r"|\b(?:[3-9]|three|four|five|six|seven)[\s-]*cards?\b"
+    r"|\b(?:surrender\w*|h17|s17|das|decks?|(?:hits|stands)\s+(?:on\s+)?(?:a\s+)?soft\s+17|after\s+split\w*)\b")
+
+
+@dataclass(frozen=True)
+class HandQuestion:
+    """A hand and dealer upcard parsed from a question, in get_action conventions"""
+    hand_type: str
+    total: int
+    dealer_upcard: int
+
+    def describe(self) -> str:
+        if self.hand_type == 'pair':
+            card = 'Ace' if self.total == 22 else str(self.total // 2)
+            return f"a pair of {card}s"
+        return f"{self.hand_type} {self.total}"
+
+
+def _card(token: str) -> int:
+    token = token.strip().lower()
+    if token in _CARD_WORDS:
+        return _CARD_WORDS[token]
+    return card_value(token.rstrip('s'))
+
+
+def _parse_hand(text: str) -> Optional[tuple]:
+    """(hand_type, total) from the part of a question before the dealer's card"""
+    match = _PAIR_SPLIT.search(text)
+    if match:
+        return 'pair', 2 * _card(match.group(1))
+
+    match = _NAMED_TOTAL.search(text)
+    if match:
+        return match.group(1), int(match.group(2))
+
+    match = _TWO_CARDS.search(text)
+    if match:
+        first, second = (_card(card) for card in match.groups() if card is not None)
+        if first == second:
+            return 'pair', 2 * first
+        if 11 in (first, second):
+            return 'soft', first + second
+        return 'hard', first + second
+
+    match = _PAIR_PLURAL.search(text)
+    if match and 'split' in text:
+        return 'pair', 2 * _card(match.group(1))
+
+    # A lone number is a total; with several it's unclear which one is
+    totals = _TOTAL.findall(text)
+    if len(totals) == 1:
+        return 'hard', int(totals[0])
+    return None
+
+
+def parse_hand_question(question: str) -> Optional[HandQuestion]:
+    """
+    Pull a hand and the dealer's upcard out of a free-text question.
+
+    Returns:
+        The parsed HandQuestion, or None if the question does not name both, or
+        asks about something the table doesn't cover (the count, EVs, 3+ cards,
+        other rules, or several cells at once)
+    """
+    text = question.lower().replace("'", " ")
+    if _NOT_A_TABLE_QUESTION.search(text):
+        return None
+    # "vs dealer 10" names one upcard twice; "12 vs 2 but 12 vs 4" names two cells
+    upcards = {}
+    for marker in _DEALER_MARKER.finditer(text):
+        upcard = _UPCARD.match(text[marker.end():])
+        if upcard is not None:
+            upcards.setdefault(marker.end() + upcard.end(1), (marker, upcard))
+    if len(upcards) != 1:
+        return None
+    marker, upcard = next(iter(upcards.values()))
+    hand = _parse_hand(text[:marker.start()])
+    if hand is None:
+        return None
+    return HandQuestion(hand[0], hand[1], _card(upcard.group(1)))
+
+
+def explain(question: HandQuestion, action: str) -> str:
+    """Short templated reason for an action"""
+    hand, up = question.describe(), question.dealer_upcard
+    dealer = 'an Ace' if up == 11 else f"an {up}" if up == 8 else f"a {up}"
+    weak_dealer = up <= 6
+    if action == 'H':
+        if question.hand_type == 'hard' and question.total <= 11:
+            return "You can't bust with one more card, so take it."
+        if weak_dealer:
+            return f"{hand.capitalize()} is too weak to stand on, even against {dealer}."
+        return f"The dealer's {up if up != 11 else 'Ace'} makes a strong hand often, so standing on {hand} loses more than hitting does, bust risk included."
+    if action == 'S':
+        if weak_dealer:
+            return f"The dealer busts often with {dealer} showing, so let them take the risk."
+        return f"{hand.capitalize()} is strong enough to stand on."
+    if action in ('D', 'Ds'):
+        fallback = "stand" if action == 'Ds' else "hit"
+        return f"Against {dealer} your hand is likely to improve while the dealer is not, so get more money out. If doubling isn't allowed, {fallback}."
+    if action == 'P':
+        return f"{hand.capitalize()} plays better as two separate hands against {dealer}."
+    if action in ('Rh', 'Rs', 'Rp'):
+        return f"{hand.capitalize()} against {dealer} loses more than half the bet on average, so give up half and keep the rest."
+    return "This is the optimal play for this hand."
+
+
+def explain_cell(question: HandQuestion, action: str) -> str:
+    """Precomputed explanation of the cell when there is one for this action, otherwise the template"""
+    return (get_explanation(question.hand_type, question.total, question.dealer_upcard, action)
+            or explain(question, action))
+
+
+def route_question(question: str, rules=None) -> Optional[str]:
+    """
+    Answer a hand-specific question from the strategy table.
+
+    Args:
+        question: Free-text question
+        rules: Optional RuleSet for the lookup
+
+    Returns:
+        The templated answer, or None if the question is open-ended (or names a
+        hand the table does not cover) and should go to the LLM
+    """
+    parsed = parse_hand_question(question)
+    if parsed is None:
+        return None
+    try:
+        action = get_action(parsed.hand_type, parsed.total, parsed.dealer_upcard, rules)
+    except ValueError:
+        return None
+    dealer = 'Ace' if parsed.dealer_upcard == 11 else str(parsed.dealer_upcard)
+    return (f"**{get_action_text(action)}** with {parsed.describe()} against a dealer {dealer}. "
+            f"{explain_cell(parsed, action)}")
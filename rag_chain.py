@@ -10,86 +10,258 @@ except ImportError:
     # pysqlite3 not available, use standard sqlite3
     pass
 
+import asyncio
+import atexit
+import hashlib
 import json
 import logging
-from typing import Optional
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+from typing import Iterator, Optional
 from langchain_community.vectorstores import Chroma  # Changed from FAISS to Chroma
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from openai import OpenAI as OpenAIClient
+import openai
+from openai import AsyncOpenAI
+import grok_client
+from grok_client import CircuitOpenError, acall_with_retries, call_with_retries
+from context_packing import context_budget, pack_contexts
+from corpus import build_manifest, load_chunks
+from embedding_backends import EmbeddingBackend, get_backend
+from embedding_cache import CachedEmbeddings, normalize_query
+from index_snapshot import DEFAULT_SNAPSHOT_ROOT, IndexSnapshot, read_snapshot_manifest, snapshot_directory
+from intent_router import HandQuestion, explain_cell, route_question
+import request_coordinator
+from request_coordinator import QueueCallback
+from retrieval import build_lexical_index, fuse_results, retrieve, search
+from semantic_cache import SemanticCache
 import streamlit as st
 
 logging.basicConfig(level=logging.INFO)
 
+PERSIST_DIRECTORY = "chroma_db"
+# Written next to the Chroma files, one per embedding backend (see corpus.build_manifest)
+MANIFEST_FILE = "index_manifest-{backend}.json"
+
+# Per-stage timeouts (seconds) and retrieval concurrency for aget_response
+EXPANSION_TIMEOUT = 10.0
+RETRIEVAL_TIMEOUT = 5.0
+GENERATION_TIMEOUT = 60.0
+MAX_CONCURRENT_RETRIEVALS = 4
+
+# Shown for open questions while the circuit breaker has the Grok API marked as degraded
+DEGRADED_MESSAGE = ("Grok is temporarily unavailable, so right now I can only answer questions about a "
+                    "specific hand from the strategy table (e.g. \"hard 16 vs 10\"). Please try again in a minute.")
+
+
+def _setting(name: str, default: str = None) -> Optional[str]:
+    """Read a setting from Streamlit secrets first, then environment variables"""
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        # No secrets file, e.g. when running outside Streamlit
+        value = None
+    return value if value is not None else os.getenv(name, default)
+
+
+def resolve_config(docs_folder: str = "data/documents", model: str = None, expansion_temp: float = None,
+                   response_temp: float = None, max_tokens: int = None, embedding_backend: str = None) -> tuple:
+    """Fill unset chain options from secrets, environment variables and defaults"""
+    return (
+        docs_folder,
+        model or _setting("GROK_MODEL", "grok-3-mini"),
+        float(expansion_temp or _setting("EXPANSION_TEMP", "0.7")),
+        float(response_temp or _setting("RESPONSE_TEMP", "0.8")),
+        int(max_tokens or _setting("MAX_TOKENS", "500")),
+        get_backend(embedding_backend or _setting("EMBEDDING_BACKEND")).name,
+    )
+
+
+def parse_expansion(content: str, query: str) -> list:
+    """Sub-queries from a query expansion response, or [query] if it is not a usable JSON list"""
+    try:
+        expanded_queries = json.loads(content)
+        if not isinstance(expanded_queries, list) or not expanded_queries:
+            raise ValueError("Invalid expansion format")
+    except json.JSONDecodeError:
+        logging.warning("Failed to parse expansion response; using original query.")
+        return [query]
+    except ValueError as e:
+        logging.warning(f"Invalid expansion format: {e}; using original query.")
+        return [query]
+    return expanded_queries
+
+
+def expansion_prompt(query: str) -> str:
+    return f"Expand this Blackjack query into 2-3 related sub-queries for better retrieval. Output as JSON list: [\"subquery1\", \"subquery2\", \"subquery3\"]: {query}"
+
+
+def answer_prompt(query: str, contexts: list) -> str:
+    """Prompt for the answer; contexts are already packed to the token budget by pack_contexts"""
+    full_context = '\n\n'.join(contexts)
+    return f"Context: {full_context}\n\nQuery: {query}\nAnswer as Grok with clear reasoning:"
+
+
+def error_message(e: Exception) -> str:
+    """User-friendly message for an unexpected error while answering"""
+    error_type = type(e).__name__
+    logging.error(f"Error in get_response ({error_type}): {e}")
+    
+    if "API key" in str(e) or "authentication" in str(e).lower():
+        return "Authentication error. Please check your API key configuration."
+    elif "rate limit" in str(e).lower() or "quota" in str(e).lower():
+        return "I've reached my usage limit. Please try again in a few minutes."
+    else:
+        return f"An unexpected error occurred. Please try a different question or try again later. Error type: {error_type}"
+
+
+def manifest_path(persist_directory: str, backend: EmbeddingBackend = None) -> str:
+    return os.path.join(persist_directory, MANIFEST_FILE.format(backend=(backend or get_backend()).name))
+
+
+def read_manifest(persist_directory: str, backend: EmbeddingBackend = None) -> Optional[dict]:
+    """Manifest stored with a backend's persisted index, or None if there is none"""
+    try:
+        with open(manifest_path(persist_directory, backend)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(persist_directory: str, manifest: dict, backend: EmbeddingBackend = None) -> None:
+    """Store a manifest next to the index, replacing any previous one atomically"""
+    path = manifest_path(persist_directory, backend)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+_embeddings = {}
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings(backend: EmbeddingBackend = None) -> CachedEmbeddings:
+    """
+    Embedding model for a backend, shared by every chain in the process and loaded on first use.
+
+    Query vectors are cached in memory and on disk, so repeated questions skip the model.
+    """
+    backend = backend or get_backend()
+    embeddings = _embeddings.get(backend.name)
+    if embeddings is None:
+        with _embeddings_lock:
+            embeddings = _embeddings.get(backend.name)
+            if embeddings is None:
+                embeddings = CachedEmbeddings(backend.create(), model_name=backend.cache_key)
+                _embeddings[backend.name] = embeddings
+    return embeddings
+
 
 class GrokRagChain:
+    # Every chain calls the same endpoint, so they share one breaker and one request coordinator
+    circuit_breaker = grok_client.breaker
+    coordinator = request_coordinator.coordinator
+
     def __init__(self, docs_folder: str = "data/documents", model: str = None,
-                 expansion_temp: float = None, response_temp: float = None, max_tokens: int = None):
-        device = 'cpu'  # Force CPU for Streamlit Cloud compatibility
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="BAAI/bge-large-en-v1.5",
-            model_kwargs={'device': device}
-        )
+                 expansion_temp: float = None, response_temp: float = None, max_tokens: int = None,
+                 embedding_backend: str = None):
+        # Get settings from Streamlit secrets first, then environment variables
+        _, self.model, self.expansion_temp, self.response_temp, self.max_tokens, backend_name = resolve_config(
+            docs_folder, model, expansion_temp, response_temp, max_tokens, embedding_backend)
+        self.embedding_backend = get_backend(backend_name)
+
+        self.embeddings = get_embeddings(self.embedding_backend)
         self.vectorstore = self._load_or_create_vectorstore(docs_folder)
+        self.lexical_index = self._build_lexical_index()
         self.grok_client = self._setup_grok_client()
-        
-        # Get settings from Streamlit secrets first, then environment variables
-        self.model = model or st.secrets.get("GROK_MODEL", os.getenv("GROK_MODEL", "grok-3-mini"))
-        self.expansion_temp = float(expansion_temp or st.secrets.get("EXPANSION_TEMP", os.getenv("EXPANSION_TEMP", "0.7")))
-        self.response_temp = float(response_temp or st.secrets.get("RESPONSE_TEMP", os.getenv("RESPONSE_TEMP", "0.8")))
-        self.max_tokens = int(max_tokens or st.secrets.get("MAX_TOKENS", os.getenv("MAX_TOKENS", "500")))
+        self._retrieval_slots = threading.BoundedSemaphore(MAX_CONCURRENT_RETRIEVALS)
+
+        # Answers to paraphrased questions; a new index, model or generation setting starts a fresh cache
+        answer_key = f"{self.index_fingerprint}:{self.model}:{self.response_temp}:{self.max_tokens}"
+        self.answer_cache = SemanticCache(
+            hashlib.sha256(answer_key.encode()).hexdigest(),
+            threshold=float(_setting("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        )
+        atexit.register(self.answer_cache.save_if_dirty)
 
     def _load_or_create_vectorstore(self, docs_folder: str):
-        persist_directory = "chroma_db"  # Changed from faiss_index to chroma_db
+        persist_directory = PERSIST_DIRECTORY  # Changed from faiss_index to chroma_db
         
-        # Create new index
         if not os.path.exists(docs_folder):
             st.error(f"Documents folder '{docs_folder}' not found. Please ensure it exists with PDF/TXT files.")
             raise ValueError(f"Documents folder '{docs_folder}' not found.")
-        
-        docs = []
-        for filename in os.listdir(docs_folder):
-            filepath = os.path.join(docs_folder, filename)
-            try:
-                if filename.endswith(".pdf"):
-                    loader = PyPDFLoader(filepath)
-                    docs.extend(loader.load())
-                elif filename.endswith(".txt"):
-                    loader = TextLoader(filepath)
-                    docs.extend(loader.load())
-            except Exception as e:
-                logging.warning(f"Failed to load {filepath}: {e}")
 
-        if not docs:
-            raise ValueError(f"No readable documents found in {docs_folder}/. Add Blackjack PDF or TXT files.")
+        # Reuse the persisted index when it was built from the same sources, chunking and model
+        backend = self.embedding_backend
+        manifest = build_manifest(docs_folder, backend)
+        self.index_fingerprint = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+        # A snapshot from build_index.py is opened memory-mapped; nothing is embedded at startup
+        snapshot_dir = snapshot_directory(backend.name, _setting("INDEX_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_ROOT))
+        snapshot_manifest = read_snapshot_manifest(snapshot_dir)
+        if snapshot_manifest is not None:
+            if snapshot_manifest.get('index') == manifest:
+                try:
+                    return IndexSnapshot(snapshot_dir, embeddings=self.embeddings)
+                except (OSError, ValueError, KeyError) as e:
+                    logging.warning(f"Unusable index snapshot in {snapshot_dir}: {e}; falling back to Chroma")
+            else:
+                logging.warning(f"Index snapshot in {snapshot_dir} was built from other documents or settings; "
+                                f"falling back to Chroma. Rebuild it with build_index.py")
 
-        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-        chunks = splitter.split_documents(docs)
+        if read_manifest(persist_directory, backend) == manifest:
+            vectorstore = Chroma(collection_name=backend.collection, persist_directory=persist_directory,
+                                 embedding_function=self.embeddings)
+            if vectorstore._collection.count() > 0:
+                logging.info(f"Reusing persisted {backend.name} index in {persist_directory}")
+                return vectorstore
+            logging.warning(f"Persisted {backend.name} index in {persist_directory} is empty; rebuilding")
+
+        # Create new index
+        chunks = load_chunks(docs_folder)
+
+        # Drop the stale collection first; from_documents would otherwise append duplicates to it
+        if os.path.exists(persist_directory):
+            Chroma(collection_name=backend.collection, persist_directory=persist_directory,
+                   embedding_function=self.embeddings).delete_collection()
 
         # Use Chroma instead of FAISS
         vectorstore = Chroma.from_documents(
             chunks, 
             self.embeddings,
+            collection_name=backend.collection,
             persist_directory=persist_directory
         )
+        write_manifest(persist_directory, manifest, backend)
+        logging.info(f"Indexed {len(chunks)} chunks from {len(manifest['sources'])} files into {persist_directory}")
         
         return vectorstore
 
+    def _build_lexical_index(self):
+        """BM25 index over the stored chunks, searched alongside the vectors; None if it can't be built"""
+        try:
+            index = build_lexical_index(self.vectorstore)
+        except Exception as e:
+            logging.warning(f"Lexical index unavailable, using vector search only: {e}")
+            return None
+        logging.info(f"Built lexical index over {len(index)} chunks ({len(index.vocabulary)} terms)")
+        return index
+
     def _setup_grok_client(self):
         # Try Streamlit secrets first, then environment variables
-        api_key = st.secrets.get("XAI_API_KEY") or os.getenv("XAI_API_KEY")
+        api_key = _setting("XAI_API_KEY")
         
         if not api_key:
             raise ValueError("XAI_API_KEY not found in Streamlit secrets or environment variables. Please add it to your app's secrets.")
         
-        return OpenAIClient(
-            api_key=api_key,
-            base_url="https://api.x.ai/v1"
-        )
+        # Shared, pooled client; retries and timeouts are handled by grok_client
+        return grok_client.get_client(api_key)
 
-    def get_response(self, query: str, hand_type: Optional[str] = None, player_value: Optional[int] = None,
-                     dealer_upcard: Optional[int] = None) -> str:
+    def _async_grok_client(self) -> AsyncOpenAI:
+        """Async client for the running event loop; its connection pool is tied to that loop"""
+        return grok_client.get_async_client(self.grok_client.api_key)
+
+    def _table_answer(self, query: str, hand_type: Optional[str], player_value: Optional[int],
+                      dealer_upcard: Optional[int]) -> Optional[str]:
+        """Validation errors and table lookups; None when the question needs the RAG path"""
         from strategy_table import get_action
 
         # Validate input parameters
@@ -124,107 +296,359 @@ class GrokRagChain:
                     if pair_value < 2 or pair_value > 11:
                         return f"Invalid pair: {player_value}. Valid pairs: 4(2-2), 6(3-3), 8(4-4), 10(5-5), 12(6-6), 14(7-7), 16(8-8), 18(9-9), 20(10-10), 21(A-A)."
                     
-                    action = get_action(hand_type, pair_value, dealer_upcard)
+                    cell = HandQuestion("pair", pair_value, dealer_upcard)
                 else:
-                    action = get_action(hand_type or "hard", player_value, dealer_upcard)
+                    cell = HandQuestion((hand_type or "hard").lower(), player_value, dealer_upcard)
+                action = get_action(cell.hand_type, cell.total, cell.dealer_upcard)
                 
-                explanations = {
-                    'H': 'Hit: Improves EV against the dealer\'s likely strong hand.',
-                    'S': 'Stand: Avoids bust risk with a strong enough total.',
-                    'D': 'Double: Maximizes profit when the dealer is weak (2-6).',
-                    'Ds': 'Double if allowed, else Stand: Optimizes EV with caution.',
-                    'P': 'Split: Creates two hands for better win potential.'
-                }
-                return f"Optimal Basic Strategy action: {action}. {explanations.get(action, 'Action based on optimal play.')}"
+                return f"Optimal Basic Strategy action: {action}. {explain_cell(cell, action)}"
             except Exception as e:
                 logging.error(f"Error in strategy lookup: {e}")
                 return f"Error finding strategy: {str(e)}. Please check your input values and try again."
-        
-        # Maximum retries for API calls
-        max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
+
+        # Free-text questions that name a hand and an upcard are table lookups too
+        if player_value is None and dealer_upcard is None:
+            return route_question(query)
+        return None
+
+    def get_response(self, query: str, hand_type: Optional[str] = None, player_value: Optional[int] = None,
+                     dealer_upcard: Optional[int] = None, on_queue: QueueCallback = None) -> str:
+        """
+        Answer a question: table lookups and cached answers first, then the RAG pipeline.
+
+        Pipeline runs go through the process-wide request coordinator: an
+        identical question already in flight is shared rather than asked again,
+        and at most MAX_CONCURRENT_LLM_REQUESTS run at once. on_queue is told
+        the caller's place in line while it waits.
+        """
+        answer = self._table_answer(query, hand_type, player_value, dealer_upcard)
+        if answer is not None:
+            return answer
+
+        query_vector = self._query_vector(query)
+        if query_vector is not None:
+            cached = self.answer_cache.get(query_vector)
+            if cached is not None:
+                return cached
+
+        # Fail fast while the API is degraded; hand questions were answered above
+        if self.circuit_breaker.is_open():
+            return DEGRADED_MESSAGE
+
+        return self.coordinator.run(self._request_key(query), lambda: self._generate(query, query_vector), on_queue)
+
+    def _generate(self, query: str, query_vector) -> str:
+        """Expansion, retrieval and generation for get_response"""
+        try:
+            # Step 1: Query expansion; best effort, so a single attempt
             try:
-                # Step 1: Query expansion
-                try:
-                    expansion_prompt = f"Expand this Blackjack query into 2-3 related sub-queries for better retrieval. Output as JSON list: [\"subquery1\", \"subquery2\", \"subquery3\"]: {query}"
-                    expansion_response = self.grok_client.chat.completions.create(
-                        model=self.model,
-                        messages=[{"role": "user", "content": expansion_prompt}],
-                        temperature=self.expansion_temp
-                    ).choices[0].message.content
-                    
-                    expanded_queries = json.loads(expansion_response)
-                    if not isinstance(expanded_queries, list) or not expanded_queries:
-                        raise ValueError("Invalid expansion format")
-                        
-                except json.JSONDecodeError:
-                    logging.warning("Failed to parse expansion response; using original query.")
-                    expanded_queries = [query]
-                except ValueError as e:
-                    logging.warning(f"Invalid expansion format: {e}; using original query.")
-                    expanded_queries = [query]
-                except Exception as e:
-                    logging.warning(f"Query expansion failed: {e}; using original query.")
-                    expanded_queries = [query]
-                
-                logging.info(f"Expanded queries: {expanded_queries}")
+                expansion_response = call_with_retries(lambda: self.grok_client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": expansion_prompt(query)}],
+                    temperature=self.expansion_temp,
+                    timeout=EXPANSION_TIMEOUT
+                ), self.circuit_breaker, max_attempts=1).choices[0].message.content
+                expanded_queries = parse_expansion(expansion_response, query)
+            except Exception as e:
+                logging.warning(f"Query expansion failed: {e}; using original query.")
+                expanded_queries = [query]
 
-                # Step 2: Context retrieval
-                contexts = set()
-                retrieval_failures = 0
-                
-                for eq in expanded_queries:
-                    try:
-                        results = self.vectorstore.similarity_search(eq, k=2)
-                        if results:
-                            contexts.update(doc.page_content for doc in results)
-                        else:
-                            logging.warning(f"No results found for query: {eq}")
-                    except Exception as e:
-                        logging.warning(f"Search failed for query '{eq}': {e}")
-                        retrieval_failures += 1
-                
-                # If all retrievals failed, provide a fallback
-                if retrieval_failures == len(expanded_queries):
-                    logging.error("All context retrievals failed")
-                    return "I'm having trouble accessing my knowledge base right now. Please try a different question or try again later."
-                
-                # If we have no context but some retrievals succeeded, the query might be unrelated to blackjack
-                if not contexts:
-                    return "I couldn't find relevant information about that. Please ask a question related to blackjack strategy."
+            logging.info(f"Expanded queries: {expanded_queries}")
 
-                full_context = '\n\n'.join(contexts)
-                if len(full_context) > 10000:
-                    full_context = full_context[:10000] + '...'
-                
-                # Step 3: Generate response
-                full_prompt = f"Context: {full_context}\n\nQuery: {query}\nAnswer as Grok with clear reasoning:"
-                response = self.grok_client.chat.completions.create(
+            # Step 2: Context retrieval - one batched embedding pass and one index query
+            try:
+                results = retrieve(self.vectorstore, expanded_queries, k=2, lexical=self.lexical_index)
+            except Exception as e:
+                logging.error(f"Context retrieval failed: {e}")
+                return "I'm having trouble accessing my knowledge base right now. Please try a different question or try again later."
+
+            # Most relevant first, near duplicates dropped, packed to the token budget
+            contexts = pack_contexts(results, self._context_budget())
+
+            # If we have no context, the query might be unrelated to blackjack
+            if not contexts:
+                return "I couldn't find relevant information about that. Please ask a question related to blackjack strategy."
+
+            # Step 3: Generate response, retried with backoff on rate limits and transient errors
+            full_prompt = answer_prompt(query, contexts)
+            response = call_with_retries(lambda: self.grok_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": full_prompt}],
+                temperature=self.response_temp,
+                max_tokens=self.max_tokens,
+                timeout=GENERATION_TIMEOUT
+            ), self.circuit_breaker).choices[0].message.content
+
+            if query_vector is not None:
+                self.answer_cache.put(query, query_vector, response)
+            return response
+
+        except CircuitOpenError:
+            return DEGRADED_MESSAGE
+        except (ConnectionError, TimeoutError, openai.APIConnectionError):
+            return "I'm having trouble connecting to my knowledge service. Please check your internet connection and try again later."
+        except Exception as e:
+            # For other errors, log and return a user-friendly message
+            return error_message(e)
+
+    async def aget_response(self, query: str, hand_type: Optional[str] = None, player_value: Optional[int] = None,
+                            dealer_upcard: Optional[int] = None, on_queue: QueueCallback = None) -> str:
+        """
+        Async version of get_response that overlaps the pipeline stages.
+
+        Retrieval for the original query runs while the expansion call is in
+        flight, then the sub-queries are retrieved with one batched search (at
+        most MAX_CONCURRENT_RETRIEVALS searches at once per chain) and all
+        rankings are fused. Each stage has its own timeout: a slow expansion
+        falls back to the original query, slow retrievals are dropped, and only
+        a generation timeout fails the answer. Requests are coordinated as in
+        get_response.
+        """
+        answer = self._table_answer(query, hand_type, player_value, dealer_upcard)
+        if answer is not None:
+            return answer
+
+        query_vector = await asyncio.to_thread(self._query_vector, query)
+        if query_vector is not None:
+            cached = self.answer_cache.get(query_vector)
+            if cached is not None:
+                return cached
+
+        if self.circuit_breaker.is_open():
+            return DEGRADED_MESSAGE
+
+        return await self.coordinator.arun(self._request_key(query), lambda: self._agenerate(query, query_vector),
+                                           on_queue)
+
+    async def _agenerate(self, query: str, query_vector) -> str:
+        """Overlapped expansion and retrieval, then generation, for aget_response"""
+        try:
+            contexts, message = await self._agather_contexts(query)
+            if message is not None:
+                return message
+
+            client = self._async_grok_client()
+            # GENERATION_TIMEOUT bounds the whole stage, backoff between retries included
+            response = await asyncio.wait_for(acall_with_retries(lambda: client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": answer_prompt(query, contexts)}],
+                temperature=self.response_temp,
+                max_tokens=self.max_tokens,
+                timeout=GENERATION_TIMEOUT
+            ), self.circuit_breaker), GENERATION_TIMEOUT)
+            answer = response.choices[0].message.content
+            if query_vector is not None:
+                self.answer_cache.put(query, query_vector, answer)
+            return answer
+
+        except asyncio.TimeoutError:
+            logging.warning(f"Generation timed out after {GENERATION_TIMEOUT}s")
+            return "Grok is taking too long to answer right now. Please try again in a moment."
+        except CircuitOpenError:
+            return DEGRADED_MESSAGE
+        except (ConnectionError, TimeoutError, openai.APIConnectionError):
+            return "I'm having trouble connecting to my knowledge service. Please check your internet connection and try again later."
+        except Exception as e:
+            return error_message(e)
+
+    def stream_response(self, query: str, hand_type: Optional[str] = None, player_value: Optional[int] = None,
+                        dealer_upcard: Optional[int] = None, on_queue: QueueCallback = None) -> Iterator[str]:
+        """
+        Streaming version of get_response that yields the answer as it is generated.
+
+        Expansion and retrieval run concurrently as in aget_response, then the
+        completion is requested with stream=True and each text delta is yielded
+        as soon as it arrives. Table answers, cached answers and error messages
+        are yielded as a single chunk. Streams aren't shared between callers,
+        but each holds one of the coordinator's LLM slots while it runs.
+        """
+        answer = self._table_answer(query, hand_type, player_value, dealer_upcard)
+        if answer is not None:
+            yield answer
+            return
+
+        query_vector = self._query_vector(query)
+        if query_vector is not None:
+            cached = self.answer_cache.get(query_vector)
+            if cached is not None:
+                yield cached
+                return
+
+        if self.circuit_breaker.is_open():
+            yield DEGRADED_MESSAGE
+            return
+
+        with self.coordinator.slot(on_queue):
+            try:
+                contexts, message = run_sync(self._agather_contexts(query))
+                if message is not None:
+                    yield message
+                    return
+
+                # Only opening the stream is retried; once text has been shown it can't be taken back
+                stream = call_with_retries(lambda: self.grok_client.chat.completions.create(
                     model=self.model,
-                    messages=[{"role": "user", "content": full_prompt}],
+                    messages=[{"role": "user", "content": answer_prompt(query, contexts)}],
                     temperature=self.response_temp,
-                    max_tokens=self.max_tokens
-                ).choices[0].message.content
-                
-                return response
-
-            except (ConnectionError, TimeoutError) as e:
-                # Network-related errors - retry
-                retry_count += 1
-                logging.warning(f"Network error (attempt {retry_count}/{max_retries}): {e}")
-                if retry_count >= max_retries:
-                    return "I'm having trouble connecting to my knowledge service. Please check your internet connection and try again later."
-                
+                    max_tokens=self.max_tokens,
+                    stream=True,
+                    timeout=GENERATION_TIMEOUT
+                ), self.circuit_breaker)
+                parts = []
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+                if query_vector is not None and parts:
+                    self.answer_cache.put(query, query_vector, ''.join(parts))
+
+            except CircuitOpenError:
+                yield DEGRADED_MESSAGE
+            except (ConnectionError, TimeoutError, openai.APIConnectionError):
+                yield "I'm having trouble connecting to my knowledge service. Please check your internet connection and try again later."
             except Exception as e:
-                # For other errors, log and return a user-friendly message
-                error_type = type(e).__name__
-                logging.error(f"Error in get_response ({error_type}): {e}")
-                
-                if "API key" in str(e) or "authentication" in str(e).lower():
-                    return "Authentication error. Please check your API key configuration."
-                elif "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                    return "I've reached my usage limit. Please try again in a few minutes."
-                else:
-                    return f"An unexpected error occurred. Please try a different question or try again later. Error type: {error_type}"
\ No newline at end of file
+                yield error_message(e)
+
+    async def _agather_contexts(self, query: str) -> tuple:
+        """
+        Expand a question and retrieve its context concurrently.
+
+        Returns:
+            Tuple of (contexts, message): context chunks best first, and a
+            user-facing message instead when there is nothing to answer from
+        """
+        # Only the original query is searched during expansion; the sub-queries
+        # then share one batched search, so they are embedded in one call
+        original = asyncio.ensure_future(self._aretrieve([query]))
+        expanded_queries = await self._aexpand(self._async_grok_client(), query)
+        logging.info(f"Expanded queries: {expanded_queries}")
+
+        sub_queries = [eq for eq in dict.fromkeys(expanded_queries) if eq.strip() != query.strip()]
+        tasks = [original]
+        if sub_queries:
+            tasks.append(asyncio.ensure_future(self._aretrieve(sub_queries)))
+        done, pending = await asyncio.wait(tasks, timeout=RETRIEVAL_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logging.warning(f"{len(pending)} of {len(tasks)} searches timed out after {RETRIEVAL_TIMEOUT}s")
+
+        rankings, documents = [], {}
+        succeeded = 0
+        for task in tasks:
+            if task not in done:
+                continue
+            if task.exception() is not None:
+                logging.warning(f"Search failed: {task.exception()}")
+                continue
+            task_rankings, task_documents = task.result()
+            rankings.extend(task_rankings)
+            documents.update(task_documents)
+            succeeded += 1
+        if not succeeded:
+            logging.error("All context retrievals failed")
+            return [], "I'm having trouble accessing my knowledge base right now. Please try a different question or try again later."
+
+        contexts = pack_contexts(fuse_results(rankings, documents), self._context_budget())
+        if not contexts:
+            return [], "I couldn't find relevant information about that. Please ask a question related to blackjack strategy."
+        return contexts, None
+
+    def _request_key(self, query: str) -> tuple:
+        """Identical requests: same index, model and generation settings (the answer cache's fingerprint) and question"""
+        return self.answer_cache.fingerprint, normalize_query(query)
+
+    def _context_budget(self) -> int:
+        """Tokens of retrieved context per prompt; CONTEXT_TOKENS overrides the default cap"""
+        cap = _setting("CONTEXT_TOKENS")
+        if cap is None:
+            return context_budget(self.model, self.max_tokens)
+        return context_budget(self.model, self.max_tokens, int(cap))
+
+    def _query_vector(self, query: str):
+        """Embedding of the question for the answer cache, or None if embedding fails"""
+        try:
+            return self.embeddings.embed_query(query)
+        except Exception as e:
+            logging.warning(f"Could not embed query for the answer cache: {e}")
+            return None
+
+    async def _aexpand(self, client: AsyncOpenAI, query: str) -> list:
+        """Sub-queries for a query, falling back to [query] on failure, timeout or an open circuit"""
+        if self.circuit_breaker.is_open():
+            return [query]
+        try:
+            # Best effort, so a single attempt; failures still count towards the circuit breaker
+            completion = await asyncio.wait_for(acall_with_retries(lambda: client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": expansion_prompt(query)}],
+                temperature=self.expansion_temp,
+                timeout=EXPANSION_TIMEOUT
+            ), self.circuit_breaker, max_attempts=1), EXPANSION_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.warning(f"Query expansion timed out after {EXPANSION_TIMEOUT}s; using original query.")
+            return [query]
+        except Exception as e:
+            logging.warning(f"Query expansion failed: {e}; using original query.")
+            return [query]
+        return parse_expansion(completion.choices[0].message.content, query)
+
+    async def _aretrieve(self, queries: list) -> tuple:
+        """Search for a batch of queries in a worker thread; returns (rankings, documents)"""
+        return await asyncio.to_thread(self._bounded_search, queries)
+
+    def _bounded_search(self, queries: list) -> tuple:
+        with self._retrieval_slots:
+            return search(self.vectorstore, queries, k=2, lexical=self.lexical_index)
+
+
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+
+def run_sync(coro, timeout: float = None):
+    """
+    Run a coroutine from synchronous code, e.g. a Streamlit script, and return its result.
+
+    Coroutines run on one background event loop shared by the process, so async
+    clients and their connection pools are reused across calls.
+    """
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(target=_event_loop.run_forever, name="rag-event-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop).result(timeout)
+
+
+# Shared chains by resolved config. Building a chain opens the vector store and
+# an API client, so every caller in the process reuses one per config.
+_shared_chains = {}
+_shared_chains_lock = threading.Lock()
+_chain_build_locks = {}
+
+
+def get_shared_chain(docs_folder: str = "data/documents", model: str = None, expansion_temp: float = None,
+                     response_temp: float = None, max_tokens: int = None, embedding_backend: str = None) -> GrokRagChain:
+    """
+    Process-wide GrokRagChain for a config, built on first use.
+
+    Thread-safe: concurrent callers with the same config wait for one build
+    instead of each building their own, while other configs build in parallel.
+    A failed build raises and is retried by the next caller.
+    """
+    key = resolve_config(docs_folder, model, expansion_temp, response_temp, max_tokens, embedding_backend)
+    chain = _shared_chains.get(key)
+    if chain is not None:
+        return chain
+
+    with _shared_chains_lock:
+        build_lock = _chain_build_locks.setdefault(key, threading.Lock())
+    with build_lock:
+        chain = _shared_chains.get(key)
+        if chain is None:
+            logging.info(f"Building shared RAG chain for {key}")
+            chain = GrokRagChain(*key)
+            _shared_chains[key] = chain
+    return chain
@@ -0,0 +1,93 @@
+"""
+Background warm-up for the shared RAG chain.
+
+Importing rag_chain pulls in langchain, the embedding model and Chroma, and
+building the chain loads the model and the document index; together that takes
+seconds. start_warmup() does all of it on a daemon thread so the UI can render
+the strategy table immediately, and chain_status() tells the Grok tab whether
+the chain is ready yet. A failed warm-up stays failed until retry_warmup().
+
+This module itself only imports the standard library.
+"""
+
+import logging
+import threading
+
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+_lock = threading.Lock()
+_thread = None
+_chain = None
+_error = None
+
+
+def _warm_up(config: dict) -> None:
+    global _chain, _error
+    try:
+        from rag_chain import get_shared_chain
+        chain = get_shared_chain(**config)
+    except Exception as e:
+        logging.error(f"RAG warm-up failed: {type(e).__name__}: {e}")
+        with _lock:
+            _error = e
+        return
+    logging.info("RAG chain warmed up")
+    with _lock:
+        _chain = chain
+
+
+def start_warmup(**config) -> None:
+    """
+    Start building the shared RAG chain on a background thread.
+
+    Calling it again while the chain is warming up, ready or failed does
+    nothing, so it is safe to call on every Streamlit rerun without rebuilding
+    a broken chain each time; use retry_warmup() to try again after a failure.
+
+    Args:
+        **config: Passed to rag_chain.get_shared_chain
+    """
+    global _thread
+    with _lock:
+        if _chain is not None or _error is not None or (_thread is not None and _thread.is_alive()):
+            return
+        _thread = threading.Thread(target=_warm_up, args=(config,), name="rag-warmup", daemon=True)
+        _thread.start()
+
+
+def retry_warmup(**config) -> None:
+    """
+    Start a new warm-up after a failure; otherwise the same as start_warmup.
+
+    Args:
+        **config: Passed to rag_chain.get_shared_chain
+    """
+    global _error
+    with _lock:
+        _error = None
+    start_warmup(**config)
+
+
+def chain_status() -> tuple:
+    """
+    State of the warm-up.
+
+    Returns:
+        Tuple of (status, error): status is WARMING, READY or FAILED, and error
+        is the exception that stopped a failed warm-up, otherwise None
+    """
+    with _lock:
+        if _chain is not None:
+            return READY, None
+        if _error is not None:
+            return FAILED, _error
+        return WARMING, None
+
+
+def ready_chain():
+    """The warmed-up chain, or None while it is still loading or after a failure"""
+    with _lock:
+        return _chain
+
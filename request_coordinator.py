@@ -0,0 +1,224 @@
+"""
+Process-wide coordination of LLM requests.
+
+Every Streamlit session runs in its own thread of one process, so a spike of
+users asking the same thing would otherwise start the same expansion and
+generation calls many times over, with nothing capping the calls in flight
+against the xAI quota. RequestCoordinator adds two things:
+
+- Single flight: a request whose key (config + normalized question) is already
+  in flight waits for that request's result instead of starting its own.
+- A FIFO gate of max_concurrent slots around the LLM work. Requests beyond the
+  cap queue in arrival order, and an on_queue callback is told the caller's
+  place in line whenever it changes, so the UI can show it.
+
+Both work from threads (run, slot) and from coroutines (arun, aslot).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Hashable, Optional
+
+DEFAULT_MAX_CONCURRENT = 4
+
+# How often a waiting coroutine checks its place in line
+_POLL_INTERVAL = 0.05
+
+QueueCallback = Optional[Callable[[int], None]]
+
+
+class LLMGate:
+    """
+    First-come, first-served limit on concurrent LLM requests.
+
+    Args:
+        max_concurrent: Requests allowed through at once
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self._condition = threading.Condition()
+        self._waiting = deque()
+        self._active = 0
+
+    def _enqueue(self) -> object:
+        ticket = object()
+        with self._condition:
+            self._waiting.append(ticket)
+        return ticket
+
+    def _try_admit(self, ticket) -> int:
+        """0 if the ticket was let through, otherwise its 1-based place in line; call with the lock held"""
+        if self._waiting[0] is ticket and self._active < self.max_concurrent:
+            self._waiting.popleft()
+            self._active += 1
+            # The next ticket may be admissible too
+            self._condition.notify_all()
+            return 0
+        return self._waiting.index(ticket) + 1
+
+    def _leave(self, ticket) -> None:
+        with self._condition:
+            try:
+                self._waiting.remove(ticket)
+            except ValueError:
+                pass
+            self._condition.notify_all()
+
+    def acquire(self, on_queue: QueueCallback = None) -> None:
+        """Block until a slot is free and it is this caller's turn"""
+        ticket = self._enqueue()
+        reported = None
+        try:
+            while True:
+                with self._condition:
+                    position = self._try_admit(ticket)
+                    if position and position == reported:
+                        self._condition.wait()
+                        continue
+                if not position:
+                    return
+                reported = position
+                if on_queue is not None:
+                    on_queue(position)
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    async def aacquire(self, on_queue: QueueCallback = None) -> None:
+        """Async acquire; the event loop keeps running while the caller waits"""
+        ticket = self._enqueue()
+        reported = None
+        try:
+            while True:
+                with self._condition:
+                    position = self._try_admit(ticket)
+                if not position:
+                    return
+                if position != reported:
+                    reported = position
+                    if on_queue is not None:
+                        on_queue(position)
+                await asyncio.sleep(_POLL_INTERVAL)
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    def release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {'active': self._active, 'waiting': len(self._waiting), 'max_concurrent': self.max_concurrent}
+
+
+class RequestCoordinator:
+    """
+    Single-flight request coalescing in front of an LLMGate.
+
+    Args:
+        max_concurrent: LLM requests allowed in flight at once across the process
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        self.gate = LLMGate(max_concurrent)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.coalesced = 0
+
+    def _join(self, key: Hashable) -> tuple:
+        """(future, leader): the in-flight future for key, and whether this caller must produce it"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result=None, error: BaseException = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    @contextmanager
+    def slot(self, on_queue: QueueCallback = None):
+        """Hold one LLM slot for the duration of the block"""
+        self.gate.acquire(on_queue)
+        try:
+            yield
+        finally:
+            self.gate.release()
+
+    @asynccontextmanager
+    async def aslot(self, on_queue: QueueCallback = None):
+        await self.gate.aacquire(on_queue)
+        try:
+            yield
+        finally:
+            self.gate.release()
+
+    def run(self, key: Hashable, call: Callable, on_queue: QueueCallback = None):
+        """
+        Run call in an LLM slot, or wait for the identical request already in flight.
+
+        Args:
+            key: Identifies identical requests
+            call: Produces the result; runs at most once per key at a time
+            on_queue: Told this caller's place in line while it waits for a slot
+
+        Returns:
+            The result of call, possibly produced for another caller; its
+            exception is raised to every caller sharing it
+        """
+        future, leader = self._join(key)
+        if not leader:
+            logging.info("Joining an identical request already in flight")
+            return future.result()
+        try:
+            with self.slot(on_queue):
+                result = call()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def arun(self, key: Hashable, call: Callable, on_queue: QueueCallback = None):
+        """Async version of run; call returns an awaitable"""
+        future, leader = self._join(key)
+        if not leader:
+            logging.info("Joining an identical request already in flight")
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            async with self.aslot(on_queue):
+                result = await call()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def stats(self) -> dict:
+        """Gate occupancy and how many requests were coalesced, for monitoring"""
+        with self._lock:
+            stats = {'inflight': len(self._inflight), 'coalesced': self.coalesced}
+        stats.update(self.gate.stats())
+        return stats
+
+
+# Shared by every session and chain in the process: the quota is per API key, not per session
+coordinator = RequestCoordinator(int(os.getenv("MAX_CONCURRENT_LLM_REQUESTS", DEFAULT_MAX_CONCURRENT)))
@@ -0,0 +1,227 @@
+"""
+Multi-query retrieval for the RAG chain.
+
+All sub-queries of a question are embedded in one batch and sent to the Chroma
+collection in a single query. The per-query rankings are then merged with
+reciprocal rank fusion (RRF), so a chunk that several sub-queries agree on
+ranks above one that a single sub-query liked.
+
+The vector store is either a Chroma store or an IndexSnapshot (a prebuilt,
+memory-mapped index from build_index.py); both are searched the same way.
+
+Dense embeddings blur the exact tokens blackjack questions are full of ("A7",
+"soft 18", "DAS", "S17", "8-8"), so a BM25 index over the same chunks can be
+searched alongside: its ranking for every sub-query joins the dense rankings in
+the same fusion.
+"""
+
+import re
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+# RRF damping constant; 60 is the value from the original RRF paper
+RRF_K = 60
+
+# BM25 term-frequency saturation and length normalization; the usual defaults
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words, numbers and hand shorthand such as "a7", "s17", "8-8" or "10-6"
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms for the lexical index.
+
+    Hyphenated shorthand is kept whole and also split into its parts, so "8-8"
+    matches "8-8" exactly and still matches a chunk that says "pair of 8s".
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        if '-' in token:
+            terms.extend(token.split('-'))
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over retrieval chunks.
+
+    Postings are stored in CSR form: for term t, doc_ids[indptr[t]:indptr[t + 1]]
+    are the chunks containing it and term_freqs the matching counts. A query
+    touches only the postings of its own terms.
+
+    Args:
+        ids: Chunk ids, the same ids the vector store uses so fusion can merge them
+        documents: Chunk Documents, in the same order as ids
+        k1: Term-frequency saturation
+        b: Document length normalization
+    """
+
+    def __init__(self, ids: List[str], documents: List[Document], k1: float = BM25_K1, b: float = BM25_B):
+        if len(ids) != len(documents):
+            raise ValueError(f"Got {len(ids)} ids for {len(documents)} documents")
+        self.ids = list(ids)
+        self.documents = dict(zip(self.ids, documents))
+
+        postings = {}
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for doc, document in enumerate(documents):
+            terms = tokenize(document.page_content)
+            lengths[doc] = len(terms)
+            for term in terms:
+                counts = postings.setdefault(term, {})
+                counts[doc] = counts.get(doc, 0) + 1
+
+        self.vocabulary = {term: index for index, term in enumerate(postings)}
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(counts) for counts in postings.values()])
+        self.doc_ids = np.fromiter((doc for counts in postings.values() for doc in counts),
+                                   dtype=np.int32, count=int(self.indptr[-1]))
+        self.term_freqs = np.fromiter((count for counts in postings.values() for count in counts.values()),
+                                      dtype=np.float32, count=int(self.indptr[-1]))
+
+        n = len(self.ids)
+        document_freqs = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((n - document_freqs + 0.5) / (document_freqs + 0.5)).astype(np.float32)
+        average_length = float(lengths.mean()) if n else 0.0
+        self.k1 = k1
+        # The per-chunk part of the BM25 denominator, computed once
+        self._length_norm = (k1 * (1 - b + b * lengths / average_length) if average_length
+                             else np.full(n, k1, dtype=np.float32)).astype(np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for a query"""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            index = self.vocabulary.get(term)
+            if index is None:
+                continue
+            start, end = self.indptr[index], self.indptr[index + 1]
+            docs, freqs = self.doc_ids[start:end], self.term_freqs[start:end]
+            scores[docs] += self.idf[index] * freqs * (self.k1 + 1) / (freqs + self._length_norm[docs])
+        return scores
+
+    def search(self, query: str, k: int = 2) -> List[str]:
+        """Ids of the k best-scoring chunks that share a term with the query, best first"""
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores > 0)
+        if matching.size > k:
+            matching = matching[np.argpartition(-scores[matching], k - 1)[:k]]
+        best_first = matching[np.argsort(-scores[matching], kind='stable')]
+        return [self.ids[i] for i in best_first]
+
+
+def build_lexical_index(vectorstore) -> BM25Index:
+    """
+    BM25 index over the chunks already stored in a vector store.
+
+    Reads the chunks back from the store rather than re-splitting the corpus,
+    so ids and texts are exactly the ones dense search returns.
+    """
+    if hasattr(vectorstore, 'query_vectors'):
+        ids = vectorstore.ids
+        return BM25Index(ids, [vectorstore.documents[chunk_id] for chunk_id in ids])
+    stored = vectorstore._collection.get(include=['documents', 'metadatas'])
+    documents = [Document(page_content=text or '', metadata=metadata or {})
+                 for text, metadata in zip(stored['documents'], stored['metadatas'])]
+    return BM25Index(stored['ids'], documents)
+
+
+def embed_queries(embeddings, queries: List[str]) -> List[List[float]]:
+    """
+    Embed several queries in one forward pass.
+
+    Uses the embeddings' own embed_queries when it has one (CachedEmbeddings
+    serves hits from its cache and batches the misses), and embed_documents
+    otherwise, which for HuggingFaceEmbeddings is the same computation as
+    embed_query.
+    """
+    if hasattr(embeddings, 'embed_queries'):
+        return embeddings.embed_queries(queries)
+    return embeddings.embed_documents(queries)
+
+
+def fuse_rankings(rankings: List[List[str]], k: int = RRF_K) -> dict:
+    """
+    Reciprocal rank fusion.
+
+    Args:
+        rankings: One list of ids per query, best first
+        k: RRF damping constant
+
+    Returns:
+        Dict of id to fused score, in descending score order
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def search(vectorstore, queries: List[str], k: int = 2, lexical: Optional[BM25Index] = None) -> tuple:
+    """
+    Run several queries with one embedding call and one index query.
+
+    Args:
+        vectorstore: Chroma vector store or IndexSnapshot
+        queries: Sub-queries of one question
+        k: Results per sub-query
+        lexical: BM25 index over the same chunks; each sub-query's lexical
+            ranking is added to the dense ones
+
+    Returns:
+        Tuple of (rankings, documents): one list of chunk ids per query, best
+        first, and a dict of chunk id to Document
+    """
+    queries = [query for query in queries if query and query.strip()]
+    if not queries:
+        return [], {}
+
+    vectors = embed_queries(vectorstore.embeddings, queries)
+    if hasattr(vectorstore, 'query_vectors'):
+        rankings = vectorstore.query_vectors(vectors, k)
+        documents = {chunk_id: vectorstore.documents[chunk_id] for ranking in rankings for chunk_id in ranking}
+    else:
+        results = vectorstore._collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            include=['documents', 'metadatas'],
+        )
+        rankings = list(results['ids'])
+        documents = {}
+        for ids, texts, metadatas in zip(results['ids'], results['documents'], results['metadatas']):
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                if chunk_id not in documents:
+                    documents[chunk_id] = Document(page_content=text, metadata=metadata or {})
+
+    if lexical is not None:
+        for query in queries:
+            ranking = lexical.search(query, k)
+            rankings.append(ranking)
+            for chunk_id in ranking:
+                documents.setdefault(chunk_id, lexical.documents[chunk_id])
+    return rankings, documents
+
+
+def fuse_results(rankings: List[List[str]], documents: dict) -> List[tuple]:
+    """Fuse rankings into (Document, fused score) tuples, deduplicated by chunk id and best first"""
+    return [(documents[chunk_id], score) for chunk_id, score in fuse_rankings(rankings).items()]
+
+
+def retrieve(vectorstore, queries: List[str], k: int = 2, lexical: Optional[BM25Index] = None) -> List[tuple]:
+    """
+    Retrieve chunks for several queries with one embedding call and one index query.
+
+    Returns:
+        List of (Document, fused score) tuples, deduplicated by chunk id and best first
+    """
+    return fuse_results(*search(vectorstore, queries, k, lexical))
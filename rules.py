@@ -0,0 +1,60 @@
+"""
+Blackjack rule sets.
+
+A RuleSet describes the table conditions a strategy is played under. The shipped
+tables in strategy_table.py are built for DEFAULT_RULES.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    Table rules that change optimal play or expected value.
+
+    Attributes:
+        decks: Number of decks in the shoe
+        dealer_hits_soft_17: True for H17 games, False for S17
+        double_after_split: True if doubling is allowed after splitting (DAS)
+        blackjack_payout: Payout for a natural, e.g. 1.5 for 3:2 or 1.2 for 6:5
+        max_split_hands: Maximum number of hands a player can split to
+        late_surrender: True if the player may surrender the first two cards
+            after the dealer checks for blackjack
+    """
+    decks: int = 6
+    dealer_hits_soft_17: bool = False
+    double_after_split: bool = True
+    blackjack_payout: float = 1.5
+    max_split_hands: int = 4
+    late_surrender: bool = False
+
+    def __post_init__(self):
+        if self.decks < 1:
+            raise ValueError(f"Invalid deck count: {self.decks}. Must be at least 1")
+        if self.max_split_hands < 1:
+            raise ValueError(f"Invalid max split hands: {self.max_split_hands}. Must be at least 1")
+
+    def strategy_key(self) -> tuple:
+        """
+        The fields that change optimal play.
+
+        Payout and the split limit move the EV but not the decisions, so rule sets
+        with the same strategy key share one strategy table.
+        """
+        return (self.decks, self.dealer_hits_soft_17, self.double_after_split, self.late_surrender)
+
+    def describe(self) -> str:
+        """Short human-readable summary, e.g. '6 decks, S17, DAS, no surrender, 3:2'"""
+        payout = {1.5: '3:2', 1.2: '6:5', 1.0: '1:1'}.get(self.blackjack_payout, f"{self.blackjack_payout}:1")
+        return ', '.join([
+            f"{self.decks} deck{'s' if self.decks != 1 else ''}",
+            'H17' if self.dealer_hits_soft_17 else 'S17',
+            'DAS' if self.double_after_split else 'no DAS',
+            'LS' if self.late_surrender else 'no surrender',
+            payout,
+        ])
+
+
+# Rules the shipped strategy tables were built for: multi-deck, S17, DAS, no surrender
+DEFAULT_RULES = RuleSet()
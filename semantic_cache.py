@@ -0,0 +1,212 @@
+"""
+Semantic answer cache.
+
+Paraphrased questions ("should I hit 16 vs 10" / "hit or stand 16 against ten")
+embed to nearby vectors, so SemanticCache keeps the normalized query embeddings
+of answered questions in one float32 matrix and answers a new question with a
+single matrix-vector product: if the best cosine similarity passes the
+threshold, the stored answer is returned without calling the LLM.
+
+Entries expire after a TTL and the least recently used entry is evicted when
+the cache is full. The cache persists to an .npz file tagged with a
+fingerprint of the document index and model, and starts empty when the
+fingerprint no longer matches.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+def cache_path(fingerprint: str) -> str:
+    """Cache file for a fingerprint; the directory is overridable with GROK21_SEMANTIC_CACHE_DIR"""
+    directory = os.getenv("GROK21_SEMANTIC_CACHE_DIR", DEFAULT_CACHE_DIR)
+    return os.path.join(directory, f"semantic_answers-{fingerprint[:16]}.npz")
+
+
+class SemanticCache:
+    """
+    Answers keyed by query-embedding similarity.
+
+    Args:
+        fingerprint: Identifies what the answers were generated from (document
+            index, model); a persisted cache with another fingerprint is ignored
+        threshold: Minimum cosine similarity for a hit
+        max_entries: Capacity; the least recently used entry is evicted beyond it
+        ttl: Seconds an answer stays valid
+        path: File to persist to (defaults to cache_path(fingerprint)); None
+            together with persist=False keeps the cache in memory only
+        persist: Load from and save to disk
+        save_interval: Minimum seconds between automatic saves after new answers
+    """
+
+    def __init__(self, fingerprint: str = '', threshold: float = 0.95, max_entries: int = 2048,
+                 ttl: float = 7 * 24 * 3600, path: Optional[str] = None, persist: bool = True,
+                 save_interval: float = 60.0):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Invalid similarity threshold: {threshold}. Must be in (0, 1]")
+        if max_entries < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = (path or cache_path(fingerprint)) if persist else None
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim) float32, allocated on the first answer
+        self._created = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._queries = [None] * max_entries
+        self._answers = [None] * max_entries
+        self._size = 0
+        self._last_save = time.time()
+        self._dirty = False
+        if self.path:
+            self.load()
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get(self, vector) -> Optional[str]:
+        """Cached answer for the most similar live query, or None"""
+        query = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            if self._size == 0 or query.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+            similarities = self._vectors[:self._size] @ query
+            similarities[now - self._created[:self._size] > self.ttl] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[best] = now
+            self.hits += 1
+            return self._answers[best]
+
+    def put(self, query: str, vector, answer: str) -> None:
+        """Store an answer, evicting an expired or the least recently used entry when full"""
+        vector = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._reset(vector.shape[0])
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                expired = np.flatnonzero(now - self._created > self.ttl)
+                slot = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+            self._vectors[slot] = vector
+            self._created[slot] = now
+            self._last_used[slot] = now
+            self._queries[slot] = query
+            self._answers[slot] = answer
+            self._dirty = True
+            save = self.path is not None and now - self._last_save >= self.save_interval
+        if save:
+            self.save()
+
+    def _reset(self, dim: int) -> None:
+        self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._created[:] = 0
+        self._last_used[:] = 0
+        self._queries = [None] * self.max_entries
+        self._answers = [None] * self.max_entries
+        self._size = 0
+
+    def invalidate(self) -> None:
+        """Drop every entry, e.g. after the document index changed"""
+        with self._lock:
+            if self._vectors is not None:
+                self._reset(self._vectors.shape[1])
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache to its file atomically"""
+        if self.path is None:
+            return
+        with self._lock:
+            size = self._size
+            text = json.dumps({'queries': self._queries[:size], 'answers': self._answers[:size]}).encode()
+            arrays = {
+                'fingerprint': np.array(self.fingerprint),
+                'vectors': self._vectors[:size] if self._vectors is not None else np.zeros((0, 0), np.float32),
+                'created': self._created[:size],
+                'last_used': self._last_used[:size],
+                'text': np.frombuffer(text, dtype=np.uint8),
+            }
+            self._last_save = time.time()
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save semantic cache to {self.path}: {e}")
+
+    def save_if_dirty(self) -> None:
+        if self._dirty:
+            self.save()
+
+    def load(self) -> None:
+        """Load the persisted cache if it exists and matches the fingerprint"""
+        try:
+            with np.load(self.path) as data:
+                if str(data['fingerprint']) != self.fingerprint:
+                    logging.info(f"Ignoring semantic cache {self.path}: built for another index")
+                    return
+                vectors = data['vectors']
+                created, last_used = data['created'], data['last_used']
+                text = json.loads(data['text'].tobytes())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable semantic cache {self.path}: {e}")
+            return
+
+        size = min(len(vectors), self.max_entries)
+        if size == 0:
+            return
+        # Keep the most recently used entries if the cache shrank
+        keep = np.argsort(last_used)[::-1][:size]
+        with self._lock:
+            self._reset(vectors.shape[1])
+            self._vectors[:size] = vectors[keep]
+            self._created[:size] = created[keep]
+            self._last_used[:size] = last_used[keep]
+            for slot, index in enumerate(keep):
+                self._queries[slot] = text['queries'][index]
+                self._answers[slot] = text['answers'][index]
+            self._size = size
+        logging.info(f"Loaded {size} cached answers from {self.path}")
+
+    def stats(self) -> dict:
+        """Hit and miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': self._size,
+            }
@@ -0,0 +1,325 @@
+"""
+Monte Carlo blackjack simulator for the shipped strategy tables.
+
+Rounds are played in batches as NumPy arrays: every step (deal, player decision,
+dealer draw, settlement) is applied to a whole batch at once, so throughput does
+not depend on Python-level per-round work. Each round is dealt from a freshly
+shuffled shoe of rules.decks decks; cards are drawn without replacement within
+the round. Player decisions come from strategy_table.get_actions for the same
+rule set, and the dealer peeks for blackjack under a ten or an Ace.
+
+Run from the command line:
+    python simulator.py --rounds 10000000 --decks 6 --seed 1
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rules import DEFAULT_RULES, RuleSet
+from strategy_table import ACTIONS, get_actions
+
+# Ranks are 1 (Ace) to 10 (ten-valued cards); shoe compositions are indexed by rank - 1
+HARD, SOFT, PAIR = 0, 1, 2
+_HIT, _STAND, _DOUBLE, _DOUBLE_OR_STAND, _SPLIT = (ACTIONS.index(code) for code in ('H', 'S', 'D', 'Ds', 'P'))
+_SURRENDER_OR_HIT, _SURRENDER_OR_STAND, _SURRENDER_OR_SPLIT = (ACTIONS.index(code) for code in ('Rh', 'Rs', 'Rp'))
+
+
+class SimulationStats:
+    """
+    Running statistics of per-round net results, in units of the initial bet.
+
+    Statistics from separate workers are combined with merge (or +) without
+    keeping individual results, using the parallel variance formula.
+    """
+
+    __slots__ = ('rounds', 'mean', 'm2')
+
+    def __init__(self, rounds: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.rounds = rounds
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_results(cls, results: np.ndarray) -> 'SimulationStats':
+        """Build statistics for an array of per-round results"""
+        if results.size == 0:
+            return cls()
+        mean = float(results.mean())
+        return cls(int(results.size), mean, float(((results - mean) ** 2).sum()))
+
+    def merge(self, other: 'SimulationStats') -> 'SimulationStats':
+        """Combine two sets of statistics into a new one"""
+        rounds = self.rounds + other.rounds
+        if rounds == 0:
+            return SimulationStats()
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.rounds / rounds
+        m2 = self.m2 + other.m2 + delta * delta * self.rounds * other.rounds / rounds
+        return SimulationStats(rounds, mean, m2)
+
+    __add__ = merge
+
+    @property
+    def ev(self) -> float:
+        """Expected value per round"""
+        return self.mean
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the per-round result"""
+        return self.m2 / (self.rounds - 1) if self.rounds > 1 else 0.0
+
+    @property
+    def standard_error(self) -> float:
+        """Standard error of the EV estimate"""
+        return math.sqrt(self.variance / self.rounds) if self.rounds else 0.0
+
+    def confidence_interval(self, z: float = 1.96) -> tuple:
+        """Confidence interval for the EV (95% by default)"""
+        margin = z * self.standard_error
+        return self.mean - margin, self.mean + margin
+
+    def __repr__(self):
+        low, high = self.confidence_interval()
+        return f"SimulationStats(rounds={self.rounds}, ev={self.mean:+.5f}, ci95=({low:+.5f}, {high:+.5f}))"
+
+
+def _new_shoes(rounds: int, decks: int) -> np.ndarray:
+    """Per-round card counts by rank for a full shoe"""
+    shoe = np.full(10, 4 * decks, dtype=np.int16)
+    shoe[9] = 16 * decks
+    return np.tile(shoe, (rounds, 1))
+
+
+def _draw(shoes: np.ndarray, rows: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw one card without replacement for each row in rows.
+
+    Rows must be distinct so every shoe is updated at most once per call.
+    """
+    cumulative = shoes[rows].cumsum(axis=1, dtype=np.int16)
+    position = rng.integers(0, cumulative[:, -1])
+    rank_index = (cumulative > position[:, None]).argmax(axis=1)
+    shoes[rows, rank_index] -= 1
+    return rank_index + 1
+
+
+def _play_batch(rounds: int, rules: RuleSet, rng: np.random.Generator) -> np.ndarray:
+    """Play a batch of rounds and return each round's net result"""
+    max_hands = rules.max_split_hands
+    shoes = _new_shoes(rounds, rules.decks)
+    all_rows = np.arange(rounds)
+
+    # Player hand state, one column per (possibly split) hand
+    hard = np.zeros((rounds, max_hands), dtype=np.int16)     # total counting Aces as 1
+    has_ace = np.zeros((rounds, max_hands), dtype=bool)
+    cards = np.zeros((rounds, max_hands), dtype=np.int8)
+    first = np.zeros((rounds, max_hands), dtype=np.int8)
+    second = np.zeros((rounds, max_hands), dtype=np.int8)
+    bet = np.ones((rounds, max_hands), dtype=np.float64)
+    from_split = np.zeros((rounds, max_hands), dtype=bool)
+    split_aces = np.zeros((rounds, max_hands), dtype=bool)
+    surrendered = np.zeros((rounds, max_hands), dtype=bool)
+    hand_count = np.ones(rounds, dtype=np.int8)
+
+    def deal(rows, k):
+        card = _draw(shoes, rows, rng)
+        hard[rows, k] += card
+        has_ace[rows, k] |= card == 1
+        cards[rows, k] += 1
+        is_first = cards[rows, k] == 1
+        first[rows[is_first], k] = card[is_first]
+        second[rows[~is_first], k] = card[~is_first]
+
+    # Initial deal in casino order: player, dealer up, player, dealer hole
+    deal(all_rows, 0)
+    upcard = _draw(shoes, all_rows, rng)
+    deal(all_rows, 0)
+    hole = _draw(shoes, all_rows, rng)
+
+    results = np.zeros(rounds, dtype=np.float64)
+    player_natural = has_ace[:, 0] & (hard[:, 0] == 11)
+    dealer_natural = ((upcard == 1) & (hole == 10)) | ((upcard == 10) & (hole == 1))
+    results[dealer_natural & ~player_natural] = -1.0
+    results[player_natural & ~dealer_natural] = rules.blackjack_payout
+    in_play = ~(player_natural | dealer_natural)
+    table_upcard = np.where(upcard == 1, 11, upcard)
+
+    # Player hands are played to completion one column at a time. Hands in the same
+    # column belong to different rounds, so their draws never touch the same shoe.
+    for k in range(max_hands):
+        active = np.flatnonzero(in_play & (hand_count > k))
+        while active.size:
+            # Split hands start with one card and take their second here
+            fresh = active[cards[active, k] == 1]
+            if fresh.size:
+                deal(fresh, k)
+
+            totals = hard[active, k] + np.where(has_ace[active, k] & (hard[active, k] <= 11), 10, 0)
+            finished = (totals >= 21) | split_aces[active, k]
+            active = active[~finished]
+            totals = totals[~finished]
+            if not active.size:
+                break
+
+            soft = has_ace[active, k] & (hard[active, k] <= 11)
+            pair = ((cards[active, k] == 2) & (first[active, k] == second[active, k])
+                    & (hand_count[active] < max_hands))
+            pair_total = np.where(first[active, k] == 1, 22, 2 * first[active, k])
+            hand_type = np.where(pair, PAIR, np.where(soft & (totals >= 13), SOFT, HARD))
+            lookup_total = np.where(pair, pair_total, np.where(hand_type == SOFT, totals, np.clip(totals, 5, 21)))
+            codes, _ = get_actions(hand_type, lookup_total, table_upcard[active], rules)
+            # Soft 12 only happens with unsplittable Aces: always hit
+            codes[soft & ~pair & (totals < 13)] = _HIT
+
+            # Surrender is only possible on the first two cards of an unsplit hand
+            can_surrender = rules.late_surrender & (cards[active, k] == 2) & (hand_count[active] == 1)
+            surrender = (codes >= _SURRENDER_OR_HIT) & can_surrender
+            codes = np.where(codes == _SURRENDER_OR_HIT, _HIT, codes)
+            codes = np.where(codes == _SURRENDER_OR_STAND, _STAND, codes)
+            codes = np.where(codes == _SURRENDER_OR_SPLIT, _SPLIT, codes)
+
+            can_double = (cards[active, k] == 2) & (~from_split[active, k] | rules.double_after_split)
+            double = ((codes == _DOUBLE) | (codes == _DOUBLE_OR_STAND)) & can_double & ~surrender
+            stand = ((codes == _STAND) | ((codes == _DOUBLE_OR_STAND) & ~can_double)) & ~surrender
+            split = (codes == _SPLIT) & ~surrender
+            hit = ~(double | stand | split | surrender)
+
+            if surrender.any():
+                surrendered[active[surrender], k] = True
+
+            if double.any():
+                rows = active[double]
+                bet[rows, k] = 2.0
+                deal(rows, k)
+
+            if hit.any():
+                deal(active[hit], k)
+
+            if split.any():
+                rows = active[split]
+                new = hand_count[rows].astype(np.intp)
+                card = first[rows, k]
+                aces = card == 1
+                for column in (k, new):
+                    hard[rows, column] = card
+                    has_ace[rows, column] = aces
+                    cards[rows, column] = 1
+                    first[rows, column] = card
+                    second[rows, column] = 0
+                    from_split[rows, column] = True
+                    split_aces[rows, column] = aces
+                hand_count[rows] += 1
+
+            # Doubled, standing and surrendered hands are finished; hits and splits keep playing
+            active = active[hit | split]
+
+    # Dealer plays out every round with at least one live hand
+    live_column = np.arange(max_hands) < hand_count[:, None]
+    player_totals = hard + np.where(has_ace & (hard <= 11), 10, 0)
+    needs_dealer = in_play & (live_column & (player_totals <= 21) & ~surrendered).any(axis=1)
+
+    dealer_hard = (upcard + hole).astype(np.int16)
+    dealer_ace = (upcard == 1) | (hole == 1)
+    rows = np.flatnonzero(needs_dealer)
+    while rows.size:
+        soft = dealer_ace[rows] & (dealer_hard[rows] <= 11)
+        totals = dealer_hard[rows] + np.where(soft, 10, 0)
+        draws = (totals < 17) | (rules.dealer_hits_soft_17 & soft & (totals == 17))
+        rows = rows[draws]
+        if rows.size:
+            card = _draw(shoes, rows, rng)
+            dealer_hard[rows] += card
+            dealer_ace[rows] |= card == 1
+    dealer_totals = dealer_hard + np.where(dealer_ace & (dealer_hard <= 11), 10, 0)
+
+    # Settle each live hand against the dealer
+    dealer = dealer_totals[:, None]
+    outcome = np.where(surrendered, -0.5,
+                       np.where(player_totals > 21, -1.0,
+                                np.where(dealer > 21, 1.0,
+                                         np.sign(player_totals - dealer).astype(np.float64))))
+    hand_results = (outcome * bet * live_column).sum(axis=1)
+    results[in_play] = hand_results[in_play]
+    return results
+
+
+def _simulate_worker(rounds: int, rules: RuleSet, seed: np.random.SeedSequence, batch_size: int) -> SimulationStats:
+    """Simulate rounds in batches with one independent random stream"""
+    rng = np.random.default_rng(seed)
+    stats = SimulationStats()
+    while rounds > 0:
+        batch = min(batch_size, rounds)
+        stats = stats.merge(SimulationStats.from_results(_play_batch(batch, rules, rng)))
+        rounds -= batch
+    return stats
+
+
+def simulate(rounds: int, rules: RuleSet = DEFAULT_RULES, seed=None, workers: int = None,
+             batch_size: int = 100_000) -> SimulationStats:
+    """
+    Estimate the EV of playing the strategy tables under a rule set.
+
+    Args:
+        rounds: Total number of rounds to play
+        rules: Table rules (deck count, S17/H17, DAS, payout, split limit)
+        seed: Seed for reproducible results; the same seed and worker count
+            always give the same statistics
+        workers: Number of worker processes (defaults to the CPU count)
+        batch_size: Rounds simulated together as one set of arrays
+
+    Returns:
+        Merged SimulationStats across all workers
+    """
+    if rounds < 0:
+        raise ValueError(f"Invalid round count: {rounds}. Must not be negative")
+    workers = max(1, min(workers or os.cpu_count() or 1, rounds or 1))
+
+    # One independent, reproducible random stream per worker
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [rounds // workers + (1 if i < rounds % workers else 0) for i in range(workers)]
+
+    if workers == 1:
+        return _simulate_worker(shares[0], rules, seeds[0], batch_size)
+
+    stats = SimulationStats()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for worker_stats in pool.map(_simulate_worker, shares, [rules] * workers, seeds, [batch_size] * workers):
+            stats = stats.merge(worker_stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the EV of the Grok21 strategy tables")
+    parser.add_argument("--rounds", type=int, default=1_000_000, help="number of rounds to play")
+    parser.add_argument("--decks", type=int, default=DEFAULT_RULES.decks, help="decks in the shoe")
+    parser.add_argument("--h17", action="store_true", help="dealer hits soft 17")
+    parser.add_argument("--no-das", action="store_true", help="no doubling after splits")
+    parser.add_argument("--surrender", action="store_true", help="late surrender allowed")
+    parser.add_argument("--payout", type=float, default=DEFAULT_RULES.blackjack_payout, help="blackjack payout")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+    args = parser.parse_args()
+
+    rules = RuleSet(decks=args.decks, dealer_hits_soft_17=args.h17,
+                    double_after_split=not args.no_das, late_surrender=args.surrender,
+                    blackjack_payout=args.payout)
+
+    import time
+    start = time.perf_counter()
+    stats = simulate(args.rounds, rules, seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    low, high = stats.confidence_interval()
+    print(f"Rules: {rules.describe()}")
+    print(f"Rounds: {stats.rounds:,} in {elapsed:.2f}s ({stats.rounds / elapsed:,.0f} rounds/s)")
+    print(f"EV: {stats.ev:+.4%} per round (95% CI {low:+.4%} to {high:+.4%})")
+    print(f"Std dev: {math.sqrt(stats.variance):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Strategy tables for rule sets other than the shipped one.
+
+Tables are derived cell by cell from the exact EV calculator, compiled into the
+same byte layout as strategy_table.ACTION_TABLE, and persisted to a versioned
+on-disk cache keyed by a hash of the strategy-relevant rules. A cached table
+loads with one small file read; derivation (seconds to minutes) only happens
+the first time a rule set is seen.
+
+Prebuild tables ahead of deploys so serving processes never derive:
+    python strategy_cache.py --decks 2 --h17 --surrender
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from ev_calculator import best_action, cell_expected_values
+from rules import RuleSet
+from strategy_table import HAND_TYPES, TOTAL_SLOTS, UPCARD_SLOTS, compile_tables, hard_table, pairs_table, soft_table
+
+# Bump CACHE_FORMAT_VERSION when the file layout changes and DERIVATION_VERSION
+# when the derivation logic changes; either one invalidates existing files.
+CACHE_FORMAT_VERSION = 1
+DERIVATION_VERSION = 1
+_MAGIC = b'G21T'
+_TABLE_SIZE = len(HAND_TYPES) * TOTAL_SLOTS * UPCARD_SLOTS
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "strategy_tables")
+
+
+def cache_dir() -> str:
+    """Cache directory, overridable with the GROK21_STRATEGY_CACHE environment variable"""
+    return os.getenv("GROK21_STRATEGY_CACHE", DEFAULT_CACHE_DIR)
+
+
+def rules_hash(rules: RuleSet) -> str:
+    """Stable hash of the rules that change optimal play, plus the derivation version"""
+    key = {
+        'derivation': DERIVATION_VERSION,
+        'strategy_key': list(rules.strategy_key()),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def cache_path(rules: RuleSet) -> str:
+    """File the table for a rule set is cached in"""
+    return os.path.join(cache_dir(), f"v{CACHE_FORMAT_VERSION}-{rules_hash(rules)}.bin")
+
+
+def derive_action(hand_type: str, player_value: int, dealer_upcard: int, rules: RuleSet) -> str:
+    """Derive the action for one table cell from exact EVs"""
+    return best_action(cell_expected_values(hand_type, player_value, dealer_upcard, rules))
+
+
+def _derive_upcard(dealer_upcard: int, rules: RuleSet) -> list:
+    """Derive every cell for one dealer upcard"""
+    cells = []
+    for hand_type, table in (('hard', hard_table), ('soft', soft_table), ('pair', pairs_table)):
+        for player_value in table:
+            cells.append((hand_type, player_value, derive_action(hand_type, player_value, dealer_upcard, rules)))
+    return cells
+
+
+def derive_tables(rules: RuleSet, workers: int = None) -> tuple:
+    """
+    Derive hard, soft and pair tables for a rule set.
+
+    The tables cover the same cells as the shipped tables. Upcards are derived in
+    parallel across worker processes (defaults to the CPU count).
+
+    Returns:
+        Tuple of (hard, soft, pairs) dicts in the strategy_table format
+    """
+    upcards = list(range(2, 12))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(upcards)))
+    if workers == 1:
+        results = [_derive_upcard(upcard, rules) for upcard in upcards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_derive_upcard, upcards, [rules] * len(upcards)))
+
+    tables = {'hard': {}, 'soft': {}, 'pair': {}}
+    for dealer_upcard, cells in zip(upcards, results):
+        for hand_type, player_value, action in cells:
+            tables[hand_type].setdefault(player_value, {})[dealer_upcard] = action
+    return tables['hard'], tables['soft'], tables['pair']
+
+
+def save_table(rules: RuleSet, table: bytes) -> str:
+    """
+    Write a compiled table to the cache.
+
+    The file holds a magic number, the format version, a JSON header describing
+    the rules, and the raw table bytes. It is written atomically so concurrent
+    readers never see a partial file.
+
+    Returns:
+        Path of the cache file
+    """
+    if len(table) != _TABLE_SIZE:
+        raise ValueError(f"Compiled table has {len(table)} cells, expected {_TABLE_SIZE}")
+    header = json.dumps({
+        'hash': rules_hash(rules),
+        'derivation': DERIVATION_VERSION,
+        'rules': rules.describe(),
+    }).encode()
+
+    path = cache_path(rules)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(_MAGIC + struct.pack('<BI', CACHE_FORMAT_VERSION, len(header)) + header + table)
+    os.replace(temp_path, path)
+    return path
+
+
+def read_cached_table(rules: RuleSet):
+    """
+    Read a cached table for a rule set.
+
+    Returns:
+        The compiled table bytes, or None if there is no valid cache file
+    """
+    path = cache_path(rules)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        if data[:4] != _MAGIC:
+            raise ValueError("bad magic number")
+        version, header_length = struct.unpack_from('<BI', data, 4)
+        if version != CACHE_FORMAT_VERSION:
+            raise ValueError(f"format version {version}")
+        offset = 4 + struct.calcsize('<BI')
+        header = json.loads(data[offset:offset + header_length])
+        if header.get('hash') != rules_hash(rules):
+            raise ValueError("rules hash mismatch")
+        table = data[offset + header_length:]
+        if len(table) != _TABLE_SIZE:
+            raise ValueError(f"table has {len(table)} cells")
+    except (ValueError, struct.error) as e:
+        logging.warning(f"Ignoring invalid strategy cache file {path}: {e}")
+        return None
+    return table
+
+
+def load_table(rules: RuleSet, derive: bool = True, workers: int = None) -> bytes:
+    """
+    Compiled table for a rule set, from the disk cache or derived and cached.
+
+    Args:
+        rules: Table rules
+        derive: Derive and cache the table when it is not cached yet; when False
+            a missing table raises instead
+        workers: Worker processes for derivation
+
+    Raises:
+        ValueError: If the table is not cached and derive is False
+    """
+    table = read_cached_table(rules)
+    if table is not None:
+        return table
+    if not derive:
+        raise ValueError(f"No cached strategy table for {rules.describe()}. Run strategy_cache.py to build it.")
+
+    logging.info(f"Deriving strategy table for {rules.describe()}; this can take a few minutes")
+    table = compile_tables(*derive_tables(rules, workers))
+    path = save_table(rules, table)
+    logging.info(f"Cached strategy table for {rules.describe()} at {path}")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive and cache strategy tables for a rule set")
+    parser.add_argument("--decks", type=int, default=6, help="decks in the shoe")
+    parser.add_argument("--h17", action="store_true", help="dealer hits soft 17")
+    parser.add_argument("--no-das", action="store_true", help="no doubling after splits")
+    parser.add_argument("--surrender", action="store_true", help="late surrender allowed")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if a cached table exists")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    rules = RuleSet(decks=args.decks, dealer_hits_soft_17=args.h17,
+                    double_after_split=not args.no_das, late_surrender=args.surrender)
+
+    if not args.force and read_cached_table(rules) is not None:
+        print(f"Already cached: {rules.describe()} at {cache_path(rules)}")
+        return
+    save_table(rules, compile_tables(*derive_tables(rules, args.workers)))
+    print(f"Cached: {rules.describe()} at {cache_path(rules)}")
+
+
+if __name__ == "__main__":
+    main()
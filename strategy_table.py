@@ -1,7 +1,15 @@
 # Full Basic Strategy heuristic tables for multi-deck (4-8), dealer stands on soft 17 (S17), DAS allowed, no surrender.
 # Actions: 'H' (Hit), 'S' (Stand), 'D' (Double if allowed, else Hit), 'Ds' (Double if allowed, else Stand), 'P' (Split)
+# Tables derived for other rule sets (see strategy_cache.py) may also use
+# 'Rh', 'Rs', 'Rp' (Surrender if allowed, else Hit / Stand / Split).
 # Dealer upcard: 2-10 (int), 11 for Ace.
 
+import re
+from dataclasses import replace
+from functools import lru_cache
+
+from rules import DEFAULT_RULES
+
 hard_table = {
     5: {2: 'H', 3: 'H', 4: 'H', 5: 'H', 6: 'H', 7: 'H', 8: 'H', 9: 'H', 10: 'H', 11: 'H'},
     6: {2: 'H', 3: 'H', 4: 'H', 5: 'H', 6: 'H', 7: 'H', 8: 'H', 9: 'H', 10: 'H', 11: 'H'},
@@ -28,7 +36,7 @@ soft_table = {
     15: {2: 'H', 3: 'H', 4: 'D', 5: 'D', 6: 'D', 7: 'H', 8: 'H', 9: 'H', 10: 'H', 11: 'H'},  # A4
     16: {2: 'H', 3: 'H', 4: 'D', 5: 'D', 6: 'D', 7: 'H', 8: 'H', 9: 'H', 10: 'H', 11: 'H'},  # A5
     17: {2: 'H', 3: 'D', 4: 'D', 5: 'D', 6: 'D', 7: 'H', 8: 'H', 9: 'H', 10: 'H', 11: 'H'},  # A6
-    18: {2: 'Ds', 3: 'Ds', 4: 'Ds', 5: 'Ds', 6: 'Ds', 7: 'S', 8: 'S', 9: 'H', 10: 'H', 11: 'H'},  # A7
+    18: {2: 'S', 3: 'Ds', 4: 'Ds', 5: 'Ds', 6: 'Ds', 7: 'S', 8: 'S', 9: 'H', 10: 'H', 11: 'H'},  # A7
     19: {2: 'S', 3: 'S', 4: 'S', 5: 'S', 6: 'S', 7: 'S', 8: 'S', 9: 'S', 10: 'S', 11: 'S'},  # A8
     20: {2: 'S', 3: 'S', 4: 'S', 5: 'S', 6: 'S', 7: 'S', 8: 'S', 9: 'S', 10: 'S', 11: 'S'}   # A9
 }
@@ -47,6 +55,167 @@ pairs_table = {
     22: {2: 'P', 3: 'P', 4: 'P', 5: 'P', 6: 'P', 7: 'P', 8: 'P', 9: 'P', 10: 'P', 11: 'P'}  # A-A (total 22)
 }
 
+# Compiled lookup table.
+# Every (hand type, total, dealer upcard) cell is packed into one flat, fixed-size
+# byte string so a lookup is a single index operation instead of three dict walks.
+# Cell value is an index into ACTIONS, or INVALID_CELL for combinations with no strategy.
+HAND_TYPES = ('hard', 'soft', 'pair')
+ACTIONS = ('H', 'S', 'D', 'Ds', 'P', 'Rh', 'Rs', 'Rp')
+INVALID_CELL = 0xFF
+TOTAL_SLOTS = 23    # totals 0-22 (22 is the A-A pair)
+UPCARD_SLOTS = 12   # upcards 0-11 (11 is the Ace)
+HAND_SLOTS = TOTAL_SLOTS * UPCARD_SLOTS
+
+_HAND_TYPE_BASE = {hand_type: index * HAND_SLOTS for index, hand_type in enumerate(HAND_TYPES)}
+_ACTION_INDEX = {action: index for index, action in enumerate(ACTIONS)}
+
+
+def compile_tables(hard: dict, soft: dict, pairs: dict) -> bytes:
+    """
+    Pack the three strategy tables into a flat byte string.
+
+    The layout is hand type (HAND_TYPES order) x total (0-22) x dealer upcard (0-11),
+    one byte per cell. Cells missing from the tables hold INVALID_CELL.
+
+    Raises:
+        ValueError: If a table contains a total, upcard or action code outside the layout
+    """
+    cells = bytearray([INVALID_CELL]) * (len(HAND_TYPES) * HAND_SLOTS)
+    for hand_type, table in zip(HAND_TYPES, (hard, soft, pairs)):
+        base = _HAND_TYPE_BASE[hand_type]
+        for total, actions in table.items():
+            if not 0 <= total < TOTAL_SLOTS:
+                raise ValueError(f"{hand_type} total {total} does not fit the compiled table")
+            for upcard, action in actions.items():
+                if not 2 <= upcard < UPCARD_SLOTS:
+                    raise ValueError(f"Dealer upcard {upcard} does not fit the compiled table")
+                if action not in _ACTION_INDEX:
+                    raise ValueError(f"Unknown action code {action!r} for {hand_type} {total} vs {upcard}")
+                cells[base + total * UPCARD_SLOTS + upcard] = _ACTION_INDEX[action]
+    return bytes(cells)
+
+
+ACTION_TABLE = compile_tables(hard_table, soft_table, pairs_table)
+
+# Compiled tables by rule set. Tables for other rule sets are loaded from the
+# on-disk cache (or derived once) the first time they are asked for.
+_tables_by_rules = {DEFAULT_RULES: ACTION_TABLE}
+
+
+def get_table(rules=None) -> bytes:
+    """
+    Compiled action table for a rule set (defaults to the shipped S17/DAS tables).
+
+    Tables for new rule sets are derived by exact EV analysis and cached on disk
+    by strategy_cache; later calls are a dictionary lookup.
+    """
+    if rules is None:
+        return ACTION_TABLE
+    table = _tables_by_rules.get(rules)
+    if table is None:
+        if rules.strategy_key() == DEFAULT_RULES.strategy_key():
+            table = ACTION_TABLE
+        else:
+            from strategy_cache import load_table
+            table = load_table(rules)
+        _tables_by_rules[rules] = table
+    return table
+
+# Hi-Lo index plays for 6-deck S17 DAS: the Illustrious 18 and, when late surrender
+# is allowed, the Fab 4. Each cell maps to (action below the lowest index,
+# ((true count index, action at or above it), ...)) with indexes ascending, so the
+# highest index the true count reaches decides the play. They override the table
+# for the listed cells only when get_action is given a true count, and only for
+# the rule sets they were derived for (see _INDEX_PLAYS_BY_STRATEGY).
+index_plays = {
+    ('hard', 16, 10): ('H', ((0, 'S'),)),
+    ('hard', 15, 10): ('H', ((4, 'S'),)),
+    ('pair', 20, 5): ('S', ((5, 'P'),)),
+    ('pair', 20, 6): ('S', ((4, 'P'),)),
+    ('hard', 10, 10): ('H', ((4, 'D'),)),
+    ('hard', 12, 3): ('H', ((2, 'S'),)),
+    ('hard', 12, 2): ('H', ((3, 'S'),)),
+    ('hard', 11, 11): ('H', ((1, 'D'),)),
+    ('hard', 9, 2): ('H', ((1, 'D'),)),
+    ('hard', 10, 11): ('H', ((4, 'D'),)),
+    ('hard', 9, 7): ('H', ((3, 'D'),)),
+    ('hard', 16, 9): ('H', ((5, 'S'),)),
+    ('hard', 13, 2): ('H', ((-1, 'S'),)),
+    ('hard', 12, 4): ('H', ((0, 'S'),)),
+    ('hard', 12, 5): ('H', ((-2, 'S'),)),
+    ('hard', 12, 6): ('H', ((-1, 'S'),)),
+    ('hard', 13, 3): ('H', ((-2, 'S'),)),
+}
+
+surrender_index_plays = {
+    ('hard', 14, 10): ('H', ((3, 'Rh'),)),
+    ('hard', 15, 10): ('H', ((0, 'Rh'), (4, 'Rs'))),
+    ('hard', 15, 9): ('H', ((2, 'Rh'),)),
+    ('hard', 15, 11): ('H', ((1, 'Rh'),)),
+}
+
+# Take insurance at a true count of +3 or more (the first of the Illustrious 18)
+INSURANCE_INDEX = 3
+
+
+def compile_index_plays(plays: dict) -> dict:
+    """
+    Key index plays by their offset in the compiled action table.
+
+    Raises:
+        ValueError: If a play names a cell outside the layout, an unknown action
+            code, or indexes that are not ascending
+    """
+    compiled = {}
+    for (hand_type, total, upcard), (below, thresholds) in plays.items():
+        if hand_type not in _HAND_TYPE_BASE or not 0 <= total < TOTAL_SLOTS or not 2 <= upcard < UPCARD_SLOTS:
+            raise ValueError(f"Index play for {hand_type} {total} vs {upcard} does not fit the compiled table")
+        for action in (below, *(action for _, action in thresholds)):
+            if action not in _ACTION_INDEX:
+                raise ValueError(f"Unknown action code {action!r} for {hand_type} {total} vs {upcard}")
+        indexes = [index for index, _ in thresholds]
+        if indexes != sorted(indexes):
+            raise ValueError(f"Index play indexes for {hand_type} {total} vs {upcard} must ascend")
+        compiled[_HAND_TYPE_BASE[hand_type] + total * UPCARD_SLOTS + upcard] = (below, tuple(thresholds))
+    return compiled
+
+
+# Index plays by the strategy key (RuleSet.strategy_key) they were derived for.
+# Other rule sets, e.g. H17 or a different deck count, have different indexes, so
+# their table is played as is rather than with borrowed deviations.
+_INDEX_PLAYS_BY_STRATEGY = {
+    DEFAULT_RULES.strategy_key(): compile_index_plays(index_plays),
+    replace(DEFAULT_RULES, late_surrender=True).strategy_key():
+        compile_index_plays({**index_plays, **surrender_index_plays}),
+}
+
+# Surrender cell to use when a non-surrender index play changes its fallback
+_SURRENDER_FALLBACK = {'H': 'Rh', 'S': 'Rs', 'P': 'Rp'}
+
+
+def _apply_index_play(offset: int, action: str, true_count: float, rules) -> str:
+    """Replace a table action with its index play for the true count, if the cell has one"""
+    plays = _INDEX_PLAYS_BY_STRATEGY.get((rules or DEFAULT_RULES).strategy_key())
+    play = plays.get(offset) if plays is not None else None
+    if play is None:
+        return action
+    deviation, thresholds = play
+    surrender_play = deviation.startswith('R') or any(code.startswith('R') for _, code in thresholds)
+    for index, code in thresholds:
+        if true_count < index:
+            break
+        deviation = code
+    if action.startswith('R') and not surrender_play:
+        # An Illustrious 18 play on a surrender cell only changes what to do
+        # when surrender isn't offered; surrendering stays the first choice
+        return _SURRENDER_FALLBACK.get(deviation, action)
+    return deviation
+
+
+def should_take_insurance(true_count: float) -> bool:
+    """Insurance is worth taking at a Hi-Lo true count of INSURANCE_INDEX or more"""
+    return true_count >= INSURANCE_INDEX
+
 def get_action_text(action_code: str) -> str:
     """Convert action codes to simple, obvious words"""
     action_map = {
@@ -54,11 +223,15 @@ def get_action_text(action_code: str) -> str:
         'S': 'Pass',
         'D': 'Double',
         'Ds': 'Double or Pass',
-        'P': 'Split'
+        'P': 'Split',
+        'R': 'Surrender',
+        'Rh': 'Surrender or Hit',
+        'Rs': 'Surrender or Pass',
+        'Rp': 'Surrender or Split'
     }
     return action_map.get(action_code, action_code)
 
-def get_action(hand_type: str, player_value: int, dealer_upcard: int) -> str:
+def get_action(hand_type: str, player_value: int, dealer_upcard: int, rules=None, true_count: float = None) -> str:
     """
     Get the optimal blackjack action based on hand type, player value, and dealer upcard.
     
@@ -66,13 +239,49 @@ def get_action(hand_type: str, player_value: int, dealer_upcard: int) -> str:
         hand_type: Type of hand - "hard", "soft", or "pair"
         player_value: Player's hand total (all hand types now use totals)
         dealer_upcard: Dealer's visible card (2-11, where 11 represents Ace)
+        rules: Optional RuleSet; defaults to the shipped multi-deck S17/DAS tables
+        true_count: Optional Hi-Lo true count; when given, index plays (see
+            index_plays) override the table for the cells they cover
         
     Returns:
-        Action code: 'H' (Hit), 'S' (Stand), 'D' (Double), 'Ds' (Double if allowed, else Stand), 'P' (Split)
+        Action code: 'H' (Hit), 'S' (Stand), 'D' (Double), 'Ds' (Double if allowed, else Stand), 'P' (Split),
+        or for surrender games 'Rh', 'Rs', 'Rp' (Surrender if allowed, else Hit / Stand / Split)
         
     Raises:
         ValueError: If inputs are invalid or out of range
     """
+    table = ACTION_TABLE if rules is None else get_table(rules)
+
+    # Fast path: well-formed input is a single index into the compiled table
+    base = _HAND_TYPE_BASE.get(hand_type) if type(hand_type) is str else None
+    if (base is not None and type(player_value) is int and type(dealer_upcard) is int
+            and 0 <= player_value < TOTAL_SLOTS and 0 <= dealer_upcard < UPCARD_SLOTS):
+        offset = base + player_value * UPCARD_SLOTS + dealer_upcard
+        cell = table[offset]
+        if cell != INVALID_CELL:
+            if true_count is None:
+                return ACTIONS[cell]
+            return _apply_index_play(offset, ACTIONS[cell], true_count, rules)
+
+    # Slow path: normalize what we can and raise a descriptive error for the rest
+    action = _get_action_validated(hand_type, player_value, dealer_upcard, table)
+    if true_count is None:
+        return action
+    offset = _HAND_TYPE_BASE[hand_type.lower()] + player_value * UPCARD_SLOTS + dealer_upcard
+    return _apply_index_play(offset, action, true_count, rules)
+
+def get_action_unchecked(hand_type: str, player_value: int, dealer_upcard: int, table: bytes = ACTION_TABLE) -> str:
+    """
+    Get the action for a cell without any validation.
+
+    For hot loops where the caller already guarantees a lowercase hand type and an
+    in-range total and upcard. Invalid input may raise KeyError/IndexError or return
+    an unrelated cell. Pass table=get_table(rules) to play another rule set.
+    """
+    return ACTIONS[table[_HAND_TYPE_BASE[hand_type] + player_value * UPCARD_SLOTS + dealer_upcard]]
+
+def _get_action_validated(hand_type, player_value, dealer_upcard, table=ACTION_TABLE) -> str:
+    """Validate inputs the fast path rejected, then look the cell up."""
     # Validate inputs
     if not isinstance(hand_type, str):
         raise ValueError(f"Hand type must be a string, got {type(hand_type).__name__}")
@@ -107,31 +316,210 @@ def get_action(hand_type: str, player_value: int, dealer_upcard: int) -> str:
         if player_value not in valid_pair_totals:
             raise ValueError(f"Invalid pair total: {player_value}. Valid pair totals are: 4(2-2), 6(3-3), 8(4-4), 10(5-5), 12(6-6), 14(7-7), 16(8-8), 18(9-9), 20(10-10), 22(A-A)")
     
-    # Get the appropriate table
-    table = {
-        'hard': hard_table,
-        'soft': soft_table,
-        'pair': pairs_table
-    }.get(hand_type_lower)
-    
-    # Handle edge cases with special rules
-    if hand_type_lower == 'hard' and player_value < 5:
-        return 'H'  # Always hit very low hands
-    
-    if hand_type_lower == 'hard' and player_value > 21:
-        raise ValueError(f"Hand total {player_value} is bust - no strategy needed")
-    
-    # Get actions from table
-    actions = table.get(player_value)
-    if actions is None:
-        raise ValueError(f"No strategy found for {hand_type} hand total {player_value}. Please check your input and try again.")
-    
-    # Normalize dealer upcard (Ace = 11)
-    dealer_key = dealer_upcard if dealer_upcard <= 10 else 11
-    
-    # Get action from the specific dealer upcard
-    action = actions.get(dealer_key)
-    if action is None:
+    cell = table[_HAND_TYPE_BASE[hand_type_lower] + player_value * UPCARD_SLOTS + dealer_upcard]
+    if cell == INVALID_CELL:
         raise ValueError(f"No strategy found for {hand_type} {player_value} vs dealer {dealer_upcard}. Please check your input and try again.")
-    
-    return action
\ No newline at end of file
+
+    return ACTIONS[cell]
+
+# Card input: face cards count 10, Aces are 11 (1 is accepted too)
+_CARD_VALUES = {'A': 11, 'K': 10, 'Q': 10, 'J': 10, 'T': 10}
+# Fallback when a hand has three or more cards and can no longer double or surrender
+_MULTI_CARD_FALLBACK = {'D': 'H', 'Ds': 'S', 'Rh': 'H', 'Rs': 'S'}
+
+def card_value(card) -> int:
+    """Convert a card (2-11, 1 for Ace, or 'A', 'K', 'Q', 'J', 'T', '2'-'10') to 2-11"""
+    if isinstance(card, str):
+        value = _CARD_VALUES.get(card.strip().upper())
+        if value is None and card.strip().isdigit():
+            value = int(card)
+    elif isinstance(card, int) and not isinstance(card, bool):
+        value = card
+    else:
+        value = None
+    if value == 1:
+        value = 11
+    if value is None or value < 2 or value > 11:
+        raise ValueError(f"Invalid card: {card!r}. Use 2-10, 11 or 'A' for Ace, or 'J', 'Q', 'K'")
+    return value
+
+_CARD_SEPARATOR = re.compile(r"[\s,/+-]+")
+
+def parse_cards(text: str) -> list:
+    """
+    Split typed card input such as "A 7", "10-4-2" or "K,Q" into card tokens.
+
+    Tokens are not validated here; card_value (and everything that takes cards)
+    rejects the invalid ones.
+    """
+    return [card for card in _CARD_SEPARATOR.split(text.strip()) if card]
+
+def classify_hand(cards) -> tuple:
+    """
+    Classify a hand from its cards in one pass.
+
+    Args:
+        cards: Player's cards, e.g. [10, 2], [11, 3, 4] or ['A', 'K']
+
+    Returns:
+        Tuple of (hand_type, total) in get_action conventions: two equal cards are
+        a "pair" (A-A is total 22), a hand counting an Ace as 11 is "soft", and
+        anything else is "hard"
+
+    Raises:
+        ValueError: If a card is invalid or there are fewer than two cards
+    """
+    hard = 0
+    has_ace = False
+    count = 0
+    first = None
+    all_equal = True
+    for card in cards:
+        value = card_value(card)
+        if first is None:
+            first = value
+        elif value != first:
+            all_equal = False
+        has_ace = has_ace or value == 11
+        hard += 1 if value == 11 else value
+        count += 1
+
+    if count < 2:
+        raise ValueError("A hand needs at least two cards")
+    if count == 2 and all_equal:
+        return 'pair', 2 * first
+    if has_ace and hard + 10 <= 21:
+        return 'soft', hard + 10
+    return 'hard', hard
+
+def get_action_for_cards(cards, dealer_upcard: int, rules=None) -> str:
+    """
+    Get the optimal action for the actual cards in a hand.
+
+    Two-card hands are answered from the strategy table. Hands of three or more
+    cards can no longer double, split or surrender, and stiff totals (hard 12-16,
+    soft 18) are resolved by exact EV for that composition, so e.g. 16 made of
+    10-4-2 stands against a 10 while 10-6 hits. Results are memoized on the
+    sorted card composition.
+
+    Args:
+        cards: Player's cards, e.g. [10, 2], [11, 3, 4] or ['A', 'K']
+        dealer_upcard: Dealer's visible card, in the same forms as the player's
+            cards (2-11 or 1 for an Ace, or 'A', 'K', ...)
+        rules: Optional RuleSet; defaults to the shipped multi-deck S17/DAS tables
+
+    Returns:
+        Action code, as for get_action
+
+    Raises:
+        ValueError: If a card or the upcard is invalid, or the hand is bust
+    """
+    composition = tuple(sorted(card_value(card) for card in cards))
+    return _action_for_composition(composition, card_value(dealer_upcard), rules)
+
+@lru_cache(maxsize=1 << 16)
+def _action_for_composition(composition: tuple, dealer_upcard: int, rules) -> str:
+    hand_type, total = classify_hand(composition)
+    if total > 21 and hand_type != 'pair':
+        raise ValueError(f"Hand total {total} is bust - no strategy needed")
+
+    if len(composition) == 2:
+        if hand_type == 'soft' and total == 21:
+            get_action('hard', 21, dealer_upcard, rules)  # validates the upcard
+            return 'S'  # Blackjack
+        return get_action(hand_type, total, dealer_upcard, rules)
+
+    if (hand_type == 'hard' and 12 <= total <= 16) or (hand_type == 'soft' and total == 18):
+        get_action(hand_type, total, dealer_upcard, rules)  # validates the upcard
+        from ev_calculator import expected_values
+        values = expected_values(list(composition), dealer_upcard, rules or DEFAULT_RULES)
+        return 'H' if values['H'] > values['S'] else 'S'
+
+    if hand_type == 'soft' and total == 21:
+        hand_type, total = 'hard', 21
+    action = get_action(hand_type, total, dealer_upcard, rules)
+    return _MULTI_CARD_FALLBACK.get(action, action)
+
+_action_arrays = {}
+
+def _is_integer_array(values) -> bool:
+    """Integer dtype, or an object array of ints (numbers too big for int64 end up there)"""
+    import numpy as np
+
+    if values.dtype.kind in 'iu':
+        return True
+    return values.dtype.kind == 'O' and all(
+        isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in values.flat)
+
+def _bounded_indexes(values, low: int, high: int) -> tuple:
+    """
+    (indexes, in_range) for an integer array: in_range marks low <= value < high,
+    and indexes are the values as intp, with low wherever they are out of range.
+    Comparing before converting keeps huge or unsigned values from wrapping.
+    """
+    import numpy as np
+
+    if values.dtype.kind == 'O':
+        in_range = np.array([low <= value < high for value in values.flat], dtype=bool).reshape(values.shape)
+    else:
+        in_range = (values >= low) & (values < high)
+    indexes = np.full(values.shape, low, dtype=np.intp)
+    indexes[in_range] = values[in_range].astype(np.intp)
+    return indexes, in_range
+
+def get_actions(hand_types, totals, upcards, rules=None):
+    """
+    Look up actions for many hands at once with a single vectorized gather.
+
+    Args:
+        hand_types: Array of hand type names ("hard", "soft", "pair", any case) or
+            integer indexes into HAND_TYPES
+        totals: Integer array of player totals (same conventions as get_action)
+        upcards: Integer array of dealer upcards (2-11, where 11 represents Ace)
+        rules: Optional RuleSet; defaults to the shipped multi-deck S17/DAS tables
+
+    Returns:
+        Tuple of (codes, valid): codes is a uint8 array of indexes into ACTIONS,
+        holding INVALID_CELL where valid is False. valid is a boolean mask marking
+        the hands get_action would have answered instead of raising ValueError.
+        Out-of-range values, however large, are just invalid hands.
+
+    Raises:
+        ValueError: If the arrays have different shapes or non-integer totals/upcards
+    """
+    import numpy as np
+
+    table = ACTION_TABLE if rules is None else get_table(rules)
+    action_array = _action_arrays.get(table)
+    if action_array is None:
+        action_array = _action_arrays[table] = np.frombuffer(table, dtype=np.uint8)
+
+    hand_types = np.asarray(hand_types)
+    totals = np.asarray(totals)
+    upcards = np.asarray(upcards)
+
+    if not hand_types.shape == totals.shape == upcards.shape:
+        raise ValueError(f"Input arrays must have the same shape, got {hand_types.shape}, {totals.shape} and {upcards.shape}")
+    if not (_is_integer_array(totals) and _is_integer_array(upcards)):
+        raise ValueError(f"Totals and upcards must be integer arrays, got {totals.dtype} and {upcards.dtype}")
+
+    if hand_types.dtype.kind in 'US' or (hand_types.dtype.kind == 'O' and not _is_integer_array(hand_types)):
+        lowered = np.char.lower(hand_types.astype(str))
+        type_index = np.full(hand_types.shape, -1, dtype=np.intp)
+        for index, name in enumerate(HAND_TYPES):
+            type_index[lowered == name] = index
+        type_valid = type_index >= 0
+    elif _is_integer_array(hand_types):
+        type_index, type_valid = _bounded_indexes(hand_types, 0, len(HAND_TYPES))
+    else:
+        raise ValueError(f"Hand types must be strings or integer indexes, got {hand_types.dtype}")
+
+    total_index, total_valid = _bounded_indexes(totals, 0, TOTAL_SLOTS)
+    upcard_index, upcard_valid = _bounded_indexes(upcards, 2, UPCARD_SLOTS)
+    valid = type_valid & total_valid & upcard_valid
+    offsets = np.where(valid, type_index * HAND_SLOTS + total_index * UPCARD_SLOTS + upcard_index, 0)
+
+    codes = action_array[offsets]
+    codes[~valid] = INVALID_CELL
+    valid &= codes != INVALID_CELL
+    return codes, valid
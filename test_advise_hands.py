@@ -0,0 +1,104 @@
+"""
+Tests for the streaming hand-log advisor.
+"""
+
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from advise_hands import advise, advise_batch, detect_format, read_records
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestAdviseBatch:
+    """Test advice for table cells, cards and invalid records"""
+
+    def test_cells_and_cards(self):
+        records = [({'hand_type': 'hard', 'total': '16', 'upcard': '10'}, None),
+                   ({'hand_type': 'Pair', 'total': 16, 'upcard': 'A'}, None),
+                   ({'cards': '10-4-2', 'upcard': 10}, None),
+                   ({'cards': ['A', 7], 'upcard': 9}, None)]
+        assert advise_batch(records) == [('H', None), ('P', None), ('S', None), ('H', None)]
+
+    def test_invalid_records(self):
+        """Test that each bad record gets an error and doesn't affect the others"""
+        records = [({'hand_type': 'soft', 'total': 30, 'upcard': 5}, None),
+                   ({'hand_type': 'hard', 'total': 'x', 'upcard': 5}, None),
+                   ({'hand_type': 'hard', 'total': 12}, None),
+                   ({'upcard': 5}, None),
+                   ({}, "Line 5: invalid JSON"),
+                   ({'hand_type': 'hard', 'total': 12, 'upcard': 4}, None)]
+        results = advise_batch(records)
+        assert "Invalid soft hand total" in results[0][1]
+        assert all(action is None and error for action, error in results[:5])
+        assert results[4] == (None, "Line 5: invalid JSON")
+        assert results[5] == ('S', None)
+
+    def test_out_of_range_totals(self):
+        """Test that huge or negative totals are per-record errors"""
+        records = [({'hand_type': 'hard', 'total': '99999999999999999999', 'upcard': 10}, None),
+                   ({'hand_type': 'hard', 'total': 1e300, 'upcard': 10}, None),
+                   ({'hand_type': 'hard', 'total': -16, 'upcard': 10}, None),
+                   ({'hand_type': 'hard', 'total': 16, 'upcard': 10}, None)]
+        results = advise_batch(records)
+        assert all(action is None and "Must be between 0 and 40" in error for action, error in results[:3])
+        assert results[3] == ('H', None)
+
+
+class TestAdvise:
+    """Test streaming whole inputs"""
+
+    def test_csv_round_trip(self, tmp_path):
+        """Test that CSV output keeps the input columns and adds action, text and error"""
+        path = tmp_path / "hands.csv"
+        path.write_text("id,hand_type,total,upcard\n1,hard,16,10\n2,soft,30,5\n3,hard,11,6\n")
+        out = io.StringIO()
+        assert advise([str(path)], out, batch_size=2) == (3, 1)
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "id,hand_type,total,upcard,action,text,error"
+        assert lines[1] == "1,hard,16,10,H,Hit,"
+        assert lines[2].startswith("2,soft,30,5,,,")
+        assert lines[3] == "3,hard,11,6,D,Double,"
+
+    def test_gzipped_jsonl(self, tmp_path):
+        path = tmp_path / "hands.jsonl.gz"
+        with gzip.open(path, 'wt') as f:
+            f.write('{"hand": 1, "cards": ["A", "K"], "upcard": 10}\n\nnot json\n')
+        assert detect_format(str(path)) == 'jsonl'
+        out = io.StringIO()
+        assert advise([str(path)], out) == (2, 1)
+        first, second = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert first == {'hand': 1, 'cards': ['A', 'K'], 'upcard': 10, 'action': 'S', 'text': 'Pass'}
+        assert second['error'] == "Line 3: invalid JSON"
+
+    def test_reads_lazily(self):
+        """Test that records are parsed as they are consumed, not all up front"""
+        lines = iter(['{"hand_type": "hard", "total": 16, "upcard": 10}\n'] * 3)
+        records = read_records(lines, 'jsonl')
+        next(records)
+        assert len(list(lines)) == 2
+
+    def test_rejects_bad_options(self):
+        with pytest.raises(ValueError):
+            advise(["-"], io.StringIO(), fmt='xml')
+        with pytest.raises(ValueError):
+            advise(["-"], io.StringIO(), batch_size=0)
+
+    def test_cli_does_not_load_streamlit_or_rag(self):
+        code = ("import sys, advise_hands; "
+                "print(any(name in sys.modules for name in ('streamlit', 'rag_chain', 'langchain', 'openai')))")
+        assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                              check=True, cwd=HERE).stdout.strip() == "False"
+
+    def test_cli_streams_stdin(self):
+        result = subprocess.run([sys.executable, os.path.join(HERE, "advise_hands.py"), "--format", "jsonl"],
+                                input='{"hand_type": "hard", "total": 9, "upcard": 4}\n',
+                                capture_output=True, text=True, check=True)
+        assert json.loads(result.stdout)['action'] == 'D'
+        assert "Advised 1 hands (0 invalid)" in result.stderr
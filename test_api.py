@@ -0,0 +1,147 @@
+"""
+Tests for the headless HTTP API.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+import api
+from rag_warmup import READY, WARMING
+
+
+def request(method, path, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(send())
+
+
+class FakeChain:
+    def __init__(self):
+        self.questions = []
+
+    async def aget_response(self, query):
+        self.questions.append(query)
+        return "Counting tracks the ratio of high cards to low cards."
+
+
+class TestActionEndpoints:
+    """Test single and batch table lookups"""
+
+    def test_single_action(self):
+        response = request("GET", "/action", params={'hand_type': 'hard', 'total': 16, 'upcard': 10})
+        assert response.status_code == 200
+        assert response.json() == {'action': 'H', 'text': 'Hit'}
+
+    def test_true_count_applies_index_plays(self):
+        response = request("GET", "/action", params={'hand_type': 'hard', 'total': 16, 'upcard': 10, 'true_count': 1})
+        assert response.json()['action'] == 'S'
+
+    def test_invalid_lookups(self):
+        """Test that bad input is a 400 with get_action's message"""
+        response = request("GET", "/action", params={'hand_type': 'hard', 'total': 25, 'upcard': 10})
+        assert response.status_code == 400
+        assert "Invalid hard hand total" in response.json()['error']
+        assert request("GET", "/action", params={'hand_type': 'hard', 'upcard': 10}).status_code == 400
+        assert request("GET", "/action", params={'hand_type': 'hard', 'total': 'x', 'upcard': 10}).status_code == 400
+        for true_count in ('nan', 'inf', '-inf'):
+            assert request("GET", "/action", params={'hand_type': 'hard', 'total': 16, 'upcard': 10,
+                                                    'true_count': true_count}).status_code == 400
+
+    def test_batch_matches_single_lookups(self):
+        hands = [{'hand_type': 'hard', 'total': 16, 'upcard': 10},
+                 {'hand_type': 'Pair', 'total': 16, 'upcard': 11},
+                 {'hand_type': 'soft', 'total': 18, 'upcard': 3},
+                 {'hand_type': 'hard', 'total': 30, 'upcard': 10}]
+        response = request("POST", "/actions", json={'hands': hands})
+        assert response.status_code == 200
+        assert response.json() == {'actions': ['H', 'P', 'Ds', None]}
+
+    def test_batch_validation(self):
+        assert request("POST", "/actions", json={'hands': [{'hand_type': 'hard'}]}).status_code == 400
+        assert request("POST", "/actions", json={'hands': [{'hand_type': 'hard', 'total': 1.5,
+                                                            'upcard': 10}]}).status_code == 400
+        assert request("POST", "/actions", content=b"not json").status_code == 400
+        for total, upcard in ((10 ** 30, 10), (-1, 10), (16, 2 ** 64)):
+            response = request("POST", "/actions", json={'hands': [{'hand_type': 'hard', 'total': total,
+                                                                    'upcard': upcard}]})
+            assert response.status_code == 400
+
+    def test_upcard_range_matches_single_lookup(self):
+        """Test that /actions rejects the same upcards as /action, with the same message"""
+        single = request("GET", "/action", params={'hand_type': 'hard', 'total': 16, 'upcard': 1})
+        batch = request("POST", "/actions", json={'hands': [{'hand_type': 'hard', 'total': 16, 'upcard': 1}]})
+        assert single.status_code == batch.status_code == 400
+        assert single.json() == batch.json()
+        assert request("POST", "/actions", json={'hands': []}).json() == {'actions': []}
+
+
+class TestAskEndpoint:
+    """Test questions: table answers, the warm chain, and warm-up"""
+
+    def test_hand_question_uses_the_table(self, monkeypatch):
+        monkeypatch.setattr(api, "ready_chain", lambda: None)
+        response = request("POST", "/ask", json={'question': "Should I hit 16 vs 10?"})
+        assert response.status_code == 200
+        assert response.json()['source'] == 'table'
+        assert response.json()['answer'].startswith("**Hit**")
+
+    def test_open_question_uses_the_chain(self, monkeypatch):
+        chain = FakeChain()
+        monkeypatch.setattr(api, "ready_chain", lambda: chain)
+        response = request("POST", "/ask", json={'question': "How does card counting work?"})
+        assert response.json() == {'answer': "Counting tracks the ratio of high cards to low cards.",
+                                   'source': 'grok'}
+        assert chain.questions == ["How does card counting work?"]
+
+    def test_warming_up(self, monkeypatch):
+        monkeypatch.setattr(api, "ready_chain", lambda: None)
+        monkeypatch.setattr(api, "chain_status", lambda: (WARMING, None))
+        response = request("POST", "/ask", json={'question': "How does card counting work?"})
+        assert response.status_code == 503
+        assert response.headers['retry-after'] == str(api.WARMUP_RETRY_AFTER)
+
+    def test_empty_question(self):
+        assert request("POST", "/ask", json={'question': "  "}).status_code == 400
+
+
+class TestServer:
+    """Test routing, health and the ASGI lifespan"""
+
+    def test_health(self, monkeypatch):
+        monkeypatch.setattr(api, "chain_status", lambda: (READY, None))
+        assert request("GET", "/health").json() == {'status': 'ok', 'grok': 'ready'}
+
+    def test_unknown_routes(self):
+        assert request("GET", "/nope").status_code == 404
+        assert request("POST", "/action").status_code == 405
+        assert request("GET", "/health").headers['content-type'] == 'application/json'
+
+    def test_startup_starts_warmup(self, monkeypatch):
+        started = []
+        monkeypatch.setattr(api, "start_warmup", lambda: started.append(True))
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(api.app({'type': 'lifespan'}, receive, send))
+        assert started == [True]
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+
+    def test_importing_api_does_not_load_rag(self):
+        """Test that the server process doesn't pay for the RAG stack until the warm-up thread loads it"""
+        import subprocess
+        import sys
+        code = "import api, sys; print(json.dumps(['rag_chain' in sys.modules, 'streamlit' in sys.modules]))"
+        output = subprocess.run([sys.executable, "-c", "import json; " + code], capture_output=True, text=True,
+                                check=True).stdout
+        assert json.loads(output) == [False, False]
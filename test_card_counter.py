@@ -0,0 +1,134 @@
+"""
+Tests for Hi-Lo counting and index plays.
+"""
+
+import pytest
+
+from card_counter import CountState
+from rules import RuleSet
+import strategy_table
+from strategy_table import (ACTION_TABLE, compile_index_plays, compile_tables, get_action, hard_table, pairs_table,
+                            should_take_insurance, soft_table)
+
+
+class TestCountState:
+    """Test the per-shoe count"""
+
+    def test_running_and_true_count(self):
+        """Test that low cards count up, high cards down and the true count scales by decks left"""
+        state = CountState(RuleSet(decks=2))
+        state.see_many([2, 3, 4, 5, 6, 7, 8, 9, 10, 'K', 'A'])
+        assert state.running_count == 2
+        assert state.cards_seen == 11
+        assert state.decks_remaining == pytest.approx(93 / 52)
+        assert state.true_count == pytest.approx(2 / (93 / 52))
+
+    def test_ace_spellings_count_the_same(self):
+        """Test that 1, 11 and 'A' are all counted as an Ace"""
+        state = CountState()
+        state.see_many([1, 11, 'A', 'a'])
+        assert state.running_count == -4
+
+    def test_shuffle_resets(self):
+        """Test that shuffling starts a fresh shoe"""
+        state = CountState()
+        state.see_many([2, 3, 4])
+        state.shuffle()
+        assert state.running_count == 0
+        assert state.cards_seen == 0
+        assert state.true_count == 0
+
+    def test_rejects_invalid_cards_and_exhausted_shoe(self):
+        """Test that bad cards and overdrawing the shoe raise ValueError"""
+        state = CountState(RuleSet(decks=1))
+        with pytest.raises(ValueError):
+            state.see('X')
+        state.see_many([5] * 52)
+        assert state.true_count == pytest.approx(52 / 0.25)
+        with pytest.raises(ValueError):
+            state.see(5)
+
+    def test_uses_slots(self):
+        """Test that states carry no per-instance dict"""
+        assert not hasattr(CountState(), '__dict__')
+
+    def test_actions_follow_the_count(self):
+        """Test that the state plays index plays at its true count"""
+        state = CountState()
+        state.see_many([10, 'K', 'A'])
+        assert state.true_count < 0
+        assert state.get_action('hard', 16, 10) == 'H'
+        assert not state.take_insurance()
+        state.see_many([2, 3, 4, 5, 6] * 5)
+        assert state.true_count >= 3
+        assert state.get_action('hard', 16, 10) == 'S'
+        assert state.take_insurance()
+
+
+class TestIndexPlays:
+    """Test true-count deviations in get_action"""
+
+    def test_no_true_count_uses_table(self):
+        """Test that get_action is unchanged without a true count"""
+        assert get_action('hard', 16, 10) == 'H'
+        assert get_action('pair', 20, 6) == 'S'
+
+    def test_illustrious_18(self):
+        """Test deviations on both sides of their index"""
+        assert get_action('hard', 16, 10, true_count=-0.5) == 'H'
+        assert get_action('hard', 16, 10, true_count=0) == 'S'
+        assert get_action('pair', 20, 6, true_count=3.9) == 'S'
+        assert get_action('pair', 20, 6, true_count=4) == 'P'
+        assert get_action('hard', 13, 2, true_count=-1) == 'S'
+        assert get_action('hard', 13, 2, true_count=-1.5) == 'H'
+        assert get_action('hard', 11, 11, true_count=1) == 'D'
+
+    def test_cells_without_index_plays_use_table(self):
+        """Test that the count only changes cells with an index play"""
+        assert get_action('hard', 17, 10, true_count=-10) == 'S'
+        assert get_action('Soft', 18, 9, true_count=10) == 'H'
+
+    def test_fab_4_needs_surrender(self, monkeypatch):
+        """Test that surrender deviations only apply when late surrender is allowed"""
+        surrender = RuleSet(late_surrender=True)
+        # Index plays do not depend on the table, so skip deriving the surrender one
+        monkeypatch.setitem(strategy_table._tables_by_rules, surrender, ACTION_TABLE)
+        assert get_action('hard', 14, 10, true_count=3) == 'H'
+        assert get_action('hard', 14, 10, surrender, true_count=3) == 'Rh'
+        assert get_action('hard', 15, 10, surrender, true_count=-1) == 'H'
+        assert get_action('hard', 15, 10, surrender, true_count=0) == 'Rh'
+        assert get_action('hard', 15, 10, surrender, true_count=4) == 'Rs'
+
+    def test_index_plays_keep_surrender(self, monkeypatch):
+        """Test that Illustrious 18 plays on a surrender cell only change its fallback"""
+        surrender = RuleSet(late_surrender=True)
+        hard = {**hard_table, 16: {**hard_table[16], 9: 'Rh', 10: 'Rh', 11: 'Rh'}}
+        monkeypatch.setitem(strategy_table._tables_by_rules, surrender,
+                            compile_tables(hard, soft_table, pairs_table))
+        assert get_action('hard', 16, 10, surrender, true_count=-1) == 'Rh'
+        assert get_action('hard', 16, 10, surrender, true_count=0) == 'Rs'
+        assert get_action('hard', 16, 9, surrender, true_count=0) == 'Rh'
+        assert get_action('hard', 16, 9, surrender, true_count=6) == 'Rs'
+        assert get_action('hard', 16, 11, surrender, true_count=6) == 'Rh'
+
+    def test_index_plays_need_their_rules(self, monkeypatch):
+        """Test that rule sets the indexes weren't derived for play their own table"""
+        h17 = RuleSet(dealer_hits_soft_17=True)
+        hard = {**hard_table, 11: {**hard_table[11], 11: 'D'}}
+        monkeypatch.setitem(strategy_table._tables_by_rules, h17, compile_tables(hard, soft_table, pairs_table))
+        assert get_action('hard', 11, 11, h17, true_count=0) == 'D'
+        assert get_action('hard', 16, 10, h17, true_count=3) == 'H'
+
+    def test_insurance(self):
+        """Test the insurance index"""
+        assert not should_take_insurance(2.9)
+        assert should_take_insurance(3)
+
+    def test_compile_rejects_bad_plays(self):
+        """Test that malformed index plays raise ValueError"""
+        with pytest.raises(ValueError):
+            compile_index_plays({('hard', 16, 10): ('H', ((0, 'X'),))})
+        with pytest.raises(ValueError):
+            compile_index_plays({('hard', 16, 10): ('H', ((2, 'S'), (1, 'D')))})
+        with pytest.raises(ValueError):
+            compile_index_plays({('hard', 30, 10): ('H', ((0, 'S'),))})
@@ -0,0 +1,104 @@
+"""
+Tests for the precomputed per-cell explanations.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from blackjack_game import get_strategy_advice
+from build_explanations import generate_explanations
+from cell_explanations import (EXPLANATIONS_VERSION, get_explanation, load_explanations, table_cells,
+                               write_explanations)
+from intent_router import route_question
+
+WHY_16_VS_10 = "A dealer 10 finishes with 17 or more most of the time, so 16 has to take a card."
+
+
+@pytest.fixture
+def artifact(tmp_path, monkeypatch):
+    path = tmp_path / "explanations.json"
+    monkeypatch.setenv("GROK21_EXPLANATIONS", str(path))
+    load_explanations.cache_clear()
+    write_explanations(str(path), {'hard:16:10': {'action': 'H', 'text': WHY_16_VS_10}}, "grok-test",
+                       "2026-01-01T00:00:00+00:00")
+    yield path
+    load_explanations.cache_clear()
+
+
+class TestCellExplanations:
+    """Test the explanations artifact and where it is served"""
+
+    def test_every_table_cell_is_listed(self):
+        """Test that every cell of the three tables is enumerated once"""
+        cells = list(table_cells())
+        assert len(cells) == len({cell[:3] for cell in cells}) == 17 * 10 + 8 * 10 + 10 * 10
+        assert ('hard', 16, 10, 'H') in cells
+        assert ('pair', 16, 11, 'P') in cells
+
+    def test_lookup_matches_the_action(self, artifact):
+        """Test that an entry is only served for the action it was written for"""
+        assert get_explanation('hard', 16, 10, 'H') == WHY_16_VS_10
+        assert get_explanation('hard', 16, 10, 'Rh') is None
+        assert get_explanation('hard', 15, 10, 'H') is None
+
+    def test_missing_or_old_artifact(self, artifact, tmp_path):
+        """Test that a missing or old-version artifact means no precomputed explanations"""
+        assert load_explanations(str(tmp_path / "missing.json")) == {}
+        artifact.write_text(json.dumps({'version': EXPLANATIONS_VERSION + 1, 'cells': {'hard:16:10': {}}}))
+        load_explanations.cache_clear()
+        assert load_explanations() == {}
+
+    def test_served_by_advice_and_router(self, artifact):
+        """Test that strategy advice and routed questions use the precomputed text"""
+        assert get_strategy_advice(16, 10, 'hard') == f"Optimal Basic Strategy action: H. {WHY_16_VS_10}"
+        assert route_question("why hit 16 vs 10?").endswith(WHY_16_VS_10)
+        # Cells without an entry fall back to the templates
+        assert get_strategy_advice(12, 4, 'hard').startswith("Optimal Basic Strategy action: S. The dealer busts")
+
+
+class FakeChain:
+    """Retrieval and generation stand-ins for the offline job"""
+
+    model = "grok-test"
+    max_tokens = 200
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.prompts = []
+
+    async def _agather_contexts(self, query):
+        return ["Never stand on 16 against a 10."], None
+
+    def _async_grok_client(self):
+        async def create(model, messages, temperature, max_tokens):
+            prompt = messages[0]['content']
+            self.prompts.append(prompt)
+            if self.fail_on and self.fail_on in prompt:
+                raise ConnectionError("API down")
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=" Because. "))])
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class TestBuildExplanations:
+    """Test the offline generation job"""
+
+    def test_generates_grounded_explanations(self):
+        """Test that prompts carry the table's play and retrieved context"""
+        chain = FakeChain()
+        cells = [('hard', 16, 10, 'H'), ('pair', 16, 11, 'P')]
+        results = asyncio.run(generate_explanations(chain, cells, concurrency=2))
+
+        assert results == {'hard:16:10': {'action': 'H', 'text': "Because."},
+                           'pair:16:11': {'action': 'P', 'text': "Because."}}
+        prompt = next(prompt for prompt in chain.prompts if "hard 16" in prompt)
+        assert "Never stand on 16 against a 10." in prompt
+        assert "Hit with hard 16 against a dealer 10" in prompt
+
+    def test_failed_cells_are_left_out(self):
+        """Test that a failing cell is skipped so a rerun can retry it"""
+        chain = FakeChain(fail_on="a pair of 8s")
+        results = asyncio.run(generate_explanations(chain, [('hard', 16, 10, 'H'), ('pair', 16, 11, 'P')]))
+        assert list(results) == ['hard:16:10']
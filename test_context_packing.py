@@ -0,0 +1,51 @@
+"""
+Tests for MMR context packing.
+"""
+
+from langchain_core.documents import Document
+
+from context_packing import CHARS_PER_TOKEN, context_budget, estimate_tokens, pack_contexts
+
+SPLIT = "Always split a pair of eights against any dealer upcard because sixteen is the worst total."
+SPLIT_OVERLAP = "split a pair of eights against any dealer upcard because sixteen is the worst total to hold."
+DOUBLE = "Double down on eleven against a dealer two through ten when the rules allow it."
+INSURANCE = "Insurance is a side bet that pays two to one when the dealer has blackjack."
+
+
+def results(*texts_and_scores):
+    return [(Document(page_content=text), score) for text, score in texts_and_scores]
+
+
+class TestContextPacking:
+    """Test relevance order, de-duplication and the token budget"""
+
+    def test_near_duplicates_are_dropped(self):
+        """Test that an overlapping chunk is skipped in favor of new information"""
+        packed = pack_contexts(results((SPLIT, 0.05), (SPLIT_OVERLAP, 0.04), (DOUBLE, 0.03)), budget=1000)
+        assert packed == [SPLIT, DOUBLE]
+
+    def test_relevance_order_and_exact_duplicates(self):
+        packed = pack_contexts(results((INSURANCE, 0.01), (DOUBLE, 0.03), (DOUBLE, 0.02)), budget=1000)
+        assert packed == [DOUBLE, INSURANCE]
+
+    def test_budget_skips_chunks_that_do_not_fit(self):
+        """Test that packing stops adding whole chunks at the budget instead of cutting one"""
+        budget = estimate_tokens(DOUBLE) + estimate_tokens(INSURANCE) + 1
+        long_chunk = "dealer " * 200
+        packed = pack_contexts(results((DOUBLE, 0.05), (long_chunk, 0.04), (INSURANCE, 0.03)), budget=budget)
+        assert packed == [DOUBLE, INSURANCE]
+
+    def test_oversized_best_chunk_is_truncated(self):
+        packed = pack_contexts(results(("word " * 500, 0.05), (DOUBLE, 0.01)), budget=10)
+        assert len(packed) == 1 and len(packed[0]) == 10 * CHARS_PER_TOKEN
+
+    def test_empty(self):
+        assert pack_contexts([], budget=100) == []
+        assert pack_contexts(results((DOUBLE, 0.1)), budget=0) == []
+
+    def test_context_budget(self):
+        """Test that the budget is capped and never exceeds what the window leaves"""
+        assert context_budget("grok-3-mini", 500) == 1200
+        assert context_budget("grok-3-mini", 500, cap=4000) == 4000
+        assert context_budget("unknown-model", 32_000, cap=4000) == 32_768 - 32_000 - 200
+        assert context_budget("unknown-model", 40_000) == 0
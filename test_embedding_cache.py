@@ -0,0 +1,96 @@
+"""
+Tests for the two-level query embedding cache.
+"""
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings, normalize_query
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic embeddings that count model calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), 0.5, -1.0]
+
+
+class TestCachedEmbeddings:
+    """Test the memory and disk cache levels"""
+
+    def test_normalize_query(self):
+        """Test that case and spacing do not change the cache key"""
+        assert normalize_query("  When to SPLIT\t8s ") == normalize_query("when to split 8s")
+
+    def test_memory_hits(self, tmp_path):
+        """Test that repeated queries are served from memory"""
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "test-model", path=str(tmp_path / "cache.sqlite3"))
+        first = cache.embed_query("16 vs 10")
+        assert cache.embed_query("16  VS 10") == first
+        assert model.calls == 1
+        stats = cache.stats()
+        assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 0, 1)
+        assert stats['hit_rate'] == pytest.approx(0.5)
+
+    def test_disk_survives_restart(self, tmp_path):
+        """Test that a new cache on the same file reuses stored vectors"""
+        path = str(tmp_path / "cache.sqlite3")
+        CachedEmbeddings(CountingEmbeddings(), "test-model", path=path).embed_query("split 8s")
+
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "test-model", path=path)
+        assert cache.embed_query("split 8s") == [8.0, 0.5, -1.0]
+        assert model.calls == 0
+        assert cache.stats()['disk_hits'] == 1
+
+    def test_model_name_is_part_of_the_key(self, tmp_path):
+        """Test that another model never gets cached vectors"""
+        path = str(tmp_path / "cache.sqlite3")
+        CachedEmbeddings(CountingEmbeddings(), "model-a", path=path).embed_query("split 8s")
+        model = CountingEmbeddings()
+        CachedEmbeddings(model, "model-b", path=path).embed_query("split 8s")
+        assert model.calls == 1
+
+    def test_size_based_eviction(self, tmp_path):
+        """Test that both levels stay within their bounds"""
+        cache = CachedEmbeddings(CountingEmbeddings(), "test-model", max_entries=2, max_disk_entries=3,
+                                 path=str(tmp_path / "cache.sqlite3"))
+        for query in ["a", "b", "c", "d", "e"]:
+            cache.embed_query(query)
+        assert cache.stats()['memory_entries'] == 2
+        cache._evict()
+        assert cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 3
+
+    def test_memory_only(self):
+        """Test that persist=False keeps everything in memory"""
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "test-model", persist=False)
+        cache.embed_query("double 11")
+        cache.embed_query("double 11")
+        assert model.calls == 1
+
+    def test_documents_pass_through(self):
+        """Test that document embedding is not cached"""
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "test-model", persist=False)
+        cache.embed_documents(["chunk"])
+        cache.embed_documents(["chunk"])
+        assert model.calls == 2
+
+    def test_batch_embeds_misses_once(self):
+        """Test that embed_queries serves hits from cache and batches the misses"""
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "test-model", persist=False)
+        cache.embed_query("hit")
+        vectors = cache.embed_queries(["hit", "miss", "MISS", "other"])
+        assert vectors == [[3.0, 0.5, -1.0], [4.0, 0.5, -1.0], [4.0, 0.5, -1.0], [5.0, 0.5, -1.0]]
+        assert model.calls == 3
+        assert cache.stats()['misses'] == 3
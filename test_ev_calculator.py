@@ -0,0 +1,96 @@
+"""
+Tests for the exact expected-value calculator.
+"""
+
+import pytest
+
+from ev_calculator import (
+    TOTAL_DEPENDENT_EXCEPTIONS, best_action, cell_cards, cell_expected_values, dealer_outcomes, describe_cards_margin,
+    expected_values, shoe_composition,
+)
+from rules import RuleSet
+from strategy_table import get_action
+
+
+class TestDealerOutcomes:
+    """Test dealer final-total distributions"""
+
+    def test_distribution_sums_to_one(self):
+        """Test that every upcard yields a complete probability distribution"""
+        for upcard in range(2, 12):
+            distribution = dealer_outcomes(upcard, shoe_composition(6, [upcard]))
+            assert sum(distribution) == pytest.approx(1.0)
+
+    def test_h17_busts_more_often_with_ace_up(self):
+        """Test that hitting soft 17 changes the dealer distribution"""
+        shoe = shoe_composition(6, [11])
+        assert dealer_outcomes(11, shoe, True)[-1] > dealer_outcomes(11, shoe, False)[-1]
+
+
+class TestExpectedValues:
+    """Test player decision EVs"""
+
+    def test_known_decisions(self):
+        """Test textbook multi-deck decisions"""
+        assert best_action(expected_values([10, 6], 10)) == 'H'
+        assert best_action(expected_values([6, 5], 6)) == 'D'
+        assert best_action(expected_values([10, 7], 11)) == 'S'
+        assert best_action(expected_values([8, 8], 10)) == 'P'
+
+    def test_table_cells_agree_with_oracle(self):
+        """Test a sample of strategy table cells against the exact EVs"""
+        for hand_type, total, upcard in [('hard', 16, 10), ('hard', 11, 6), ('soft', 18, 9),
+                                         ('pair', 18, 7), ('pair', 16, 10), ('hard', 13, 2), ('soft', 18, 2)]:
+            assert best_action(cell_expected_values(hand_type, total, upcard)) == get_action(hand_type, total, upcard)
+
+    def test_total_dependent_exceptions(self):
+        """Test that each documented exception is a composition effect: other hands with the total agree with the table"""
+        for hand_type, total, upcard in TOTAL_DEPENDENT_EXCEPTIONS:
+            assert best_action(cell_expected_values(hand_type, total, upcard)) != get_action(hand_type, total, upcard)
+        assert best_action(expected_values([9, 3], 4)) == best_action(expected_values([7, 5], 4)) == 'S'
+
+    def test_cards_margin(self):
+        """Test margins for actual hands, which can differ from the cell's representative hand"""
+        assert describe_cards_margin([10, 4, 2], 10, 'S').startswith("Pass beats Hit by less than 0.001")
+        assert describe_cards_margin([10, 6], 10, 'H').startswith("Hit beats Pass by")
+
+    def test_actions_available(self):
+        """Test that double and split are only offered where allowed"""
+        assert set(expected_values([10, 3, 3], 10)) == {'S', 'H'}
+        assert set(expected_values([10, 6], 10)) == {'S', 'H', 'D'}
+        assert set(expected_values([8, 8], 10)) == {'S', 'H', 'D', 'P'}
+        assert set(expected_values([8, 8], 10, allow_split=False)) == {'S', 'H', 'D'}
+
+    def test_fewer_decks_change_ev(self):
+        """Test that the deck count feeds into the calculation"""
+        single = expected_values([10, 6], 10, RuleSet(decks=1))['S']
+        six = expected_values([10, 6], 10)['S']
+        assert single != pytest.approx(six)
+
+    def test_repeat_query_is_identical(self):
+        """Test that memoized results are returned unchanged"""
+        assert expected_values([11, 7], 9) == expected_values([11, 7], 9)
+
+    def test_double_or_stand_code(self):
+        """Test that doubling with a better stand fallback maps to Ds"""
+        assert best_action({'S': 0.1, 'H': 0.0, 'D': 0.2}) == 'Ds'
+        assert best_action({'S': 0.0, 'H': 0.1, 'D': 0.2}) == 'D'
+
+
+class TestInputs:
+    """Test input handling"""
+
+    def test_cell_cards(self):
+        """Test representative hands for table cells"""
+        assert cell_cards('hard', 16) == [10, 6]
+        assert cell_cards('soft', 18) == [11, 7]
+        assert cell_cards('pair', 22) == [11, 11]
+        with pytest.raises(ValueError):
+            cell_cards('pair', 7)
+
+    def test_invalid_hands(self):
+        """Test that bust hands and impossible shoes are rejected"""
+        with pytest.raises(ValueError):
+            expected_values([10, 10, 5], 6)
+        with pytest.raises(ValueError):
+            shoe_composition(1, [5] * 5)
@@ -0,0 +1,60 @@
+"""
+Tests for embedding backends and the recall/latency evaluation.
+"""
+
+import re
+
+import numpy as np
+import pytest
+
+from corpus import load_chunks
+from embedding_backends import EMBEDDING_BACKENDS, get_backend
+from eval_embeddings import DEFAULT_QUERIES, evaluate, load_queries
+
+
+class BagOfWords:
+    """Tiny hashed bag-of-words embeddings, good enough to rank a small corpus"""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        vector = np.zeros(256)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            vector[hash(word) % 256] += 1
+        return vector + 1e-6
+
+
+class TestEmbeddingBackends:
+    """Test the backend registry"""
+
+    def test_default_backend(self):
+        """Test that the default stays bge-large on the committed collection"""
+        backend = get_backend()
+        assert backend.model_name == "BAAI/bge-large-en-v1.5"
+        assert backend.collection == "langchain"
+
+    def test_namespaces_are_unique(self):
+        """Test that no two backends share a collection or cache key"""
+        backends = EMBEDDING_BACKENDS.values()
+        assert len({backend.collection for backend in backends}) == len(backends)
+        assert len({backend.cache_key for backend in backends}) == len(backends)
+
+    def test_unknown_backend(self):
+        """Test that unknown names raise ValueError"""
+        with pytest.raises(ValueError):
+            get_backend("bge-huge")
+
+
+class TestEvaluate:
+    """Test recall@k and latency reporting"""
+
+    def test_report_on_corpus(self):
+        """Test that the evaluation runs over the bundled questions"""
+        chunks = [chunk.page_content for chunk in load_chunks("data/documents")]
+        report = evaluate(BagOfWords(), chunks, load_queries(DEFAULT_QUERIES), ks=(1, 3, len(chunks)))
+
+        assert 0 <= report['recall@1'] <= report['recall@3'] <= 1
+        # Every labelled question has a relevant chunk somewhere in the corpus
+        assert report[f"recall@{len(chunks)}"] == 1
+        assert report['p95_ms'] >= report['p50_ms'] >= 0
@@ -0,0 +1,181 @@
+"""
+Tests for retries, backoff and the circuit breaker around the Grok API.
+"""
+
+import asyncio
+import email.utils
+import time
+
+import httpx
+import openai
+import pytest
+
+import grok_client
+from grok_client import (CircuitBreaker, CircuitOpenError, acall_with_retries, backoff_delay, call_with_retries,
+                         is_retryable, retry_after)
+
+
+def api_error(status, headers=None):
+    request = httpx.Request("POST", f"{grok_client.GROK_BASE_URL}/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    error_class = {429: openai.RateLimitError, 500: openai.InternalServerError,
+                   400: openai.BadRequestError, 401: openai.AuthenticationError}[status]
+    return error_class(f"HTTP {status}", response=response, body=None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Flaky:
+    """Raises the given errors in turn, then returns "ok\""""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestCircuitBreaker:
+    """Test the breaker's state machine"""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the threshold of failures in a row opens the circuit, and a success resets the count"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.is_open() and not breaker.allow()
+
+    def test_half_open_trial(self):
+        """Test that after the cool-down one trial call decides whether the circuit closes"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.is_open()
+        assert breaker.allow()
+        assert not breaker.allow()  # one trial at a time
+        assert breaker.is_open()
+
+        breaker.record_failure()  # the trial failed: open for another cool-down
+        assert not breaker.allow()
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow() and breaker.allow()
+
+
+class TestBackoff:
+    """Test which errors are retried and how long to wait"""
+
+    def test_retryable_errors(self):
+        assert is_retryable(api_error(429))
+        assert is_retryable(api_error(500))
+        assert is_retryable(ConnectionError())
+        assert is_retryable(openai.APITimeoutError(httpx.Request("POST", grok_client.GROK_BASE_URL)))
+        assert not is_retryable(api_error(400))
+        assert not is_retryable(api_error(401))
+        assert not is_retryable(ValueError())
+
+    def test_retry_after(self):
+        """Test that Retry-After in seconds, milliseconds and as an HTTP date are understood"""
+        assert retry_after(api_error(429, {'retry-after': '3'})) == 3
+        assert retry_after(api_error(429, {'retry-after-ms': '1500'})) == 1.5
+        date = email.utils.formatdate(time.time() + 60, usegmt=True)
+        assert 55 < retry_after(api_error(429, {'retry-after': date})) <= 60
+        assert retry_after(api_error(429, {'retry-after': 'soon'})) is None
+        assert retry_after(api_error(429)) is None
+        assert retry_after(ConnectionError()) is None
+
+    def test_backoff_delay(self):
+        """Test exponential backoff with jitter, raised to Retry-After and capped"""
+        for attempt in range(1, 8):
+            assert 0 <= backoff_delay(attempt) <= min(grok_client.BACKOFF_CAP, grok_client.BACKOFF_BASE * 2 ** (attempt - 1))
+        assert backoff_delay(1, api_error(429, {'retry-after': '4'})) >= 4
+        assert backoff_delay(1, api_error(429, {'retry-after': '3600'})) == grok_client.MAX_RETRY_AFTER
+
+
+class TestRetries:
+    """Test call_with_retries and acall_with_retries"""
+
+    def test_retries_transient_errors(self):
+        """Test that rate limits are retried after the server's Retry-After"""
+        sleeps = []
+        call = Flaky(api_error(429, {'retry-after': '2'}), ConnectionError())
+        breaker = CircuitBreaker(failure_threshold=5)
+        assert call_with_retries(call, breaker, sleep=sleeps.append) == "ok"
+        assert call.calls == 3
+        assert sleeps[0] >= 2 and len(sleeps) == 2
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_gives_up_after_max_attempts(self):
+        call = Flaky(*[api_error(500)] * 5)
+        with pytest.raises(openai.InternalServerError):
+            call_with_retries(call, CircuitBreaker(), max_attempts=3, sleep=lambda delay: None)
+        assert call.calls == 3
+
+    def test_permanent_errors_are_not_retried(self):
+        """Test that client errors are raised at once and don't count against the endpoint"""
+        breaker = CircuitBreaker(failure_threshold=1)
+        call = Flaky(api_error(401))
+        with pytest.raises(openai.AuthenticationError):
+            call_with_retries(call, breaker, sleep=lambda delay: None)
+        assert call.calls == 1
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_open_circuit_fails_fast(self):
+        """Test that failures open the circuit and later calls are refused without being made"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        failing = Flaky(*[ConnectionError()] * 3)
+        with pytest.raises(CircuitOpenError):
+            call_with_retries(failing, breaker, sleep=lambda delay: None)
+        assert failing.calls == 2  # the third attempt was refused
+        call = Flaky()
+        with pytest.raises(CircuitOpenError):
+            call_with_retries(call, breaker)
+        assert call.calls == 0
+
+    def test_async_retries(self, monkeypatch):
+        monkeypatch.setattr(grok_client, "backoff_delay", lambda attempt, error=None: 0)
+        call = Flaky(api_error(429))
+
+        async def request():
+            return call()
+
+        assert asyncio.run(acall_with_retries(request, CircuitBreaker())) == "ok"
+        assert call.calls == 2
+
+
+class TestClients:
+    """Test the shared, pooled clients"""
+
+    def test_one_client_per_key(self):
+        client = grok_client.get_client("test-key")
+        assert grok_client.get_client("test-key") is client
+        assert grok_client.get_client("other-key") is not client
+        assert client.max_retries == 0
+        assert str(client.base_url).startswith(grok_client.GROK_BASE_URL)
+
+    def test_async_client_per_loop(self):
+        async def get():
+            return grok_client.get_async_client("test-key"), grok_client.get_async_client("test-key")
+
+        first, again = asyncio.run(get())
+        assert first is again
+        assert asyncio.run(get())[0] is not first
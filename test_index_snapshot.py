@@ -0,0 +1,144 @@
+"""
+Tests for the offline index snapshot.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pytest
+
+import rag_chain
+from build_index import build_snapshot
+from corpus import build_manifest
+from embedding_backends import get_backend
+from index_snapshot import (DEFAULT_SNAPSHOT_ROOT, EMBEDDINGS_NAME, MANIFEST_NAME, IndexSnapshot,
+                            read_snapshot_manifest, snapshot_directory)
+from retrieval import search
+
+
+class WordEmbeddings:
+    """Bag-of-words vectors: texts sharing words are similar"""
+
+    dim = 64
+
+    def __init__(self):
+        self.document_calls = 0
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.strip('.,?').encode()).hexdigest(), 16) % self.dim] += 1
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        self.document_calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def docs(tmp_path):
+    folder = tmp_path / "documents"
+    folder.mkdir()
+    (folder / "splits.txt").write_text("Always split aces and eights against every dealer upcard.")
+    (folder / "doubles.txt").write_text("Double down on eleven unless the dealer shows an ace.")
+    (folder / "insurance.txt").write_text("Insurance is a side bet that loses money for basic strategy players.")
+    return folder
+
+
+class TestIndexSnapshot:
+    """Test building and memory-mapping a snapshot"""
+
+    def test_default_root_is_next_to_the_code(self):
+        """Test that the default snapshot location doesn't depend on the working directory"""
+        assert DEFAULT_SNAPSHOT_ROOT == os.path.join(os.path.dirname(os.path.abspath(rag_chain.__file__)),
+                                                     "index_snapshot")
+
+    def test_build_and_search(self, tmp_path, docs):
+        """Test that a built snapshot is memory-mapped float16 and retrieves the right chunk"""
+        directory = build_snapshot(str(docs), "bge-small", str(tmp_path / "snapshots"), embeddings=WordEmbeddings(),
+                                   batch_size=2)
+        assert directory == snapshot_directory("bge-small", str(tmp_path / "snapshots"))
+
+        snapshot = IndexSnapshot(directory, embeddings=WordEmbeddings())
+        assert len(snapshot) == 3
+        assert isinstance(snapshot.vectors, np.memmap)
+        assert snapshot.vectors.dtype == np.float16
+        assert snapshot.vectors.flags['C_CONTIGUOUS']
+        assert snapshot.index_manifest == build_manifest(str(docs), get_backend("bge-small"))
+
+        rankings, documents = search(snapshot, ["should I split eights?", "is insurance a good bet?"], k=1)
+        assert "split aces and eights" in documents[rankings[0][0]].page_content
+        assert "Insurance" in documents[rankings[1][0]].page_content
+        assert documents[rankings[0][0]].metadata['source'].endswith("splits.txt")
+
+    def test_rebuild_replaces_snapshot(self, tmp_path, docs):
+        """Test that rebuilding swaps in the new snapshot and leaves no temporary directories"""
+        root = tmp_path / "snapshots"
+        build_snapshot(str(docs), "bge-small", str(root), embeddings=WordEmbeddings())
+        (docs / "surrender.txt").write_text("Surrender hard 16 against a dealer nine, ten or ace.")
+        directory = build_snapshot(str(docs), "bge-small", str(root), embeddings=WordEmbeddings())
+
+        assert len(IndexSnapshot(directory)) == 4
+        assert os.listdir(root) == ["bge-small"]
+
+    def test_inconsistent_or_missing_snapshot(self, tmp_path, docs):
+        """Test that a missing, old-format or truncated snapshot is rejected"""
+        with pytest.raises(ValueError):
+            IndexSnapshot(str(tmp_path / "missing"))
+
+        directory = build_snapshot(str(docs), "bge-small", str(tmp_path), embeddings=WordEmbeddings())
+        np.save(os.path.join(directory, EMBEDDINGS_NAME), np.zeros((2, WordEmbeddings.dim), dtype=np.float16))
+        with pytest.raises(ValueError):
+            IndexSnapshot(directory)
+
+        manifest = read_snapshot_manifest(directory)
+        manifest['snapshot_version'] = 0
+        with open(os.path.join(directory, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f)
+        with pytest.raises(ValueError):
+            IndexSnapshot(directory)
+
+
+class TestChainUsesSnapshot:
+    """Test that the chain opens a matching snapshot instead of embedding the corpus"""
+
+    def make_chain(self, backend):
+        chain = rag_chain.GrokRagChain.__new__(rag_chain.GrokRagChain)
+        chain.embedding_backend = backend
+        chain.embeddings = WordEmbeddings()
+        return chain
+
+    def test_matching_snapshot_is_used(self, tmp_path, docs, monkeypatch):
+        backend = get_backend("bge-small")
+        root = str(tmp_path / "snapshots")
+        build_snapshot(str(docs), backend.name, root, embeddings=WordEmbeddings())
+        monkeypatch.setenv("INDEX_SNAPSHOT_DIR", root)
+
+        chain = self.make_chain(backend)
+        vectorstore = chain._load_or_create_vectorstore(str(docs))
+        assert isinstance(vectorstore, IndexSnapshot)
+        assert vectorstore.embeddings is chain.embeddings
+        assert chain.embeddings.document_calls == 0
+        assert chain.index_fingerprint
+
+    def test_stale_snapshot_is_ignored(self, tmp_path, docs, monkeypatch):
+        backend = get_backend("bge-small")
+        root = str(tmp_path / "snapshots")
+        build_snapshot(str(docs), backend.name, root, embeddings=WordEmbeddings())
+        (docs / "doubles.txt").write_text("Double down on ten and eleven.")
+        monkeypatch.setenv("INDEX_SNAPSHOT_DIR", root)
+
+        fallback = object()
+        monkeypatch.setattr(rag_chain, "read_manifest", lambda *args: None)
+        monkeypatch.setattr(rag_chain, "load_chunks", lambda folder: [])
+        monkeypatch.setattr(rag_chain.Chroma, "from_documents", lambda *args, **kwargs: fallback)
+        monkeypatch.setattr(rag_chain, "write_manifest", lambda *args: None)
+        monkeypatch.chdir(tmp_path)
+
+        chain = self.make_chain(backend)
+        assert chain._load_or_create_vectorstore(str(docs)) is fallback
@@ -0,0 +1,71 @@
+"""
+Tests for the local intent router.
+"""
+
+import pytest
+
+from intent_router import HandQuestion, parse_hand_question, route_question
+
+
+class TestParseHandQuestion:
+    """Test pulling hands and upcards out of free text"""
+
+    @pytest.mark.parametrize("question, expected", [
+        ("Why hit 16 vs dealer 10?", HandQuestion('hard', 16, 10)),
+        ("split 8s against an ace?", HandQuestion('pair', 16, 11)),
+        ("Should I split tens against a 6", HandQuestion('pair', 20, 6)),
+        ("pair of aces vs 6", HandQuestion('pair', 22, 6)),
+        ("8-8 vs 10", HandQuestion('pair', 16, 10)),
+        ("soft 18 v 6", HandQuestion('soft', 18, 6)),
+        ("A7 vs 9", HandQuestion('soft', 18, 9)),
+        ("ace 7 against dealer's 2", HandQuestion('soft', 18, 2)),
+        ("K,6 vs 7", HandQuestion('hard', 16, 7)),
+        ("Should I double a 9 vs 3", HandQuestion('hard', 9, 3)),
+        ("hard 12 vs a four", HandQuestion('hard', 12, 4)),
+        ("What do I do with 12 when the dealer shows 3", HandQuestion('hard', 12, 3)),
+        ("I have 10 and 6 vs dealer 10", HandQuestion('hard', 16, 10)),
+        ("I have a 7 and a 9 vs dealer ace", HandQuestion('hard', 16, 11)),
+        ("ace and 6 vs 3", HandQuestion('soft', 17, 3)),
+    ])
+    def test_hand_questions(self, question, expected):
+        """Test that common phrasings parse to the right cell"""
+        assert parse_hand_question(question) == expected
+
+    @pytest.mark.parametrize("question", [
+        "How does card counting work?",
+        "When should you take insurance against an ace?",
+        "What is the house edge against a 6:5 game",
+        "Is splitting always good?",
+        "4 card 16 vs 10",
+        "three card 16 against a 10",
+        "16 vs 10 at true count +3",
+        "What is the EV of 16 vs 10?",
+        "odds of busting on 12 vs 2",
+        "I hit my 12 and drew a 4 vs 10",
+        "When do I surrender 16 vs 10?",
+        "Should I hit soft 18 vs 2 if the dealer hits soft 17?",
+        "soft 18 vs 2 in an H17 game",
+        "split 2s vs 8 when DAS is not allowed",
+        "16 vs 10 in single deck",
+        "H17 game with 2 decks, 11 vs ace",
+        "double 11 vs 10 after splitting",
+        "Why hit 12 vs 2 but stand 12 vs 4?",
+    ])
+    def test_open_ended_questions(self, question):
+        """Test that questions without a clear hand and upcard, or about more than the table, are left for the LLM"""
+        assert parse_hand_question(question) is None
+
+
+class TestRouteQuestion:
+    """Test templated answers"""
+
+    def test_answers_from_table(self):
+        """Test that the answer names the table action"""
+        assert route_question("Why hit 16 vs dealer 10?").startswith("**Hit** with hard 16 against a dealer 10.")
+        assert route_question("split 8s against an ace?").startswith("**Split** with a pair of 8s against a dealer Ace.")
+        assert "If doubling isn't allowed, stand." in route_question("soft 18 vs 6")
+
+    def test_unanswerable_hands_fall_through(self):
+        """Test that hands outside the table go to the LLM instead of raising"""
+        assert route_question("soft 25 vs 6") is None
+        assert route_question("How does card counting work?") is None
@@ -0,0 +1,293 @@
+"""
+Tests for the RAG chain's index bookkeeping.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import rag_chain
+from semantic_cache import SemanticCache
+from embedding_backends import get_backend
+from grok_client import CircuitBreaker
+from request_coordinator import RequestCoordinator
+from rag_chain import (GrokRagChain, build_manifest, get_shared_chain, manifest_path, read_manifest, resolve_config,
+                       run_sync, write_manifest)
+
+
+class TestIndexManifest:
+    """Test the manifest that decides whether the persisted index is reused"""
+
+    def test_manifest_round_trip(self, tmp_path):
+        """Test that a written manifest reads back equal to a fresh one"""
+        docs = tmp_path / "documents"
+        docs.mkdir()
+        (docs / "strategy.txt").write_text("Always split aces and eights.")
+        (docs / "notes.md").write_text("Not a source document.")
+        index = tmp_path / "index"
+        index.mkdir()
+
+        manifest = build_manifest(str(docs))
+        assert list(manifest['sources']) == ["strategy.txt"]
+        write_manifest(str(index), manifest)
+        assert os.path.exists(manifest_path(str(index)))
+        assert read_manifest(str(index)) == build_manifest(str(docs))
+
+    def test_manifest_per_backend(self, tmp_path):
+        """Test that each embedding backend has its own manifest"""
+        (tmp_path / "strategy.txt").write_text("Stand on 17.")
+        small = get_backend("bge-small")
+        assert build_manifest(str(tmp_path), small) != build_manifest(str(tmp_path))
+        write_manifest(str(tmp_path), build_manifest(str(tmp_path), small), small)
+        assert read_manifest(str(tmp_path)) is None
+        assert read_manifest(str(tmp_path), small)['collection'] == small.collection
+
+    def test_manifest_tracks_content(self, tmp_path):
+        """Test that editing a document changes the manifest"""
+        (tmp_path / "strategy.txt").write_text("Stand on 17.")
+        before = build_manifest(str(tmp_path))
+        (tmp_path / "strategy.txt").write_text("Stand on 18.")
+        assert build_manifest(str(tmp_path)) != before
+
+    def test_missing_or_corrupt_manifest(self, tmp_path):
+        """Test that an unreadable manifest counts as no manifest"""
+        assert read_manifest(str(tmp_path)) is None
+        with open(manifest_path(str(tmp_path)), 'w') as f:
+            f.write("{not json")
+        assert read_manifest(str(tmp_path)) is None
+
+
+class FakeChain:
+    """Stands in for GrokRagChain so the registry can be tested without models or keys"""
+
+    builds = 0
+
+    def __init__(self, *config):
+        FakeChain.builds += 1
+        time.sleep(0.05)
+        self.config = config
+
+
+@pytest.fixture
+def fake_registry(monkeypatch):
+    FakeChain.builds = 0
+    monkeypatch.setattr(rag_chain, "GrokRagChain", FakeChain)
+    monkeypatch.setattr(rag_chain, "_shared_chains", {})
+    monkeypatch.setattr(rag_chain, "_chain_build_locks", {})
+    monkeypatch.delenv("GROK_MODEL", raising=False)
+    monkeypatch.delenv("EMBEDDING_BACKEND", raising=False)
+
+
+class TestSharedChain:
+    """Test the process-wide chain registry"""
+
+    def test_resolve_config_defaults(self, monkeypatch):
+        """Test that unset options fall back to environment variables, then defaults"""
+        monkeypatch.delenv("GROK_MODEL", raising=False)
+        monkeypatch.setenv("MAX_TOKENS", "800")
+        monkeypatch.delenv("EMBEDDING_BACKEND", raising=False)
+        assert resolve_config() == ("data/documents", "grok-3-mini", 0.7, 0.8, 800, "bge-large")
+
+    def test_resolve_config_rejects_unknown_backend(self):
+        """Test that a misspelled embedding backend fails fast"""
+        with pytest.raises(ValueError):
+            resolve_config(embedding_backend="bge-huge")
+
+    def test_same_config_is_built_once(self, fake_registry):
+        """Test that concurrent callers share one chain per config"""
+        chains = []
+        threads = [threading.Thread(target=lambda: chains.append(get_shared_chain())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert FakeChain.builds == 1
+        assert all(chain is chains[0] for chain in chains)
+        # Spelling out the defaults resolves to the same key
+        assert get_shared_chain(model="grok-3-mini") is chains[0]
+
+    def test_configs_get_their_own_chain(self, fake_registry):
+        """Test that a different config builds a separate chain"""
+        first = get_shared_chain()
+        second = get_shared_chain(response_temp=0.2)
+        assert first is not second
+        assert second.config[3] == 0.2
+        assert FakeChain.builds == 2
+
+
+class FakeCompletions:
+    """Async chat completions: expansion prompts get sub-queries, others an answer"""
+
+    def __init__(self, expansion_delay=0.0, answer_delay=0.0):
+        self.expansion_delay = expansion_delay
+        self.answer_delay = answer_delay
+        self.prompts = []
+
+    async def create(self, model, messages, temperature, max_tokens=None, stream=False, timeout=None):
+        prompt = messages[0]['content']
+        self.prompts.append(prompt)
+        if prompt.startswith("Expand"):
+            await asyncio.sleep(self.expansion_delay)
+            content = json.dumps(["when to split", "pair splitting rules"])
+        else:
+            await asyncio.sleep(self.answer_delay)
+            content = "Always split eights."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_chain(completions, search_delay=0.1):
+    """GrokRagChain wired to fakes instead of models, an index and the API"""
+    chain = GrokRagChain.__new__(GrokRagChain)
+    chain.model, chain.expansion_temp, chain.response_temp, chain.max_tokens = "test", 0.7, 0.8, 100
+    chain._retrieval_slots = threading.BoundedSemaphore(4)
+    chain._async_grok_client = lambda: SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    chain.searched = []
+    chain.answer_cache = SemanticCache(persist=False)
+    chain.circuit_breaker = CircuitBreaker()
+    chain.coordinator = RequestCoordinator()
+    chain.embeddings = SimpleNamespace(embed_query=lambda text: [float(len(text)), 1.0])
+
+    def search(queries):
+        time.sleep(search_delay)
+        chain.searched.append(queries)
+        rankings, documents = [], {}
+        for query in queries:
+            chunk_id = f"chunk-{len(query)}"
+            rankings.append([chunk_id])
+            documents[chunk_id] = SimpleNamespace(page_content=f"about {query}")
+        return rankings, documents
+
+    chain._bounded_search = search
+    return chain
+
+
+class TestAsyncResponse:
+    """Test the concurrent aget_response pipeline"""
+
+    def test_stages_overlap(self):
+        """Test that the original query is searched during expansion and the sub-queries in one batch"""
+        completions = FakeCompletions(expansion_delay=0.1)
+        chain = make_chain(completions, search_delay=0.1)
+
+        start = time.perf_counter()
+        answer = run_sync(chain.aget_response("split 8s?"))
+        elapsed = time.perf_counter() - start
+
+        assert answer == "Always split eights."
+        assert chain.searched == [["split 8s?"], ["when to split", "pair splitting rules"]]
+        # Serial would be 0.1 expansion + 2 x 0.1 searches
+        assert elapsed < 0.3
+        context_prompt = completions.prompts[-1]
+        assert "about when to split" in context_prompt and "about split 8s?" in context_prompt
+
+    def test_slow_expansion_falls_back_to_query(self, monkeypatch):
+        """Test that an expansion timeout still answers from the original query"""
+        monkeypatch.setattr(rag_chain, "EXPANSION_TIMEOUT", 0.05)
+        chain = make_chain(FakeCompletions(expansion_delay=1.0), search_delay=0.0)
+        assert run_sync(chain.aget_response("split 8s?")) == "Always split eights."
+        assert chain.searched == [["split 8s?"]]
+
+    def test_generation_timeout(self, monkeypatch):
+        """Test that a generation timeout returns a friendly message"""
+        monkeypatch.setattr(rag_chain, "GENERATION_TIMEOUT", 0.05)
+        chain = make_chain(FakeCompletions(answer_delay=1.0), search_delay=0.0)
+        assert "too long" in run_sync(chain.aget_response("split 8s?"))
+
+    def test_table_questions_skip_the_pipeline(self):
+        """Test that hand lookups are answered from the table without any API call"""
+        completions = FakeCompletions()
+        chain = make_chain(completions)
+        answer = run_sync(chain.aget_response("", hand_type="hard", player_value=16, dealer_upcard=10))
+        assert answer.startswith("Optimal Basic Strategy action: H")
+        assert completions.prompts == []
+
+    def test_repeated_question_is_served_from_the_answer_cache(self):
+        """Test that a cached answer skips expansion, retrieval and generation"""
+        completions = FakeCompletions()
+        chain = make_chain(completions, search_delay=0.0)
+        assert run_sync(chain.aget_response("split 8s?")) == "Always split eights."
+        calls = len(completions.prompts)
+        assert run_sync(chain.aget_response("split 8s?")) == "Always split eights."
+        assert len(completions.prompts) == calls
+        assert chain.answer_cache.stats()['hits'] == 1
+
+
+class FakeStreamingCompletions:
+    """Sync chat completions that stream the answer in pieces"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, messages, temperature, max_tokens, stream, timeout=None):
+        assert stream
+        self.calls += 1
+        for piece in ["Always ", "split ", None, "eights."]:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+class TestStreamingResponse:
+    """Test the token-streaming stream_response"""
+
+    def test_yields_deltas_and_caches_the_answer(self):
+        """Test that deltas are yielded in order and the joined answer is cached"""
+        chain = make_chain(FakeCompletions(), search_delay=0.0)
+        streaming = FakeStreamingCompletions()
+        chain.grok_client = SimpleNamespace(chat=SimpleNamespace(completions=streaming))
+
+        assert list(chain.stream_response("split 8s?")) == ["Always ", "split ", "eights."]
+        assert list(chain.stream_response("split 8s?")) == ["Always split eights."]
+        assert streaming.calls == 1
+
+    def test_table_answer_is_one_chunk(self):
+        """Test that hand lookups stream as a single chunk"""
+        chain = make_chain(FakeCompletions())
+        chunks = list(chain.stream_response("", hand_type="hard", player_value=11, dealer_upcard=6))
+        assert len(chunks) == 1 and chunks[0].startswith("Optimal Basic Strategy action: D")
+
+
+class TestRequestCoordination:
+    """Test that concurrent sessions asking the same question share one pipeline run"""
+
+    def test_identical_questions_coalesce(self):
+        completions = FakeCompletions(answer_delay=0.1)
+        chain = make_chain(completions, search_delay=0.0)
+
+        async def ask_together():
+            return await asyncio.gather(chain.aget_response("How does card counting work?"),
+                                        chain.aget_response("how does  card counting work?"))
+
+        first, second = run_sync(ask_together())
+        assert first == second == "Always split eights."
+        assert sum(not prompt.startswith("Expand") for prompt in completions.prompts) == 1
+        assert chain.coordinator.stats()['coalesced'] == 1
+
+
+class TestDegradedService:
+    """Test the fallback while the circuit breaker has the API marked as degraded"""
+
+    def open_circuit(self, chain):
+        chain.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        chain.circuit_breaker.record_failure()
+
+    def test_open_questions_fail_fast(self):
+        """Test that no expansion, search or generation is attempted while the circuit is open"""
+        completions = FakeCompletions()
+        chain = make_chain(completions, search_delay=0.0)
+        self.open_circuit(chain)
+
+        assert run_sync(chain.aget_response("how does card counting work?")) == rag_chain.DEGRADED_MESSAGE
+        assert list(chain.stream_response("how does card counting work?")) == [rag_chain.DEGRADED_MESSAGE]
+        assert completions.prompts == [] and chain.searched == []
+
+    def test_table_answers_still_work(self):
+        """Test that hand lookups are unaffected by the open circuit"""
+        chain = make_chain(FakeCompletions())
+        self.open_circuit(chain)
+        answer = run_sync(chain.aget_response("", hand_type="hard", player_value=16, dealer_upcard=10))
+        assert answer.startswith("Optimal Basic Strategy action: H")
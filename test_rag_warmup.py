@@ -0,0 +1,93 @@
+"""
+Tests for the background RAG warm-up
+"""
+
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import rag_chain
+import rag_warmup
+import blackjack_game
+
+
+@pytest.fixture(autouse=True)
+def fresh_warmup(monkeypatch):
+    monkeypatch.setattr(rag_warmup, '_thread', None)
+    monkeypatch.setattr(rag_warmup, '_chain', None)
+    monkeypatch.setattr(rag_warmup, '_error', None)
+
+
+def finish_warmup():
+    rag_warmup._thread.join(5)
+
+
+def test_ui_modules_do_not_import_the_rag_stack():
+    code = ("import sys, blackjack_game, rag_warmup; "
+            "heavy = [m for m in ('rag_chain', 'langchain_core', 'chromadb', 'torch') if m in sys.modules]; "
+            "print(','.join(heavy))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+
+
+def test_warmup_builds_the_chain_in_the_background(monkeypatch):
+    release = threading.Event()
+    chain = object()
+    calls = []
+
+    def slow_build(**config):
+        calls.append(config)
+        release.wait(5)
+        return chain
+
+    monkeypatch.setattr(rag_chain, 'get_shared_chain', slow_build)
+    rag_warmup.start_warmup(model='grok-test')
+    rag_warmup.start_warmup(model='grok-test')  # already warming: no second build
+
+    assert rag_warmup.chain_status() == (rag_warmup.WARMING, None)
+    assert rag_warmup.ready_chain() is None
+
+    release.set()
+    finish_warmup()
+    assert rag_warmup.chain_status() == (rag_warmup.READY, None)
+    assert rag_warmup.ready_chain() is chain
+    assert calls == [{'model': 'grok-test'}]
+
+
+def test_failed_warmup_reports_the_error_and_retries(monkeypatch):
+    def broken_build(**config):
+        raise RuntimeError("no documents")
+
+    monkeypatch.setattr(rag_chain, 'get_shared_chain', broken_build)
+    rag_warmup.start_warmup()
+    finish_warmup()
+    status, error = rag_warmup.chain_status()
+    assert status == rag_warmup.FAILED
+    assert str(error) == "no documents"
+
+    # Reruns don't rebuild a broken chain; only an explicit retry does
+    chain = object()
+    monkeypatch.setattr(rag_chain, 'get_shared_chain', lambda **config: chain)
+    rag_warmup.start_warmup()
+    finish_warmup()
+    assert rag_warmup.chain_status()[0] == rag_warmup.FAILED
+
+    rag_warmup.retry_warmup()
+    finish_warmup()
+    assert rag_warmup.chain_status() == (rag_warmup.READY, None)
+
+
+def test_stream_answers_hand_questions_while_warming_up(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(rag_chain, 'get_shared_chain', lambda **config: release.wait(5))
+
+    answer = ''.join(blackjack_game.stream_grok_question("Should I double 11 vs 6?"))
+    assert answer.startswith("**Double**")
+
+    answer = ''.join(blackjack_game.stream_grok_question("How does card counting work?"))
+    assert answer == blackjack_game.WARMING_UP_MESSAGE
+    release.set()
+    finish_warmup()
@@ -0,0 +1,163 @@
+"""
+Tests for single-flight coalescing and the concurrency gate in front of the LLM.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from request_coordinator import LLMGate, RequestCoordinator
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class TestLLMGate:
+    """Test the FIFO limit on concurrent requests"""
+
+    def test_rejects_bad_limit(self):
+        with pytest.raises(ValueError):
+            LLMGate(0)
+
+    def test_caps_concurrency_and_reports_position(self):
+        """Test that callers beyond the cap wait in arrival order and are told their place in line"""
+        gate = LLMGate(max_concurrent=1)
+        gate.acquire()
+        positions = {}
+        admitted = []
+
+        def waiter(name):
+            gate.acquire(on_queue=lambda position: positions.setdefault(name, []).append(position))
+            admitted.append(name)
+
+        threads = []
+        for name in ("first", "second"):
+            thread = threading.Thread(target=waiter, args=(name,))
+            thread.start()
+            threads.append(thread)
+            wait_for(lambda: name in positions)
+        assert positions == {'first': [1], 'second': [2]}
+        assert gate.stats() == {'active': 1, 'waiting': 2, 'max_concurrent': 1}
+
+        gate.release()
+        wait_for(lambda: admitted == ["first"])
+        wait_for(lambda: positions['second'] == [2, 1])
+        gate.release()
+        for thread in threads:
+            thread.join(timeout=2)
+        assert admitted == ["first", "second"]
+        gate.release()
+        assert gate.stats()['active'] == 0
+
+    def test_async_acquire(self):
+        gate = LLMGate(max_concurrent=2)
+        running = []
+        peak = []
+
+        async def request():
+            await gate.aacquire()
+            try:
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.05)
+                running.pop()
+            finally:
+                gate.release()
+
+        async def main():
+            await asyncio.gather(*(request() for _ in range(5)))
+
+        asyncio.run(main())
+        assert max(peak) == 2
+        assert gate.stats() == {'active': 0, 'waiting': 0, 'max_concurrent': 2}
+
+
+class TestRequestCoordinator:
+    """Test that identical in-flight requests share one call"""
+
+    def test_identical_requests_share_one_call(self):
+        coordinator = RequestCoordinator()
+        started, finish = threading.Event(), threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            started.set()
+            finish.wait(2)
+            return "answer"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(coordinator.run("key", call)))
+        leader.start()
+        started.wait(2)
+        followers = [threading.Thread(target=lambda: results.append(coordinator.run("key", call))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        wait_for(lambda: coordinator.coalesced == 3)
+        finish.set()
+        for thread in [leader] + followers:
+            thread.join(timeout=2)
+
+        assert results == ["answer"] * 4
+        assert len(calls) == 1
+        assert coordinator.stats()['inflight'] == 0
+        # Once finished, the same key runs again
+        assert coordinator.run("key", lambda: "fresh") == "fresh"
+
+    def test_different_keys_run_separately(self):
+        coordinator = RequestCoordinator()
+        assert coordinator.run("a", lambda: 1) == 1
+        assert coordinator.run("b", lambda: 2) == 2
+        assert coordinator.coalesced == 0
+
+    def test_errors_reach_every_caller(self):
+        coordinator = RequestCoordinator()
+        started, finish = threading.Event(), threading.Event()
+
+        def call():
+            started.set()
+            finish.wait(2)
+            raise RuntimeError("boom")
+
+        errors = []
+
+        def ask():
+            try:
+                coordinator.run("key", call)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=ask)]
+        threads[0].start()
+        started.wait(2)
+        threads.append(threading.Thread(target=ask))
+        threads[1].start()
+        wait_for(lambda: coordinator.coalesced == 1)
+        finish.set()
+        for thread in threads:
+            thread.join(timeout=2)
+        assert errors == ["boom", "boom"]
+        assert coordinator.gate.stats()['active'] == 0
+
+    def test_async_coalescing(self):
+        coordinator = RequestCoordinator(max_concurrent=1)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        async def main():
+            return await asyncio.gather(*(coordinator.arun("key", call) for _ in range(3)),
+                                        coordinator.arun("other", call))
+
+        assert asyncio.run(main()) == ["answer"] * 4
+        assert len(calls) == 2
+        assert coordinator.coalesced == 2
@@ -0,0 +1,124 @@
+"""
+Tests for batched multi-query retrieval.
+"""
+
+from langchain_core.documents import Document
+
+from retrieval import BM25Index, build_lexical_index, fuse_rankings, retrieve, tokenize
+
+
+class FakeCollection:
+    """Answers each query vector with a fixed ranking and records the calls"""
+
+    def __init__(self, rankings):
+        self.rankings = rankings
+        self.calls = []
+
+    def query(self, query_embeddings, n_results, include):
+        self.calls.append(len(query_embeddings))
+        ids = [ranking[:n_results] for ranking in self.rankings[:len(query_embeddings)]]
+        return {
+            'ids': ids,
+            'documents': [[f"text of {chunk_id}" for chunk_id in row] for row in ids],
+            'metadatas': [[{'id': chunk_id} for chunk_id in row] for row in ids],
+        }
+
+
+    def get(self, include):
+        ids = sorted({chunk_id for ranking in self.rankings for chunk_id in ranking})
+        return {'ids': ids, 'documents': [f"text of {chunk_id}" for chunk_id in ids],
+                'metadatas': [{'id': chunk_id} for chunk_id in ids]}
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class FakeVectorStore:
+    def __init__(self, rankings):
+        self.embeddings = FakeEmbeddings()
+        self._collection = FakeCollection(rankings)
+
+
+class TestRetrieval:
+    """Test fusion and the single batched query"""
+
+    def test_fuse_rankings(self):
+        """Test that ids several rankings agree on come first"""
+        fused = fuse_rankings([['a', 'b'], ['b', 'c'], ['b', 'a']])
+        assert list(fused) == ['b', 'a', 'c']
+        assert fused['b'] > fused['a'] > fused['c']
+
+    def test_one_embedding_call_and_one_query(self):
+        """Test that all sub-queries are embedded and searched together"""
+        store = FakeVectorStore([['a', 'b'], ['b', 'c'], ['c', 'd']])
+        results = retrieve(store, ["split 8s", "pair of eights", "8-8 vs 10"], k=2)
+
+        assert store.embeddings.batches == [["split 8s", "pair of eights", "8-8 vs 10"]]
+        assert store._collection.calls == [3]
+        assert [doc.metadata['id'] for doc, _ in results] == ['b', 'c', 'a', 'd']
+        assert results[0][0].page_content == "text of b"
+
+    def test_empty_queries(self):
+        """Test that blank sub-queries are skipped without touching the index"""
+        store = FakeVectorStore([])
+        assert retrieve(store, ["", "  "]) == []
+        assert store._collection.calls == []
+
+
+CHUNKS = {
+    'h17': "If the dealer hits soft 17 (H17), double A7 against a 2.",
+    's17': "When the dealer stands on all 17s (S17), stand with A7 against a 2.",
+    'das': "With DAS you split 4-4 against a 5 or 6.",
+    'eights': "Always split 8-8, even against an ace.",
+    'insurance': "Insurance is a side bet on the dealer having blackjack.",
+}
+
+
+def lexical_index():
+    return BM25Index(list(CHUNKS), [Document(page_content=text) for text in CHUNKS.values()])
+
+
+class TestLexicalIndex:
+    """Test the BM25 index and its fusion with dense results"""
+
+    def test_tokenize_keeps_shorthand(self):
+        """Test that hand shorthand survives as whole terms"""
+        assert tokenize("Split 8-8 vs A, S17 DAS?") == ['split', '8-8', '8', '8', 'vs', 'a', 's17', 'das']
+
+    def test_exact_tokens_rank_first(self):
+        """Test that rare exact tokens decide the ranking"""
+        index = lexical_index()
+        assert index.search("S17 rules with A7", k=1) == ['s17']
+        assert index.search("H17", k=2) == ['h17']
+        assert index.search("double after split (DAS)", k=1) == ['das']
+        assert index.search("8-8 vs ace", k=1) == ['eights']
+        assert index.search("roulette wheel", k=3) == []
+
+    def test_postings_are_compact_arrays(self):
+        """Test that postings use CSR arrays, one entry per term and chunk"""
+        index = lexical_index()
+        assert index.indptr[-1] == len(index.doc_ids) == len(index.term_freqs)
+        a7 = index.vocabulary['a7']
+        assert sorted(index.ids[i] for i in index.doc_ids[index.indptr[a7]:index.indptr[a7 + 1]]) == ['h17', 's17']
+
+    def test_lexical_rankings_join_the_fusion(self):
+        """Test that lexical hits are fused with the dense ones and bring their documents"""
+        store = FakeVectorStore([['insurance', 'eights']])
+        results = retrieve(store, ["S17 rules"], k=2, lexical=lexical_index())
+
+        ids = [doc.page_content for doc, _ in results]
+        assert ids[0] == "text of insurance"
+        assert CHUNKS['s17'] in ids
+        assert store._collection.calls == [1]
+
+    def test_build_from_vector_store(self):
+        """Test that the lexical index reuses the vector store's chunk ids"""
+        index = build_lexical_index(FakeVectorStore([['b', 'a'], ['c']]))
+        assert index.ids == ['a', 'b', 'c']
+        assert index.documents['b'].page_content == "text of b"
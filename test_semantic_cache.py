@@ -0,0 +1,72 @@
+"""
+Tests for the semantic answer cache.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from semantic_cache import SemanticCache
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestSemanticCache:
+    """Test similarity lookups, eviction and persistence"""
+
+    def test_similar_query_hits(self):
+        """Test that a paraphrase above the threshold gets the cached answer"""
+        cache = SemanticCache(threshold=0.95, persist=False)
+        cache.put("should I hit 16 vs 10", [1.0, 0.0, 0.0], "Hit.")
+        assert cache.get([0.99, 0.05, 0.0]) == "Hit."
+        assert cache.get([0.0, 1.0, 0.0]) is None
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'entries': 1}
+
+    def test_empty_cache_misses(self):
+        """Test lookups before anything is cached"""
+        assert SemanticCache(persist=False).get([1.0, 0.0]) is None
+
+    def test_ttl_expiry(self):
+        """Test that expired answers are not served"""
+        cache = SemanticCache(ttl=0.01, persist=False)
+        cache.put("q", [1.0, 0.0], "old")
+        time.sleep(0.02)
+        assert cache.get([1.0, 0.0]) is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry makes room when full"""
+        cache = SemanticCache(max_entries=2, persist=False)
+        cache.put("a", unit(1, 0, 0), "A")
+        cache.put("b", unit(0, 1, 0), "B")
+        assert cache.get(unit(1, 0, 0)) == "A"  # b is now least recently used
+        cache.put("c", unit(0, 0, 1), "C")
+        assert len(cache) == 2
+        assert cache.get(unit(0, 1, 0)) is None
+        assert cache.get(unit(1, 0, 0)) == "A"
+        assert cache.get(unit(0, 0, 1)) == "C"
+
+    def test_persistence_and_fingerprint(self, tmp_path):
+        """Test that answers survive a restart only for the same fingerprint"""
+        path = str(tmp_path / "answers.npz")
+        cache = SemanticCache("index-1", path=path)
+        cache.put("split 8s", [0.0, 1.0], "Always split eights.")
+        cache.save()
+
+        assert SemanticCache("index-1", path=path).get([0.0, 1.0]) == "Always split eights."
+        assert len(SemanticCache("index-2", path=path)) == 0
+
+    def test_invalidate(self):
+        """Test that invalidation drops everything"""
+        cache = SemanticCache(persist=False)
+        cache.put("q", [1.0, 0.0], "answer")
+        cache.invalidate()
+        assert cache.get([1.0, 0.0]) is None
+
+    def test_invalid_threshold(self):
+        """Test that thresholds outside (0, 1] raise ValueError"""
+        with pytest.raises(ValueError):
+            SemanticCache(threshold=1.5, persist=False)
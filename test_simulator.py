@@ -0,0 +1,55 @@
+"""
+Tests for the Monte Carlo blackjack simulator.
+"""
+
+import numpy as np
+import pytest
+
+from rules import RuleSet
+from simulator import SimulationStats, simulate
+
+
+class TestSimulationStats:
+    """Test the mergeable statistics"""
+
+    def test_merge_matches_combined_results(self):
+        """Test that merged statistics equal statistics over all results at once"""
+        rng = np.random.default_rng(0)
+        first, second = rng.normal(size=1000), rng.normal(size=250)
+
+        merged = SimulationStats.from_results(first) + SimulationStats.from_results(second)
+        combined = SimulationStats.from_results(np.concatenate([first, second]))
+
+        assert merged.rounds == combined.rounds
+        assert merged.ev == pytest.approx(combined.ev)
+        assert merged.variance == pytest.approx(combined.variance)
+
+    def test_confidence_interval_contains_ev(self):
+        """Test that the confidence interval is centered on the EV"""
+        stats = SimulationStats.from_results(np.array([1.0, -1.0, 0.0, 1.5]))
+        low, high = stats.confidence_interval()
+        assert low < stats.ev < high
+
+
+class TestSimulate:
+    """Test full simulation runs"""
+
+    def test_same_seed_is_reproducible(self):
+        """Test that a fixed seed gives identical statistics"""
+        first = simulate(20_000, seed=7, workers=1, batch_size=5_000)
+        second = simulate(20_000, seed=7, workers=1, batch_size=5_000)
+        assert first.ev == second.ev
+        assert first.variance == second.variance
+
+    def test_basic_strategy_ev_is_plausible(self):
+        """Test that the shipped tables play close to break-even under their own rules"""
+        stats = simulate(200_000, seed=1, workers=1)
+        assert stats.rounds == 200_000
+        assert -0.03 < stats.ev < 0.02
+        assert 1.0 < stats.variance < 1.6
+
+    def test_worse_payout_lowers_ev(self):
+        """Test that paying 6:5 on naturals costs the player"""
+        even = simulate(100_000, seed=3, workers=1)
+        six_five = simulate(100_000, RuleSet(blackjack_payout=1.2), seed=3, workers=1)
+        assert six_five.ev < even.ev
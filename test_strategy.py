@@ -6,7 +6,12 @@ and ensuring all scenarios work correctly.
 """
 
 import pytest
-from strategy_table import get_action, get_action_text
+from strategy_table import (
+    ACTION_TABLE, HAND_TYPES, INVALID_CELL, TOTAL_SLOTS, UPCARD_SLOTS,
+    ACTIONS, classify_hand, compile_tables, get_action, get_action_for_cards, get_action_text,
+    get_action_unchecked, get_actions, parse_cards,
+    hard_table, pairs_table, soft_table,
+)
 from blackjack_game import get_strategy_advice
 
 class TestStrategyTable:
@@ -35,7 +40,8 @@ class TestStrategyTable:
             # (player_total, dealer_upcard, expected_action)
             (13, 6, 'D'),   # A2 vs 5-6
             (17, 6, 'D'),   # A6 vs 3-6
-            (18, 6, 'Ds'),  # A7 vs 2-6 (Double or Stand)
+            (18, 6, 'Ds'),  # A7 vs 3-6 (Double or Stand)
+            (18, 2, 'S'),   # A7 vs 2 stands under S17
             (18, 9, 'H'),   # A7 vs 9-10-A
             (19, 10, 'S'),  # A8+ always stand
         ]
@@ -100,6 +106,140 @@ class TestStrategyTable:
         with pytest.raises(ValueError):
             get_action('hard', 16, 1)  # Invalid dealer card
 
+class TestCompiledTable:
+    """Test the compiled array-backed lookup table"""
+
+    def test_compiled_table_matches_dict_tables(self):
+        """Test that every dict table cell is served unchanged by both lookup paths"""
+        tables = {'hard': hard_table, 'soft': soft_table, 'pair': pairs_table}
+        for hand_type, table in tables.items():
+            for total, actions in table.items():
+                for dealer_upcard, expected in actions.items():
+                    assert get_action(hand_type, total, dealer_upcard) == expected
+                    assert get_action_unchecked(hand_type, total, dealer_upcard) == expected
+
+    def test_compiled_table_layout(self):
+        """Test the table size and the sentinel for cells without a strategy"""
+        assert len(ACTION_TABLE) == len(HAND_TYPES) * TOTAL_SLOTS * UPCARD_SLOTS
+        defined = sum(len(actions) for table in (hard_table, soft_table, pairs_table) for actions in table.values())
+        assert len(ACTION_TABLE) - ACTION_TABLE.count(INVALID_CELL) == defined
+
+    def test_hand_type_is_case_insensitive(self):
+        """Test that mixed-case hand types still resolve through the validated path"""
+        assert get_action('HARD', 16, 10) == 'H'
+        assert get_action('Soft', 18, 6) == 'Ds'
+
+    def test_compile_rejects_unknown_action(self):
+        """Test that compiling a table with an unknown action code fails"""
+        with pytest.raises(ValueError):
+            compile_tables({16: {10: 'X'}}, {}, {})
+
+class TestBatchLookup:
+    """Test the vectorized batch lookup"""
+
+    def test_batch_matches_scalar_over_full_domain(self):
+        """Test that get_actions agrees with get_action cell for cell, including invalid cells"""
+        import numpy as np
+
+        hand_types, totals, upcards = [], [], []
+        for hand_type in ['hard', 'soft', 'pair', 'invalid']:
+            for total in range(-2, TOTAL_SLOTS + 2):
+                for dealer_upcard in range(-1, UPCARD_SLOTS + 2):
+                    hand_types.append(hand_type)
+                    totals.append(total)
+                    upcards.append(dealer_upcard)
+
+        codes, valid = get_actions(np.array(hand_types), np.array(totals), np.array(upcards))
+
+        for i, (hand_type, total, dealer_upcard) in enumerate(zip(hand_types, totals, upcards)):
+            try:
+                expected = get_action(hand_type, total, dealer_upcard)
+            except ValueError:
+                assert not valid[i], f"{hand_type} {total} vs {dealer_upcard} should be invalid"
+                assert codes[i] == INVALID_CELL
+            else:
+                assert valid[i], f"{hand_type} {total} vs {dealer_upcard} should be valid"
+                assert ACTIONS[codes[i]] == expected
+
+    def test_batch_accepts_hand_type_indexes(self):
+        """Test that integer hand type indexes select the same cells as names"""
+        codes, valid = get_actions([0, 1, 2], [16, 18, 16], [10, 6, 11])
+        assert valid.all()
+        assert [ACTIONS[code] for code in codes] == ['H', 'Ds', 'P']
+
+    def test_batch_marks_out_of_range_values_invalid(self):
+        """Test that huge and unsigned values are invalid cells rather than errors or wrapped indexes"""
+        import numpy as np
+
+        codes, valid = get_actions(['hard', 'hard', 'soft'], [10 ** 20, 16, 18], [10, 10, 6])
+        assert valid.tolist() == [False, True, True]
+        assert codes[0] == INVALID_CELL and ACTIONS[codes[1]] == 'H'
+
+        codes, valid = get_actions(np.array(['hard', 'hard']), np.array([16, 2 ** 63], dtype=np.uint64),
+                                   np.array([10, 10], dtype=np.intp))
+        assert valid.tolist() == [True, False]
+        assert ACTIONS[codes[0]] == 'H'
+
+        codes, valid = get_actions(np.array([0, 2 ** 40], dtype=np.int64), [16, 16], [10, 10])
+        assert valid.tolist() == [True, False]
+
+    def test_batch_rejects_mismatched_shapes(self):
+        """Test that arrays of different lengths are rejected"""
+        with pytest.raises(ValueError):
+            get_actions(['hard', 'soft'], [16], [10])
+
+class TestCardInput:
+    """Test card-level hand input"""
+
+    def test_classify_hand(self):
+        """Test hard, soft and pair classification from cards"""
+        assert classify_hand([10, 2]) == ('hard', 12)
+        assert classify_hand([11, 3, 4]) == ('soft', 18)
+        assert classify_hand([11, 3, 4, 10]) == ('hard', 18)
+        assert classify_hand([8, 8]) == ('pair', 16)
+        assert classify_hand(['A', 'A']) == ('pair', 22)
+        assert classify_hand(['K', 'Q']) == ('pair', 20)
+        assert classify_hand([1, 6]) == ('soft', 17)
+
+    def test_two_card_hands_use_table(self):
+        """Test that two-card hands match the table lookup for their class"""
+        assert get_action_for_cards([10, 6], 10) == get_action('hard', 16, 10)
+        assert get_action_for_cards([11, 7], 6) == get_action('soft', 18, 6)
+        assert get_action_for_cards([8, 8], 11) == get_action('pair', 16, 11)
+        assert get_action_for_cards(['A', 'K'], 10) == 'S'
+
+    def test_multi_card_hands(self):
+        """Test that three-card hands never double and stiff totals depend on composition"""
+        assert get_action_for_cards([3, 3, 5], 6) == 'H'       # hard 11 can no longer double
+        assert get_action_for_cards([11, 2, 5], 4) == 'S'      # soft 18 Ds falls back to stand
+        assert get_action_for_cards([10, 6], 10) == 'H'
+        assert get_action_for_cards([10, 4, 2], 10) == 'S'     # composition-dependent 16 vs 10
+
+    def test_order_does_not_matter(self):
+        """Test that the same composition in any order gives the same action"""
+        assert get_action_for_cards([4, 10, 2], 10) == get_action_for_cards([2, 4, 10], 10)
+
+    def test_invalid_cards(self):
+        """Test error handling for invalid card input"""
+        with pytest.raises(ValueError):
+            get_action_for_cards([10, 6, 8], 10)  # Bust
+        with pytest.raises(ValueError):
+            get_action_for_cards([10, 'X'], 10)
+        with pytest.raises(ValueError):
+            get_action_for_cards([10], 10)
+        with pytest.raises(ValueError):
+            get_action_for_cards([10, 6], 0)
+
+    def test_dealer_ace_forms(self):
+        """Test that the upcard accepts an Ace as 1 or 'A', like the player's cards"""
+        assert get_action_for_cards([10, 6], 1) == get_action_for_cards([10, 6], 'A') == get_action('hard', 16, 11)
+
+    def test_parse_cards(self):
+        assert parse_cards(" A 7 ") == ['A', '7']
+        assert parse_cards("10-4-2") == ['10', '4', '2']
+        assert parse_cards("K,Q") == ['K', 'Q']
+        assert get_action_for_cards(parse_cards("10 4 2"), 10) == 'S'
+
 class TestStrategyAdvice:
     """Test the main strategy advice function"""
     
@@ -0,0 +1,71 @@
+"""
+Tests for rule-set strategy tables and their on-disk cache.
+"""
+
+import pytest
+
+import strategy_cache
+import strategy_table
+from rules import DEFAULT_RULES, RuleSet
+from strategy_table import ACTION_TABLE, ACTIONS, compile_tables, get_action, get_table
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the strategy cache at a temporary directory and forget loaded tables"""
+    monkeypatch.setenv("GROK21_STRATEGY_CACHE", str(tmp_path))
+    monkeypatch.setattr(strategy_table, "_tables_by_rules", {DEFAULT_RULES: ACTION_TABLE})
+    return tmp_path
+
+
+def _fail_derivation(*args, **kwargs):
+    raise AssertionError("table should have been served from the cache")
+
+
+class TestRuleSetTables:
+    """Test serving tables by rule set"""
+
+    def test_default_strategy_uses_shipped_table(self, cache_dir, monkeypatch):
+        """Test that rules differing only in payout reuse the shipped table without derivation"""
+        monkeypatch.setattr(strategy_cache, "derive_tables", _fail_derivation)
+        assert get_table(RuleSet(blackjack_payout=1.2)) is ACTION_TABLE
+        assert get_action('hard', 16, 10, RuleSet(blackjack_payout=1.2)) == 'H'
+        assert not list(cache_dir.iterdir())
+
+    def test_cached_table_is_served_without_derivation(self, cache_dir, monkeypatch):
+        """Test that a cached rule set is loaded from disk and never re-derived"""
+        rules = RuleSet(decks=2, dealer_hits_soft_17=True, late_surrender=True)
+        hard = {total: dict(actions) for total, actions in strategy_table.hard_table.items()}
+        hard[16][10] = 'Rh'
+        strategy_cache.save_table(rules, compile_tables(hard, strategy_table.soft_table, strategy_table.pairs_table))
+
+        monkeypatch.setattr(strategy_cache, "derive_tables", _fail_derivation)
+        assert get_action('hard', 16, 10, rules) == 'Rh'
+        assert get_action('hard', 16, 9, rules) == 'H'
+        codes, valid = strategy_table.get_actions(['hard'], [16], [10], rules)
+        assert valid.all() and ACTIONS[codes[0]] == 'Rh'
+
+    def test_invalid_cache_file_is_ignored(self, cache_dir):
+        """Test that a corrupt cache file counts as missing"""
+        rules = RuleSet(decks=1)
+        path = strategy_cache.cache_path(rules)
+        cache_dir.joinpath(path.rsplit('/', 1)[-1]).write_bytes(b'not a table')
+        assert strategy_cache.read_cached_table(rules) is None
+        with pytest.raises(ValueError):
+            strategy_cache.load_table(rules, derive=False)
+
+    def test_rules_hash_tracks_strategy_fields(self):
+        """Test that only strategy-relevant rules change the cache key"""
+        assert strategy_cache.rules_hash(RuleSet()) == strategy_cache.rules_hash(RuleSet(blackjack_payout=1.2))
+        assert strategy_cache.rules_hash(RuleSet()) != strategy_cache.rules_hash(RuleSet(dealer_hits_soft_17=True))
+
+
+class TestDerivation:
+    """Test deriving single cells from exact EVs"""
+
+    def test_surrender_cells(self):
+        """Test textbook late-surrender plays"""
+        rules = RuleSet(late_surrender=True)
+        assert strategy_cache.derive_action('hard', 16, 10, rules) == 'Rh'
+        assert strategy_cache.derive_action('hard', 16, 10, DEFAULT_RULES) == 'H'
+        assert strategy_cache.derive_action('hard', 13, 10, rules) == 'H'